@@ -33,7 +33,9 @@ export const getCurriculum = () => api.get('/curriculum').then(res => res.data);
 export const getStudyItems = () => api.get('/study').then(res => res.data);
 export const confirmStudyItem = (word) => api.post('/study/confirm', { word });
 export const getQuizQuestion = () => api.get('/quiz/vocab').then(res => res.data);
-export const submitQuizAnswer = (questionId, answer) => api.post('/quiz/answer', { question_id: questionId, answer }).then(res => res.data);
+export const getQuizSession = (n = 20) => api.get('/quiz/session', { params: { n } }).then(res => res.data);
+export const submitQuizAnswer = (questionId, answer, sessionToken = null) => api.post('/quiz/answer', { question_id: questionId, answer, session_token: sessionToken }).then(res => res.data);
+export const submitQuizAnswers = (answers, sessionToken = null) => api.post('/quiz/answers', { answers, session_token: sessionToken }).then(res => res.data);
 export const searchDictionary = (q) => api.get('/dictionary/search', { params: { q } }).then(res => res.data);
 export const addToDictionary = (word, kana, meanings) => api.post('/dictionary/add', { word, kana, meanings });
 export const getShopItems = () => api.get('/shop').then(res => res.data);
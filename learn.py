@@ -2,16 +2,19 @@
 import sys
 import os
 import argparse
-import uvicorn
-import json
 
 # Ensure src is in path
 sys.path.append(os.path.dirname(__file__))
 
-from src.main import main as cli_main
-from src.headless import run_headless
+# Subcommands import what they need when they run: the headless modes never load
+# uvicorn, FastAPI or rich, and nothing touches the database just to print --help.
+
+def cli_main():
+    from src.main import main
+    main()
 
 def serve():
+    import uvicorn
     print("Starting Japanese Learning API Server...")
     # Using string import allows reload if needed, but here we just run it.
     uvicorn.run("src.api:app", host="0.0.0.0", port=8000, reload=True)
@@ -20,6 +23,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Japanese Learning App")
     parser.add_argument("--headless", action="store_true", help="Run in headless JSON mode (one-shot)")
     parser.add_argument("--study", action="store_true", help="Use Study Mode in headless (learn new items)")
+    parser.add_argument("--daemon", action="store_true", help="Run a persistent headless session speaking JSON lines on stdin/stdout")
 
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
@@ -29,15 +33,40 @@ if __name__ == "__main__":
     # Server command
     serve_parser = subparsers.add_parser("serve", help="Start the API server")
 
+    # Offline FSRS parameter fitting
+    optimize_parser = subparsers.add_parser("optimize", help="Fit FSRS parameters to your review history")
+    optimize_parser.add_argument("--epochs", type=int, default=5, help="Passes over the review log")
+    optimize_parser.add_argument("--no-reschedule", action="store_true", help="Save parameters without rescheduling cards")
+
+    # Offline autopilot candidate index
+    subparsers.add_parser("build-index", help="Prebuild the dictionary indexes for autopilot and autocomplete")
+
     args = parser.parse_args()
 
+    if args.daemon:
+        from src.headless import run_daemon
+        run_daemon()
+        sys.exit(0)
+
     if args.headless:
+        from src.headless import run_headless
         mode = "study" if args.study else "quiz"
         run_headless(mode)
         sys.exit(0)
 
     if args.command == "serve":
         serve()
+    elif args.command == "optimize":
+        from src.fsrs_optimizer import run_optimizer
+        run_optimizer(epochs=args.epochs, reschedule=not args.no_reschedule)
+    elif args.command == "build-index":
+        from src.candidate_index import build_candidate_index
+        from src.autocomplete import build_autocomplete_index
+        from src.dictionary import get_jam
+        print("Building recommendation candidate index from JMdict...")
+        print(f"Indexed {build_candidate_index(get_jam().db_file)} candidate words.")
+        print("Building autocomplete index...")
+        print(f"Indexed {build_autocomplete_index(get_jam().db_file)} search keys.")
     elif args.command == "cli":
         cli_main()
     else:
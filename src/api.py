@@ -5,36 +5,67 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import random
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from .auth import verify_api_key, API_KEY
+from .auth import verify_api_key, get_api_key
 from .data_manager import (
     load_vocab, save_vocab, load_user_profile, save_user_profile,
     get_vocab_item, update_vocab_item, add_vocab_item, load_curriculum,
-    get_due_vocab_items, get_random_distractors, get_vocab_count,
-    get_random_learned_vocab_item, get_learned_vocab_count, get_user_lock
+    get_random_due_vocab_item, get_due_vocab_count, get_similar_distractors, get_vocab_count,
+    get_random_learned_vocab_item, get_learned_vocab_count, get_user_lock,
+    enable_write_behind, disable_write_behind, start_pitch_backfill,
+    get_quiz_session_items, get_session_distractors, save_reviews, find_vocab_items
 )
 from .models import Vocabulary, UserProfile, UserSettings
+from .search_keys import search_key
 from .quiz import generate_input_question, generate_mc_question, normalize_answer
 from .gamification import add_xp, update_streak, calculate_rewards
 from .srs_engine import update_card_srs, update_card_fsrs
 from .study import get_new_items, mark_as_learning
-from .dictionary import search
+from .dictionary import (
+    search_async, lookup_pos, autocomplete, get_search_cache_stats, enable_search_persistence, disable_search_persistence,
+    start_index_builds, start_dictionary_executor, stop_dictionary_executor, start_search_warmup
+)
 from .sentence_mining import mine_sentence
-from .pitch import get_pitch_pattern
+from .pitch import get_pitch_pattern, get_pitch_patterns
+from .forecast import get_forecast
+from .quiz_sessions import QuizSessionStore, SessionNotFound
 
 app = FastAPI(title="Japanese Learning API", version="1.0", dependencies=[Depends(verify_api_key)])
 
 @app.on_event("startup")
 async def startup_event():
     print(f"\n{'='*40}")
-    print(f"API Key: {API_KEY}")
+    print(f"API Key: {get_api_key()}")
     print(f"{'='*40}\n")
 
+    # Opt-in: acknowledge answers from memory and persist them in grouped writes
+    if os.environ.get("JAPANESE_APP_WRITE_BEHIND") == "1":
+        enable_write_behind()
+
+    # Older rows predate the stored pitch column; fill them without blocking requests
+    start_pitch_backfill()
+    start_index_builds()
+    start_dictionary_executor()
+
+    # Opt-in: keep dictionary search results on disk across restarts
+    if os.environ.get("JAPANESE_APP_LOOKUP_CACHE") == "1":
+        enable_search_persistence()
+    # Common searches (data/search_warmup.txt) are hits from the first request
+    start_search_warmup()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    disable_write_behind()
+    disable_search_persistence()
+    stop_dictionary_executor()
+
 # Security Headers Middleware
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -79,6 +110,7 @@ class UserStats(BaseModel):
     gems: int
     total_learned: int
     next_level_progress: int
+    due_count: int = 0
 
 class QuizQuestionResponse(BaseModel):
     question_id: str
@@ -91,9 +123,25 @@ class QuizQuestionResponse(BaseModel):
     romaji: Optional[str] = None
     pitch_pattern: Optional[str] = None
 
+class QuizSessionResponse(BaseModel):
+    session_token: str
+    questions: List[QuizQuestionResponse]
+
 class AnswerRequest(BaseModel):
     question_id: str
     answer: str
+    # Set when the question came from /api/quiz/session
+    session_token: Optional[str] = None
+
+class AnswerRecord(BaseModel):
+    question_id: str
+    answer: str
+    # When the answer was given; defaults to when the batch arrives
+    answered_at: Optional[datetime] = None
+
+class BatchAnswerRequest(BaseModel):
+    answers: List[AnswerRecord]
+    session_token: Optional[str] = None
 
 class AnswerResponse(BaseModel):
     correct: bool
@@ -105,6 +153,14 @@ class AnswerResponse(BaseModel):
     gems_awarded: int = 0
     is_leech: bool = False
 
+class BatchAnswerResponse(BaseModel):
+    # One result per submitted answer, in the order they were submitted
+    results: List[AnswerResponse]
+    xp_gained: int = 0
+    gems_awarded: int = 0
+    new_level: int
+    new_xp: int
+
 class SettingsModel(BaseModel):
     track: str
     theme: str
@@ -140,12 +196,48 @@ class ShopItem(BaseModel):
 class BuyRequest(BaseModel):
     item_id: str
 
-def get_due_vocab():
-    now = datetime.now()
-    today_str = now.strftime('%Y-%m-%d')
-    # Optimization: Use SQL to fetch only due items instead of loading and sorting all vocab
-    due = get_due_vocab_items(today_str)
-    return due
+class ForecastDay(BaseModel):
+    date: str
+    reviews: float
+
+MAX_FORECAST_DAYS = 730
+MAX_AUTOCOMPLETE_RESULTS = 50
+MAX_QUIZ_SESSION_QUESTIONS = 50
+MAX_BATCH_ANSWERS = 500
+
+# Questions issued by /api/quiz/session, checked off as they are answered
+_QUIZ_SESSIONS = QuizSessionStore()
+
+def _pitch_of(item: Vocabulary) -> str:
+    # Deck words carry their stored pattern; MeCab only runs for rows not yet backfilled
+    if item.pitch_pattern is not None:
+        return item.pitch_pattern
+    return get_pitch_pattern(item.word, item.kana)
+
+def _pitches_of(items: List[Vocabulary]) -> List[str]:
+    # As _pitch_of, with rows not yet backfilled analyzed in one batch
+    missing = [v for v in items if v.pitch_pattern is None]
+    computed = iter(get_pitch_patterns([(v.word, v.kana) for v in missing]) if missing else ())
+    return [v.pitch_pattern if v.pitch_pattern is not None else next(computed) for v in items]
+
+def _vocab_question(item: Vocabulary, distractors: List[Vocabulary], pitch: str) -> QuizQuestionResponse:
+    if len(distractors) >= 3 and random.random() > 0.5:
+        # We pass distractors as 'all_vocab' because generate_mc_question expects a list to sample from.
+        # Since we already selected 3 random distinct items, random.sample(distractors, 3) will return them.
+        q = generate_mc_question(item, distractors)
+    else:
+        q = generate_input_question(item)
+
+    return QuizQuestionResponse(
+        question_id=f"vocab:{item.word}",
+        type=q.type,
+        question_text=q.question_text,
+        options=q.options,
+        word=item.word,
+        kana=item.kana,
+        romaji=item.romaji,
+        pitch_pattern=pitch
+    )
 
 @app.get("/api/user", response_model=UserStats)
 def get_user_stats():
@@ -166,64 +258,111 @@ def get_user_stats():
         hearts=profile.hearts,
         gems=profile.gems,
         total_learned=learned_count,
-        next_level_progress=progress
+        next_level_progress=progress,
+        due_count=get_due_vocab_count(datetime.now().strftime('%Y-%m-%d'))
     )
 
+@app.get("/api/forecast", response_model=List[ForecastDay])
+def get_review_forecast(days: int = 30):
+    if days < 1 or days > MAX_FORECAST_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_FORECAST_DAYS}")
+    # Simulated from the FSRS memory state of the deck; cached until the next review
+    return get_forecast(days)
+
 @app.get("/api/quiz/vocab", response_model=QuizQuestionResponse)
 def get_vocab_question():
-    due = get_due_vocab()
+    # Optimization: Sample one due card from the in-memory due queue instead of loading the whole backlog
+    item = get_random_due_vocab_item(datetime.now().strftime('%Y-%m-%d'))
 
-    if not due:
+    if not item:
         # Fallback to random review if nothing due
         item = get_random_learned_vocab_item()
         if not item:
              raise HTTPException(status_code=404, detail="No learned vocabulary available. Use Study Mode first.")
-    else:
-        item = random.choice(due)
-
-    # Generate ID: "vocab:{word}"
-    qid = f"vocab:{item.word}"
-
-    # Generate Question
-    vocab_count = get_vocab_count()
 
-    can_do_mc = False
     distractors = []
-
-    if vocab_count >= 4:
-         distractors = get_random_distractors(item.word, limit=3)
-         if len(distractors) >= 3:
-             can_do_mc = True
-
-    if can_do_mc and random.random() > 0.5:
-        # Optimization: Fetch distractors via SQL instead of loading all vocab
-        # We pass distractors as 'all_vocab' because generate_mc_question expects a list to sample from.
-        # Since we already selected 3 random distinct items, random.sample(distractors, 3) will return them.
-        q = generate_mc_question(item, distractors)
+    if get_vocab_count() >= 4:
+         # Prefer distractors that resemble the answer (meaning, part of speech, chapter)
+         distractors = get_similar_distractors(item, limit=3)
+
+    return _vocab_question(item, distractors, _pitch_of(item))
+
+@app.get("/api/quiz/session", response_model=QuizSessionResponse)
+def get_quiz_session(n: int = 20):
+    """
+    A whole quiz session in one request: n distinct cards (due ones first),
+    distractors drawn without replacement across the session and pitch
+    patterns resolved in one batch. Answers sent with the session token are
+    checked against the questions issued here.
+    """
+    if n < 1 or n > MAX_QUIZ_SESSION_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"n must be between 1 and {MAX_QUIZ_SESSION_QUESTIONS}")
+
+    items = get_quiz_session_items(datetime.now().strftime('%Y-%m-%d'), n)
+    if not items:
+        raise HTTPException(status_code=404, detail="No learned vocabulary available. Use Study Mode first.")
+
+    distractors = get_session_distractors(items, limit=3)
+    questions = [_vocab_question(item, distractors.get(item.word, []), pitch)
+                 for item, pitch in zip(items, _pitches_of(items))]
+    token = _QUIZ_SESSIONS.create(q.question_id for q in questions)
+    return QuizSessionResponse(session_token=token, questions=questions)
+
+def _word_of(question_id: str) -> str:
+    if not question_id.startswith("vocab:"):
+        raise HTTPException(status_code=400, detail="Invalid question ID format")
+    return question_id.split("vocab:", 1)[1]
+
+def _consume_session_questions(session_token: str, question_ids: List[str]):
+    try:
+        issued = _QUIZ_SESSIONS.consume_all(session_token, question_ids)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Quiz session not found or expired")
+    if not issued:
+        raise HTTPException(status_code=409, detail="Question already answered or not part of this session")
+
+def _last_reviewed_at(item: Vocabulary) -> Optional[datetime]:
+    if not item.fsrs_last_review:
+        return None
+    reviewed = datetime.fromisoformat(item.fsrs_last_review)
+    return reviewed if reviewed.tzinfo else reviewed.replace(tzinfo=timezone.utc)
+
+def _apply_answer(item: Vocabulary, answer: str, profile: UserProfile,
+                  answered_at: Optional[datetime] = None) -> AnswerResponse:
+    """Grades an answer and updates the card and profile in memory; the caller saves them."""
+    # Check Answer
+    correct_answers = [normalize_answer(item.meaning)]
+    user_ans = normalize_answer(answer)
+    is_correct = user_ans in correct_answers
+
+    # Calculate rewards using centralized logic
+    xp_gained, gems_awarded = calculate_rewards(is_correct, profile.streak)
+
+    item.last_review = (answered_at.astimezone() if answered_at else datetime.now()).strftime('%Y-%m-%d')
+    if is_correct:
+        profile.gems += gems_awarded
+        add_xp(profile, xp_gained)
+
+        # 5 = Easy/Perfect. FSRS will map this to 4 (Easy).
+        update_card_fsrs(item, 5, answered_at)
     else:
-        q = generate_input_question(item)
-
-    # Get pitch accent
-    pitch = get_pitch_pattern(item.word, item.kana)
-
-    return QuizQuestionResponse(
-        question_id=qid,
-        type=q.type,
-        question_text=q.question_text,
-        options=q.options,
-        word=item.word,
-        kana=item.kana,
-        romaji=item.romaji,
-        pitch_pattern=pitch
+        # 0 = Fail. FSRS maps to 1 (Again).
+        update_card_fsrs(item, 0, answered_at)
+
+    return AnswerResponse(
+        correct=is_correct,
+        correct_answers=[item.meaning],
+        explanation=f"{item.word} ({item.kana}) means '{item.meaning}'",
+        xp_gained=xp_gained,
+        new_level=profile.level,
+        new_xp=profile.xp,
+        gems_awarded=gems_awarded,
+        is_leech=item.is_leech
     )
 
 @app.post("/api/quiz/answer", response_model=AnswerResponse)
 def submit_answer(payload: AnswerRequest):
-    # Parse ID
-    if not payload.question_id.startswith("vocab:"):
-        raise HTTPException(status_code=400, detail="Invalid question ID format")
-
-    word = payload.question_id.split("vocab:", 1)[1]
+    word = _word_of(payload.question_id)
 
     with get_user_lock():
         profile = load_user_profile()
@@ -232,62 +371,83 @@ def submit_answer(payload: AnswerRequest):
         if not item:
             raise HTTPException(status_code=404, detail="Word not found")
 
-        # Check Answer
-        correct_answers = [normalize_answer(item.meaning)]
-        user_ans = normalize_answer(payload.answer)
-        is_correct = user_ans in correct_answers
-
-        xp_gained = 0
-        gems_awarded = 0
-
-        # Calculate rewards using centralized logic
-        xp_gained, gems_awarded = calculate_rewards(is_correct, profile.streak)
-
-        if is_correct:
-            item.last_review = datetime.now().strftime('%Y-%m-%d')
-
-            profile.gems += gems_awarded
-            add_xp(profile, xp_gained)
-
-            # 5 = Easy/Perfect. FSRS will map this to 4 (Easy).
-            update_card_fsrs(item, 5)
-        else:
-            item.last_review = datetime.now().strftime('%Y-%m-%d')
-            # 0 = Fail. FSRS maps to 1 (Again).
-            update_card_fsrs(item, 0)
+        if payload.session_token is not None:
+            _consume_session_questions(payload.session_token, [payload.question_id])
 
+        result = _apply_answer(item, payload.answer, profile)
         update_vocab_item(item)
         save_user_profile(profile)
+        return result
+
+@app.post("/api/quiz/answers", response_model=BatchAnswerResponse)
+def submit_answers(payload: BatchAnswerRequest):
+    """
+    Applies answers collected offline or over a whole session. Cards are
+    reviewed in the order the answers were given (an answer older than the
+    card's last review counts as given at that review), and all are saved
+    together with the profile in one transaction. Nothing is applied unless
+    every answer is valid.
+    """
+    if len(payload.answers) > MAX_BATCH_ANSWERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ANSWERS} answers per batch")
+
+    now = datetime.now(timezone.utc)
+    records = []
+    for position, record in enumerate(payload.answers):
+        answered_at = record.answered_at or now
+        if answered_at.tzinfo is None:
+            answered_at = answered_at.replace(tzinfo=timezone.utc)
+        # A client clock running ahead must not schedule reviews from the future
+        records.append((min(answered_at, now), position, _word_of(record.question_id), record))
+    records.sort(key=lambda r: (r[0], r[1]))
+
+    with get_user_lock():
+        profile = load_user_profile()
+        items = {}
+        for _, _, word, _ in records:
+            if word not in items:
+                items[word] = get_vocab_item(word)
+                if not items[word]:
+                    raise HTTPException(status_code=404, detail=f"Word not found: {word}")
+
+        if payload.session_token is not None:
+            _consume_session_questions(payload.session_token, [r.question_id for r in payload.answers])
+
+        results: List[Optional[AnswerResponse]] = [None] * len(records)
+        for answered_at, position, word, record in records:
+            # An offline answer may predate a review the card has had since;
+            # it is counted then, never moving the card's schedule back
+            last_review = _last_reviewed_at(items[word])
+            if last_review and answered_at < last_review:
+                answered_at = last_review
+            results[position] = _apply_answer(items[word], record.answer, profile, answered_at)
+        save_reviews(list(items.values()), profile)
+
+    return BatchAnswerResponse(
+        results=results,
+        xp_gained=sum(r.xp_gained for r in results),
+        gems_awarded=sum(r.gems_awarded for r in results),
+        new_level=profile.level,
+        new_xp=profile.xp
+    )
 
-        return AnswerResponse(
-            correct=is_correct,
-            correct_answers=[item.meaning],
-            explanation=f"{item.word} ({item.kana}) means '{item.meaning}'",
-            xp_gained=xp_gained,
-            new_level=profile.level,
-            new_xp=profile.xp,
-            gems_awarded=gems_awarded,
-            is_leech=item.is_leech
-        )
+def _study_item(item: Vocabulary) -> StudyItemResponse:
+    return StudyItemResponse(
+        word=item.word,
+        kana=item.kana,
+        romaji=item.romaji,
+        meaning=item.meaning,
+        tags=item.tags,
+        status=item.status,
+        example_sentence=item.example_sentence,
+        pitch_pattern=_pitch_of(item)
+    )
 
 @app.get("/api/study", response_model=List[StudyItemResponse])
 def get_study_items():
     profile = load_user_profile()
     items = get_new_items(limit=5, track=profile.selected_track)
-    response_items = []
-    for item in items:
-        pitch = get_pitch_pattern(item.word, item.kana)
-        response_items.append(StudyItemResponse(
-            word=item.word,
-            kana=item.kana,
-            romaji=item.romaji,
-            meaning=item.meaning,
-            tags=item.tags,
-            status=item.status,
-            example_sentence=item.example_sentence,
-            pitch_pattern=pitch
-        ))
-    return response_items
+    return [_study_item(item) for item in items]
 
 @app.post("/api/study/confirm")
 def confirm_study_item(payload: StudyConfirmRequest):
@@ -320,14 +480,43 @@ def update_settings(payload: SettingsModel):
         save_user_profile(profile)
         return {"status": "updated", "track": payload.track, "theme": payload.theme}
 
+# Not a standard status; nginx's "client closed request", for logs only since nobody reads the reply
+CLIENT_CLOSED_REQUEST = 499
+
+async def _wait_for_disconnect(request: Request):
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
 @app.get("/api/dictionary/search")
-def search_dictionary(q: str):
-    return search(q)
+async def search_dictionary(q: str, request: Request):
+    # Async so lookups run on the dictionary executor rather than the threadpool the
+    # quiz handlers share; a search whose client has gone away is abandoned.
+    lookup = asyncio.ensure_future(search_async(q))
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+    await asyncio.wait({lookup, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    if lookup.done():
+        disconnect.cancel()
+        return lookup.result()
+    lookup.cancel()
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+@app.get("/api/dictionary/autocomplete")
+def autocomplete_dictionary(q: str, k: int = 10):
+    if k < 1 or k > MAX_AUTOCOMPLETE_RESULTS:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_AUTOCOMPLETE_RESULTS}")
+    # Prefix arrays over forms and glosses, ranked by JMdict priority; cheap enough for every keystroke
+    return autocomplete(q, k)
+
+@app.get("/api/dictionary/cache")
+def get_dictionary_cache_stats():
+    return get_search_cache_stats()
 
 @app.post("/api/dictionary/add")
 def add_dictionary_item(payload: DictionaryAddRequest):
-    # Check if word already exists
-    if get_vocab_item(payload.word):
+    # Check if word already exists, also as typed in another width or kana
+    # script (ｺｰﾋｰ / コーヒー); words that only share a reading are not duplicates
+    key = search_key(payload.word)
+    if any(search_key(v.word) == key for v in find_vocab_items(payload.word)):
         raise HTTPException(status_code=400, detail="Word already in vocabulary")
 
     # Create new Vocabulary item
@@ -335,18 +524,8 @@ def add_dictionary_item(payload: DictionaryAddRequest):
     meaning_str = "; ".join(payload.meanings)
 
     # Lookup POS to generate sentence
-    # We re-search because payload doesn't have POS yet
-    # Assuming exact match search is reasonably fast
-    results = search(payload.word)
-    pos = ""
-    if results:
-        # Try to find matching entry (kana match too)
-        for r in results:
-             if r['word'] == payload.word and r['kana'] == payload.kana:
-                 pos = r.get('pos', '')
-                 break
-        if not pos and results:
-             pos = results[0].get('pos', '')
+    # Payload doesn't have POS; the search that found the word usually has it cached
+    pos = lookup_pos(payload.word, payload.kana)
 
     sentence = mine_sentence(payload.word, pos, meaning_str)
 
@@ -366,6 +545,14 @@ def add_dictionary_item(payload: DictionaryAddRequest):
 
     return {"status": "success", "word": new_item.word}
 
+@app.get("/api/vocab/search", response_model=List[StudyItemResponse])
+def search_vocab(q: str):
+    """Deck words matching q as typed in romaji, either kana script, any width, or exactly."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    # One indexed lookup on the stored reading keys
+    return [_study_item(item) for item in find_vocab_items(q)]
+
 @app.get("/api/curriculum")
 def get_curriculum():
     return load_curriculum()
@@ -397,7 +584,7 @@ def get_word_of_the_day():
 
     item = rng.choice(candidates)
 
-    pitch = get_pitch_pattern(item.word, item.kana)
+    pitch = _pitch_of(item)
     return StudyItemResponse(
         word=item.word,
         kana=item.kana,
@@ -44,8 +44,20 @@ def get_secret_key() -> str:
 
     return new_key
 
-# Load key once at startup
-API_KEY = get_secret_key()
+_api_key = None
+
+def get_api_key() -> str:
+    """The API key, read (or generated) on first use rather than at import."""
+    global _api_key
+    if _api_key is None:
+        _api_key = get_secret_key()
+    return _api_key
+
+def __getattr__(name):
+    # Keeps `from src.auth import API_KEY` working without resolving it at import
+    if name == "API_KEY":
+        return get_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def verify_api_key(api_key: str = Security(api_key_header)):
     if not api_key:
@@ -53,7 +65,7 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing API Key",
         )
-    if api_key != API_KEY:
+    if api_key != get_api_key():
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API Key",
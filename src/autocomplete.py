@@ -0,0 +1,196 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from typing import Dict, List
+
+import numpy as np
+
+from .candidate_index import source_signature
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), '../data/autocomplete')
+# Bump when the key layout below changes; older index directories are rebuilt.
+INDEX_VERSION = "1"
+
+# Keys are compared as UTF-8 bytes truncated to KEY_BYTES; prefixes longer than
+# that match on their first KEY_BYTES bytes.
+KEY_BYTES = 32
+LABEL_BYTES = 64
+
+# Ranks, best first: JMdict nf01..nf48 frequency bands, then the remaining
+# priority-1 (news1, ichi1, spec1, gai1) and priority-2 entries, then the rest.
+PRIORITY_1 = ('news1', 'ichi1', 'spec1', 'gai1')
+RANK_PRIORITY_1 = 49
+RANK_PRIORITY_2 = 50
+RANK_NONE = 51
+
+def _entry_rank(tags) -> int:
+    rank = RANK_NONE
+    for tag in tags:
+        if tag.startswith('nf') and tag[2:].isdigit():
+            rank = min(rank, int(tag[2:]))
+        elif tag in PRIORITY_1:
+            rank = min(rank, RANK_PRIORITY_1)
+        elif tag[-1:] == '2':
+            rank = min(rank, RANK_PRIORITY_2)
+    return rank
+
+def normalize_key(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).strip().lower()
+
+def _encode(text: str, size: int) -> bytes:
+    # Truncate on a character boundary so the stored bytes stay valid UTF-8
+    data = text.encode('utf-8')
+    if len(data) <= size:
+        return data
+    return data[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+def build_autocomplete_index(source_db: str, index_dir: str = INDEX_DIR) -> int:
+    """
+    Offline step: writes sorted prefix arrays over every kanji form, kana form
+    and English gloss of a jamdict database to index_dir. Returns the number
+    of keys.
+    """
+    source = sqlite3.connect(f"file:{source_db}?mode=ro", uri=True)
+    try:
+        idseqs = [row[0] for row in source.execute("SELECT idseq FROM Entry ORDER BY idseq")]
+        entry_of = {idseq: i for i, idseq in enumerate(idseqs)}
+        tags: Dict[int, List[str]] = {}
+        for table, pri in (("Kanji", "KJP"), ("Kana", "KNP")):
+            for idseq, tag in source.execute(f"SELECT f.idseq, p.text FROM {table} f JOIN {pri} p ON p.kid = f.ID"):
+                tags.setdefault(idseq, []).append(tag)
+        rank_of = {idseq: _entry_rank(t) for idseq, t in tags.items()}
+
+        # Display labels: first kanji form, first kana form and first gloss of each entry
+        labels = {field: [b''] * len(idseqs) for field in ('word', 'kana', 'gloss')}
+        # Keys carry a leading rank byte, so one array sorted by (rank, key) lets a
+        # single searchsorted call find the prefix range within every rank at once.
+        key_bytes: List[bytes] = []
+        key_entries = array('i')
+
+        def add_key(idseq, entry, text):
+            key = _encode(normalize_key(text), KEY_BYTES)
+            if key:
+                key_bytes.append(bytes([rank_of.get(idseq, RANK_NONE)]) + key)
+                key_entries.append(entry)
+
+        forms = [("Kanji", "word", "SELECT idseq, text FROM Kanji ORDER BY ID"),
+                 ("Kana", "kana", "SELECT idseq, text FROM Kana ORDER BY ID"),
+                 ("Gloss", "gloss", """SELECT s.idseq, g.text FROM Sense s JOIN SenseGloss g ON g.sid = s.ID
+                                       ORDER BY s.ID, g.rowid""")]
+        for kind, field, query in forms:
+            first = labels[field]
+            for idseq, text in source.execute(query):
+                entry = entry_of.get(idseq)
+                if entry is None or not text:
+                    continue
+                if not first[entry]:
+                    first[entry] = _encode(text, LABEL_BYTES)
+                add_key(idseq, entry, text)
+                # "to eat" should also come up for "eat"
+                if kind == "Gloss" and text.startswith("to "):
+                    add_key(idseq, entry, text[3:])
+    finally:
+        source.close()
+
+    entries = np.zeros(len(idseqs), dtype=[(field, f'S{LABEL_BYTES}') for field in labels])
+    for field, values in labels.items():
+        entries[field] = values
+    del labels
+    # Words without kanji are shown by their kana, and the other way round
+    no_word = entries['word'] == b''
+    entries['word'][no_word] = entries['kana'][no_word]
+    no_kana = entries['kana'] == b''
+    entries['kana'][no_kana] = entries['word'][no_kana]
+
+    rows = np.zeros(len(key_bytes), dtype=[('key', f'S{KEY_BYTES + 1}'), ('entry', np.int32)])
+    rows['key'] = key_bytes
+    rows['entry'] = key_entries
+    del key_bytes, key_entries
+    rows = np.unique(rows)  # sorted by key, then entry
+    key_array = np.ascontiguousarray(rows['key'])
+    entry_array = np.ascontiguousarray(rows['entry'])
+
+    # Write next to the target and swap it in, so readers never see a half-built index
+    tmp_dir = index_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'keys.npy'), key_array)
+    np.save(os.path.join(tmp_dir, 'key_entries.npy'), entry_array)
+    np.save(os.path.join(tmp_dir, 'entries.npy'), entries)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({"version": INDEX_VERSION, "source": source_signature(source_db)}, f)
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+    return len(rows)
+
+class AutocompleteIndex:
+    """
+    Prefix search over the arrays written by build_autocomplete_index,
+    memory-mapped so the operating system pages them in on demand.
+    """
+
+    RANKS = np.arange(1, RANK_NONE + 1, dtype=np.uint8)
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.keys = np.load(os.path.join(index_dir, 'keys.npy'), mmap_mode='r')
+        self.key_entries = np.load(os.path.join(index_dir, 'key_entries.npy'), mmap_mode='r')
+        self.entries = np.load(os.path.join(index_dir, 'entries.npy'), mmap_mode='r')
+
+    def complete(self, prefix: str, k: int = 10) -> List[Dict[str, str]]:
+        """Up to k entries with a form or gloss starting with prefix, best JMdict priority first."""
+        key = _encode(normalize_key(prefix), KEY_BYTES)
+        if not key or k <= 0:
+            return []
+        starts = [bytes([r]) + key for r in self.RANKS]
+        lows = np.searchsorted(self.keys, starts, side='left').tolist()
+        # Keys equal to the prefix end at side='right'; UTF-8 never contains 0xff,
+        # so prefix + 0xff bounds every key that extends it.
+        exact_highs = np.searchsorted(self.keys, starts, side='right').tolist()
+        highs = np.searchsorted(self.keys, [s + b'\xff' for s in starts], side='left').tolist()
+
+        # Exact matches in priority order first, then longer completions in priority order
+        results, seen = [], set()
+        for ranges in (zip(lows, exact_highs), zip(exact_highs, highs)):
+            for lo, hi in ranges:
+                for entry in self.key_entries[lo:hi].tolist():
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
+                    results.append(self._label(entry))
+                    if len(results) >= k:
+                        return results
+        return results
+
+    def _label(self, entry: int) -> Dict[str, str]:
+        word, kana, gloss = self.entries[entry].tolist()
+        return {"word": word.decode('utf-8'), "kana": kana.decode('utf-8'), "gloss": gloss.decode('utf-8')}
+
+def is_current(source_db: str, index_dir: str = INDEX_DIR) -> bool:
+    try:
+        with open(os.path.join(index_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("version") == INDEX_VERSION and meta.get("source") == source_signature(source_db)
+
+_lock = threading.Lock()
+_loaded: Dict[str, AutocompleteIndex] = {}
+
+def get_autocomplete_index(source_db: str, index_dir: str = INDEX_DIR) -> AutocompleteIndex:
+    """
+    The index for source_db, loaded once per process. A missing or stale
+    index is rebuilt first, which takes a few seconds.
+    """
+    index = _loaded.get(index_dir)
+    if index is not None:
+        return index
+    with _lock:
+        if index_dir not in _loaded:
+            if not is_current(source_db, index_dir):
+                build_autocomplete_index(source_db, index_dir)
+            _loaded[index_dir] = AutocompleteIndex(index_dir)
+        return _loaded[index_dir]
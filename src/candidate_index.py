@@ -0,0 +1,270 @@
+import os
+import json
+import random
+import sqlite3
+import string
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .search_keys import search_key
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = os.path.join(os.path.dirname(__file__), '../data/candidates.db')
+# Bump when the filters or layout below change; older index files are rebuilt.
+INDEX_VERSION = "2"
+
+COMMON_PRIORITIES = ('news1', 'ichi1', 'spec1', 'gai1')
+# Gloss keywords that put an entry on a themed track; every entry is on "General"
+TRACK_KEYWORDS = {
+    "Pop Culture": ['slang', 'anime', 'manga', 'game', 'internet', 'net'],
+    "Business": ['business', 'company', 'finance', 'economy', 'money', 'office', 'corporate'],
+    "Travel": ['travel', 'trip', 'hotel', 'train', 'station', 'airport', 'ticket', 'reservation'],
+}
+ALLOWED_SINGLE_KANA = ('は', 'が', 'に', 'で', 'を', 'も', 'へ', 'と', 'や', 'の', 'ね', 'よ', 'わ')
+JP_PUNCTUATION = "！？。、～・"
+
+# Difficulty tiers. Beginners (below level 10) only get tier 0: common words of
+# at most six characters. Everyone else draws from all tiers.
+TIER_BEGINNER = 0
+TIER_ADVANCED = 1
+BEGINNER_MAX_LEVEL = 10
+BEGINNER_MAX_LENGTH = 6
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+-- Candidates are numbered 0..size-1 within each (track, tier) pool, so a
+-- random pick is a primary key lookup of a random rank.
+CREATE TABLE candidate (
+    track TEXT, tier INTEGER, rank INTEGER,
+    word TEXT, kana TEXT, pos TEXT, meanings TEXT,
+    PRIMARY KEY (track, tier, rank)
+) WITHOUT ROWID;
+CREATE TABLE pool (track TEXT, tier INTEGER, size INTEGER, PRIMARY KEY (track, tier));
+-- Every kana spelling in the dictionary under its romaji/kana search key, so a
+-- query typed in any script finds the spellings jamdict knows in one probe.
+CREATE TABLE reading (key TEXT, kana TEXT, PRIMARY KEY (key, kana)) WITHOUT ROWID;
+"""
+
+def simplify_pos(all_pos: Iterable[str]) -> str:
+    """Collapses JMdict part-of-speech descriptions (lowercased) to the app's POS codes."""
+    # Priority: Verb > Adjective > Noun
+    all_pos = list(all_pos)
+    if any('verb' in p for p in all_pos):
+        if any('ichidan' in p for p in all_pos): return 'v1'
+        if any('godan' in p for p in all_pos): return 'v5'
+        if any('suru' in p for p in all_pos): return 'vs'
+        return 'verb'
+
+    if any('adjective' in p for p in all_pos):
+        if any('keiyoushi' in p for p in all_pos): return 'adj-i'
+        if any('keiyodoshi' in p for p in all_pos): return 'adj-na'
+        return 'adj'
+
+    if any('noun' in p for p in all_pos):
+        return 'noun'
+
+    return 'unknown'
+
+def _is_candidate_word(word: str) -> bool:
+    if not word:
+        return False
+    # Skip words with punctuation
+    if any(c in string.punctuation or c in JP_PUNCTUATION for c in word):
+        return False
+    # Single kana are only worth teaching as particles; single kanji go through the common check
+    if len(word) == 1 and all('\u3040' <= c <= '\u309f' or '\u30a0' <= c <= '\u30ff' for c in word):
+        return word in ALLOWED_SINGLE_KANA
+    return True
+
+def source_signature(source_db: str) -> str:
+    stat = os.stat(source_db)
+    return f"{os.path.abspath(source_db)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+def _read_entries(source: sqlite3.Connection) -> Dict[int, dict]:
+    """Everything the filters need from a jamdict database, one dict per entry."""
+    entries: Dict[int, dict] = {}
+
+    def entry(idseq):
+        e = entries.get(idseq)
+        if e is None:
+            e = entries[idseq] = {"kanji": "", "kana": "", "common": False, "pos": [], "glosses": []}
+        return e
+
+    # Forms in ID order, so the first one seen is the headword; priority tags from either kind
+    for table, key, pri in (("Kanji", "kanji", "KJP"), ("Kana", "kana", "KNP")):
+        rows = source.execute(f"""SELECT f.idseq, f.text, EXISTS (SELECT 1 FROM {pri} p WHERE p.kid = f.ID
+                                  AND p.text IN ({','.join('?' * len(COMMON_PRIORITIES))}))
+                                  FROM {table} f ORDER BY f.ID""", COMMON_PRIORITIES)
+        for idseq, text, common in rows:
+            e = entry(idseq)
+            if not e[key]:
+                e[key] = text or ""
+            e["common"] = e["common"] or bool(common)
+
+    for idseq, text in source.execute("SELECT s.idseq, p.text FROM Sense s JOIN pos p ON p.sid = s.ID"):
+        entry(idseq)["pos"].append(str(text).lower())
+    for idseq, text in source.execute("""SELECT s.idseq, g.text FROM Sense s JOIN SenseGloss g ON g.sid = s.ID
+                                         ORDER BY s.ID, g.rowid"""):
+        entry(idseq)["glosses"].append(str(text).lower())
+    return entries
+
+def build_candidate_index(source_db: str, index_file: str = INDEX_FILE) -> int:
+    """
+    Offline step: filters a jamdict database down to entries worth recommending
+    and writes them, with POS, top meanings, difficulty tier and track labels
+    precomputed, to index_file. Returns the number of candidate words.
+    """
+    source = sqlite3.connect(f"file:{source_db}?mode=ro", uri=True)
+    try:
+        entries = _read_entries(source)
+        readings = {(search_key(kana), kana) for (kana,) in source.execute("SELECT DISTINCT text FROM Kana")
+                    if kana}
+    finally:
+        source.close()
+
+    pools: Dict[Tuple[str, int], List[tuple]] = {}
+    count = 0
+    for idseq in sorted(entries):
+        e = entries[idseq]
+        word = e["kanji"] or e["kana"]
+        if not _is_candidate_word(word):
+            continue
+        beginner = e["common"] and len(word) <= BEGINNER_MAX_LENGTH
+        tier = TIER_BEGINNER if beginner else TIER_ADVANCED
+        row = (word, e["kana"], simplify_pos(e["pos"]), json.dumps(e["glosses"][:3], ensure_ascii=False))
+
+        pools.setdefault(("General", tier), []).append(row)
+        for track, keywords in TRACK_KEYWORDS.items():
+            if any(k in g for k in keywords for g in e["glosses"]):
+                pools.setdefault((track, tier), []).append(row)
+        count += 1
+
+    # Build next to the target and swap it in, so readers never see a half-built file
+    tmp_file = index_file + ".tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    conn = sqlite3.connect(tmp_file)
+    try:
+        conn.executescript(SCHEMA)
+        for (track, tier), rows in pools.items():
+            conn.executemany("INSERT INTO candidate VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(track, tier, rank) + row for rank, row in enumerate(rows)])
+            conn.execute("INSERT INTO pool VALUES (?, ?, ?)", (track, tier, len(rows)))
+        conn.executemany("INSERT INTO reading VALUES (?, ?)", sorted(readings))
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [("version", INDEX_VERSION), ("source", source_signature(source_db))])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_file, index_file)
+    return count
+
+# Read-only connections, one per thread like the jamdict ones in dictionary.py
+_local = threading.local()
+
+def _get_conn(index_file: str) -> Optional[sqlite3.Connection]:
+    try:
+        stat = os.stat(index_file)
+    except FileNotFoundError:
+        return None
+    # A rebuild swaps in a new file; reconnect when the path points somewhere else
+    key = (index_file, stat.st_ino, stat.st_mtime_ns)
+    if getattr(_local, "key", None) != key:
+        if getattr(_local, "conn", None) is not None:
+            _local.conn.close()
+        _local.conn = sqlite3.connect(f"file:{index_file}?mode=ro", uri=True)
+        _local.key = key
+    return _local.conn
+
+def is_current(source_db: str, index_file: str = INDEX_FILE) -> bool:
+    """True if index_file exists and was built by this version from source_db as it is now."""
+    conn = _get_conn(index_file)
+    if conn is None:
+        return False
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.Error:
+        return False
+    return meta.get("version") == INDEX_VERSION and meta.get("source") == source_signature(source_db)
+
+_build_lock = threading.Lock()
+
+def ensure_candidate_index(source_db: str, index_file: str = INDEX_FILE):
+    """Builds the index if it is missing or stale; a one-off cost of a few seconds."""
+    if is_current(source_db, index_file):
+        return
+    with _build_lock:
+        if not is_current(source_db, index_file):
+            logger.info("Building recommendation candidate index...")
+            build_candidate_index(source_db, index_file)
+
+def pick_candidates(track: str, limit: int, exclude_words=(), user_level: int = 1,
+                    index_file: str = INDEX_FILE, rng: Optional[random.Random] = None) -> List[dict]:
+    """
+    Up to `limit` random candidates for the track at the user's difficulty,
+    skipping exclude_words (a set is best). Themed tracks with nothing left
+    to offer fall back to "General".
+    """
+    conn = _get_conn(index_file)
+    if conn is None or limit <= 0:
+        return []
+    rng = rng or random
+    tiers = (TIER_BEGINNER,) if user_level < BEGINNER_MAX_LEVEL else (TIER_BEGINNER, TIER_ADVANCED)
+
+    results = _pick_from_track(conn, track, tiers, limit, exclude_words, rng)
+    if len(results) < limit and track != "General":
+        seen = set(exclude_words) | {r["word"] for r in results}
+        results += _pick_from_track(conn, "General", tiers, limit - len(results), seen, rng)
+    return results
+
+def readings_for_key(key: str, index_file: str = INDEX_FILE) -> List[str]:
+    """Dictionary kana spellings whose search key is key; empty until the index is built."""
+    conn = _get_conn(index_file)
+    if conn is None:
+        return []
+    try:
+        return [row[0] for row in conn.execute("SELECT kana FROM reading WHERE key = ?", (key,))]
+    except sqlite3.Error:
+        return []  # An index from before readings were stored; the startup build replaces it
+
+MAX_ROUNDS = 4
+OVERSAMPLE = 4
+
+def _pick_from_track(conn, track, tiers, limit, exclude_words, rng) -> List[dict]:
+    sizes = dict(conn.execute(f"SELECT tier, size FROM pool WHERE track = ? AND tier IN ({','.join('?' * len(tiers))})",
+                              (track, *tiers)).fetchall())
+    pools = [(tier, sizes[tier]) for tier in tiers if sizes.get(tier)]
+    total = sum(size for _, size in pools)
+
+    results, tried = [], set()
+    for _ in range(MAX_ROUNDS):
+        if len(results) >= limit or len(tried) >= total:
+            break
+        draws = min(total - len(tried), (limit - len(results)) * OVERSAMPLE)
+        picks = []
+        while len(picks) < draws:
+            n = rng.randrange(total)
+            if n not in tried:
+                tried.add(n)
+                picks.append(n)
+        for n in picks:
+            tier, rank = _locate(pools, n)
+            word, kana, pos, meanings = conn.execute(
+                "SELECT word, kana, pos, meanings FROM candidate WHERE track = ? AND tier = ? AND rank = ?",
+                (track, tier, rank)).fetchone()
+            if word in exclude_words or any(r["word"] == word for r in results):
+                continue
+            results.append({"word": word, "kana": kana, "meanings": json.loads(meanings), "pos": pos})
+            if len(results) >= limit:
+                break
+    return results
+
+def _locate(pools, n) -> Tuple[int, int]:
+    # Global position across the selected pools -> (tier, rank within that pool)
+    for tier, size in pools:
+        if n < size:
+            return tier, n
+        n -= size
+    raise IndexError(n)
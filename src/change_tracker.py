@@ -0,0 +1,63 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+class ChangeTracker:
+    """
+    Remembers what each vocabulary row looked like when it was last persisted,
+    so a save of the whole deck can write only the cards that changed and
+    delete only the words that disappeared.
+
+    Rows are snapshot tuples with the word first (data_manager uses the card's
+    field values). They are kept and compared as they are, not as hashes: a
+    hash collision would silently skip a write. The tuples share their values
+    with the cards, so each costs little more than its own pointers. Callers
+    record rows after their transaction commits; if a write fails,
+    invalidate() forces the next diff to re-read the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows: Dict[str, tuple] = {}  # word -> the persisted row
+        self.token = None
+
+    def ensure(self, token, loader: Callable[[], Iterable[tuple]]):
+        """Re-reads the persisted rows from loader() if they came from a different database."""
+        if self.token == token:
+            return
+        with self._lock:
+            if self.token == token:
+                return
+            self._rows = {row[0]: row for row in loader()}
+            self.token = token
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = {}
+            self.token = None
+
+    def record(self, rows: Iterable[tuple]):
+        """Marks rows (word first) as persisted."""
+        with self._lock:
+            if self.token is None:
+                return  # Not built yet; the next ensure() reads the current rows.
+            for row in rows:
+                self._rows[row[0]] = row
+
+    def discard(self, words: Iterable[str]):
+        with self._lock:
+            for word in words:
+                self._rows.pop(word, None)
+
+    def diff(self, rows: Dict[str, tuple]) -> Tuple[List[str], List[str]]:
+        """
+        Compares the desired rows (word -> row) with the persisted ones and
+        returns (words to upsert, words to delete).
+        """
+        with self._lock:
+            persisted = self._rows
+            changed = [word for word, row in rows.items() if persisted.get(word) != row]
+            removed = [word for word in persisted if word not in rows]
+            return changed, removed
+
+    def __len__(self):
+        return len(self._rows)
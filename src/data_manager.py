@@ -1,33 +1,95 @@
 import json
 import os
+import sys
 import sqlite3
 import threading
-import tempfile
-from dataclasses import asdict, fields
-from typing import List, Optional, Dict
+import atexit
+from datetime import datetime
+from dataclasses import fields
+from functools import lru_cache
+from operator import attrgetter
+from typing import Collection, List, Optional, Dict
 from .models import Vocabulary, GrammarLesson, UserProfile, GrammarExample, GrammarExercise
-from .db import get_db, init_db, DB_FILE
+from .db import get_db, init_db, get_db_token, run_migrations, DB_FILE
+from .due_queue import DueQueue
+from .sampler import VocabSampler
+from .distractors import DistractorIndex
+from .write_behind import WriteBehindJournal
+from .profile_store import ProfileStore
+from .change_tracker import ChangeTracker
+from .pitch import get_pitch_pattern, get_pitch_patterns
+from .search_keys import search_key
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
 VOCAB_FILE = os.path.join(DATA_DIR, 'vocab.json')
 GRAMMAR_FILE = os.path.join(DATA_DIR, 'grammar.json')
 CURRICULUM_FILE = os.path.join(DATA_DIR, 'curriculum.json')
 USER_FILE = os.path.join(DATA_DIR, 'user.json')
-
-# Ensure DB is initialized
-init_db()
+WRITE_BEHIND_LOG = os.path.join(DATA_DIR, 'pending_writes.jsonl')
 
 # Constants for vocabulary insertion
 VOCAB_KEYS = [
     'word', 'kana', 'romaji', 'meaning', 'level', 'last_review', 'tags',
     'ease_factor', 'interval', 'due_date', 'status', 'pos',
     'example_sentence', 'fsrs_stability', 'fsrs_difficulty',
-    'fsrs_retrievability', 'fsrs_last_review', 'failure_count', 'is_leech'
+    'fsrs_retrievability', 'fsrs_last_review', 'failure_count', 'is_leech',
+    'chapter',  # derived from the "chN" tag at write time
+    'pitch_pattern',
+    'search_key'  # derived from the reading at write time, see _search_key_of
 ]
 
 VOCAB_COLUMNS = ', '.join(VOCAB_KEYS)
 VOCAB_PLACEHOLDERS = ', '.join(['?'] * len(VOCAB_KEYS))
 VOCAB_INSERT_QUERY = f'INSERT OR REPLACE INTO vocabulary ({VOCAB_COLUMNS}) VALUES ({VOCAB_PLACEHOLDERS})'
+TAG_INSERT_QUERY = 'INSERT OR IGNORE INTO vocab_tags (word, tag) VALUES (?, ?)'
+
+# Managed secondary indexes (name -> definition), kept in step by _sync_indexes.
+# Changing them needs a new MIGRATIONS entry that runs _sync_indexes again.
+# NULL due dates are folded to '' so "no due date or due by today" stays a single
+# index range instead of an OR that forces the planner into a scan.
+VOCAB_INDEXES = {
+    'idx_vocab_due': "CREATE INDEX idx_vocab_due ON vocabulary(ifnull(due_date, '')) WHERE status != 'new'",
+    'idx_vocab_status': "CREATE INDEX idx_vocab_status ON vocabulary(status)",
+    # Words by status in study order (untagged chapters last), so new-word picks stop at LIMIT
+    'idx_vocab_status_chapter': "CREATE INDEX idx_vocab_status_chapter ON vocabulary(status, ifnull(chapter, 999))",
+    'idx_vocab_tags_tag': "CREATE INDEX idx_vocab_tags_tag ON vocab_tags(tag, word)",
+    # Per-card review histories in order (the rowid is implicitly the second key)
+    'idx_review_log_word': "CREATE INDEX idx_review_log_word ON review_log(word)",
+    # Romaji/kana-normalized readings, so find_vocab_items is one index probe
+    'idx_vocab_search_key': "CREATE INDEX idx_vocab_search_key ON vocabulary(search_key)",
+}
+
+# Hot-path queries, kept next to the indexes that serve them.
+DUE_VOCAB_QUERY = """
+    SELECT * FROM vocabulary
+    WHERE status != 'new'
+    AND ifnull(due_date, '') <= ?
+    ORDER BY ifnull(due_date, '') ASC
+"""
+# Feeds the in-memory due queue; served from idx_vocab_due without decoding rows.
+DUE_QUEUE_QUERY = "SELECT word, due_date FROM vocabulary WHERE status != 'new'"
+# Feeds the in-memory sampler; a covering scan of idx_vocab_status.
+SAMPLER_QUERY = "SELECT word, status FROM vocabulary"
+# Feeds the distractor index with just the fields it buckets on.
+DISTRACTOR_QUERY = "SELECT word, meaning, pos, tags FROM vocabulary"
+# New words for study, optionally restricted to words carrying one of the given tags.
+NEW_VOCAB_QUERY = "SELECT * FROM vocabulary WHERE status = 'new' {tag_filter} ORDER BY {order} LIMIT ?"
+NEW_VOCAB_TAG_FILTER = "AND word IN (SELECT word FROM vocab_tags WHERE tag IN ({placeholders}))"
+# FSRS state of every reviewed card, for whole-deck rescheduling
+SCHEDULE_QUERY = """SELECT word, status, fsrs_stability, fsrs_difficulty, fsrs_last_review FROM vocabulary
+WHERE fsrs_last_review IS NOT NULL AND status != 'new' AND status != 'suspended'"""
+SCHEDULE_UPDATE_QUERY = "UPDATE vocabulary SET due_date = ?, interval = ?, fsrs_retrievability = ? WHERE word = ?"
+# Memory state and due date of every card the forecast should expect back
+FORECAST_QUERY = """SELECT fsrs_stability, fsrs_difficulty, fsrs_last_review, due_date FROM vocabulary
+WHERE status != 'new' AND status != 'suspended'"""
+# Rows saved before pitch patterns were stored, for the background backfill
+PITCH_BACKFILL_QUERY = "SELECT word, kana FROM vocabulary WHERE pitch_pattern IS NULL LIMIT ?"
+PITCH_UPDATE_QUERY = "UPDATE vocabulary SET pitch_pattern = ? WHERE word = ? AND pitch_pattern IS NULL"
+# A word typed in any script: its reading key on idx_vocab_search_key, or the
+# word itself on the primary key (kanji are their own key), in one OR-by-union.
+FIND_VOCAB_QUERY = "SELECT * FROM vocabulary WHERE search_key = ? OR word = ?"
+# Two ranges on idx_vocab_status instead of `status != 'new'`, which can only scan.
+LEARNED_COUNT_QUERY = "SELECT count(*) FROM vocabulary WHERE status < 'new' OR status > 'new'"
 
 def _vocab_to_row(v: Vocabulary) -> tuple:
     """
@@ -53,25 +115,80 @@ def _vocab_to_row(v: Vocabulary) -> tuple:
         v.fsrs_retrievability,
         v.fsrs_last_review,
         v.failure_count,
-        v.is_leech
+        v.is_leech,
+        _chapter_of(v.tags),
+        v.pitch_pattern,
+        _search_key_of(v.kana or v.word)
     )
 
-def _migrate_schema():
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(vocabulary)")
-        columns = [row['name'] for row in cursor.fetchall()]
-
-        if 'failure_count' not in columns:
-            cursor.execute("ALTER TABLE vocabulary ADD COLUMN failure_count INTEGER DEFAULT 0")
+def _chapter_of(tags: List[str]) -> Optional[int]:
+    """Genki chapter from a "chN" tag, if any."""
+    for t in tags:
+        if t.startswith('ch') and t[2:].isdigit():
+            return int(t[2:])
+    return None
 
-        if 'is_leech' not in columns:
-            cursor.execute("ALTER TABLE vocabulary ADD COLUMN is_leech BOOLEAN DEFAULT 0")
+# Whole-deck saves rebuild every row to diff it, so keys are memoized per reading
+_search_key_of = lru_cache(maxsize=65536)(search_key)
 
+def _add_column(name: str, definition: str, backfill=None):
+    """
+    Migration step adding a vocabulary column and filling it in for existing
+    rows. Both happen in one transaction, so the column never exists without
+    its backfill; a database that already has the column is left alone.
+    """
+    def step():
+        with get_db() as conn:
+            conn.execute("BEGIN")
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(vocabulary)")}
+            if name not in columns:
+                cursor = conn.cursor()
+                cursor.execute(f"ALTER TABLE vocabulary ADD COLUMN {name} {definition}")
+                if backfill is not None:
+                    backfill(cursor)
+            conn.commit()
+    return step
+
+def _backfill_tags(cursor):
+    # chapter was introduced together with vocab_tags: derive both from the JSON tags
+    cursor.execute("SELECT word, tags FROM vocabulary")
+    rows = [(row['word'], _decode_tags(row['tags'])) for row in cursor.fetchall()]
+    cursor.executemany("UPDATE vocabulary SET chapter = ? WHERE word = ?",
+                       [(_chapter_of(tags), word) for word, tags in rows])
+    cursor.execute("DELETE FROM vocab_tags")
+    cursor.executemany(TAG_INSERT_QUERY, [(word, t) for word, tags in rows for t in tags])
+
+def _backfill_search_keys(cursor):
+    cursor.execute("SELECT word, kana FROM vocabulary")
+    cursor.executemany("UPDATE vocabulary SET search_key = ? WHERE word = ?",
+                       [(_search_key_of(row['kana'] or row['word']), row['word']) for row in cursor.fetchall()])
+
+def _sync_indexes():
+    """Creates missing VOCAB_INDEXES and rebuilds any whose stored definition differs."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name IN ('vocabulary', 'vocab_tags', 'review_log') AND sql IS NOT NULL")
+        existing = {row['name']: row['sql'] for row in cursor.fetchall()}
+
+        for name, definition in VOCAB_INDEXES.items():
+            if existing.get(name) == definition:
+                continue
+            if name in existing:
+                cursor.execute(f"DROP INDEX {name}")
+            cursor.execute(definition)
         conn.commit()
 
-def _migrate_json_to_db():
-    """Migrate data from vocab.json to SQLite if DB is empty."""
+def _status_from_history(item: dict) -> str:
+    """Status for a vocab.json entry saved before cards had one."""
+    level = item.get('level', 0)
+    if level >= 5 and item.get('interval', 0) > 21:
+        return 'mastered'
+    if level > 0 or item.get('last_review'):
+        return 'learning'
+    return 'new'
+
+def _import_vocab_json():
+    """Import vocab.json into SQLite if the vocabulary table is empty."""
     if not os.path.exists(VOCAB_FILE):
         return
 
@@ -84,40 +201,167 @@ def _migrate_json_to_db():
             print("Migrating vocab.json to SQLite database...")
             with open(VOCAB_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                vocab_list = [Vocabulary(**item) for item in data]
+            for item in data:
+                if not item.get('status'):
+                    item['status'] = _status_from_history(item)
+            vocab_list = [Vocabulary(**item) for item in data]
 
             # Bulk insert
-            cursor.executemany(VOCAB_INSERT_QUERY, [_vocab_to_row(v) for v in vocab_list])
+            _write_vocab_rows(cursor, vocab_list, replace_tags=False)
             conn.commit()
             print("Migration complete.")
 
-def _insert_vocab_item(cursor, v: Vocabulary):
-    cursor.execute(VOCAB_INSERT_QUERY, _vocab_to_row(v))
+def _write_vocab_rows(cursor, items: List[Vocabulary], replace_tags: bool = True) -> List[tuple]:
+    """
+    Upserts vocabulary rows and their vocab_tags rows. replace_tags=False skips
+    clearing old tags, for callers that just emptied the tables. Returns the
+    items' snapshots so callers can hand them to _CHANGES once committed.
+    """
+    cursor.executemany(VOCAB_INSERT_QUERY, [_vocab_to_row(v) for v in items])
+    if replace_tags:
+        cursor.executemany("DELETE FROM vocab_tags WHERE word = ?", [(v.word,) for v in items])
+    cursor.executemany(TAG_INSERT_QUERY, [(v.word, t) for v in items for t in v.tags])
+    return [_snapshot(v) for v in items]
+
+def _insert_vocab_item(cursor, v: Vocabulary) -> List[tuple]:
+    return _write_vocab_rows(cursor, [v])
+
+# Low-cardinality text columns; interning makes every cached card share one copy
+_INTERNED_COLUMNS = ('status', 'pos', 'due_date', 'last_review', 'pitch_pattern')
 
 def _row_to_vocab(row) -> Vocabulary:
     data = dict(row)
-    if data['tags']:
-        try:
-            data['tags'] = json.loads(data['tags'])
-        except json.JSONDecodeError:
-            data['tags'] = []
-    else:
-        data['tags'] = []
+    data['tags'] = _decode_tags(data['tags'])
+    data.pop('chapter', None)
+    data.pop('search_key', None)
+    for key in _INTERNED_COLUMNS:
+        if data.get(key):
+            data[key] = sys.intern(data[key])
     return Vocabulary(**data)
 
-# Perform migration check on module load
-_migrate_schema()
-_migrate_json_to_db()
+@lru_cache(maxsize=4096)
+def _parse_tags(raw: str) -> tuple:
+    try:
+        return tuple(sys.intern(t) for t in json.loads(raw))
+    except (json.JSONDecodeError, TypeError):
+        return ()
+
+def _decode_tags(raw) -> List[str]:
+    # Decks repeat a handful of tag combinations, so parse each JSON string once
+    # and hand out fresh lists of the shared, interned tag strings.
+    if not raw:
+        return []
+    return list(_parse_tags(raw))
 
 # In-memory cache
 _VOCAB_CACHE: Optional[List[Vocabulary]] = None
 _VOCAB_MAP: Optional[Dict[str, Vocabulary]] = None
 
+def _ensure_index(index, loader):
+    """Returns an in-memory index, rebuilding it if it describes another database."""
+    token = get_db_token()
+    if index.token != token:
+        # Rebuilds read the table, so acknowledged write-behind rows must land first.
+        # Done before ensure() takes the index lock to keep lock order fixed.
+        flush_pending_writes()
+        index.ensure(token, loader)
+    return index
+
+# Due-date ordered queue of learned words, kept in sync by add_vocab_item
+_DUE_QUEUE = DueQueue()
+
+def _load_due_queue_rows():
+    with get_db() as conn:
+        return [(row['word'], row['due_date']) for row in conn.execute(DUE_QUEUE_QUERY)]
+
+def _get_due_queue() -> DueQueue:
+    return _ensure_index(_DUE_QUEUE, _load_due_queue_rows)
+
+# Per-status word arrays for random picks, kept in sync by add_vocab_item
+_SAMPLER = VocabSampler()
+
+def _load_sampler_rows():
+    with get_db() as conn:
+        return [(row['word'], row['status']) for row in conn.execute(SAMPLER_QUERY)]
+
+def _get_sampler() -> VocabSampler:
+    return _ensure_index(_SAMPLER, _load_sampler_rows)
+
+# Similarity buckets for multiple-choice distractors, kept in sync by add_vocab_item
+_DISTRACTORS = DistractorIndex()
+
+def _load_distractor_rows():
+    with get_db() as conn:
+        return [(row['word'], row['meaning'], row['pos'], _decode_tags(row['tags']))
+                for row in conn.execute(DISTRACTOR_QUERY)]
+
+def _get_distractor_index() -> DistractorIndex:
+    return _ensure_index(_DISTRACTORS, _load_distractor_rows)
+
+# Fingerprints of the persisted rows, so save_vocab only writes what changed
+_CHANGES = ChangeTracker()
+
+# Every field but tags, read in one C-level call
+_SNAPSHOT_FIELDS = attrgetter(*[f.name for f in fields(Vocabulary) if f.name != 'tags'])
+
+def _snapshot(v: Vocabulary) -> tuple:
+    """
+    The card's field values, word first, as _CHANGES compares them. Derived
+    columns (chapter, search_key) follow from these fields, so saves can skip
+    encoding unchanged cards into rows; only the cards that differ pay for it.
+    """
+    return (v.word, _SNAPSHOT_FIELDS(v), tuple(v.tags))
+
+def _load_change_rows():
+    with get_db() as conn:
+        return [_snapshot(_row_to_vocab(row)) for row in conn.execute("SELECT * FROM vocabulary")]
+
+def _get_change_tracker() -> ChangeTracker:
+    return _ensure_index(_CHANGES, _load_change_rows)
+
+# Bumped on every card write, so derived results (e.g. the forecast) know when to recompute
+_DECK_VERSION = 0
+
+def _bump_deck_version():
+    global _DECK_VERSION
+    _DECK_VERSION += 1
+
+def get_deck_version():
+    return (get_db_token(), _DECK_VERSION)
+
+def _index_vocab_item(item: Vocabulary):
+    """Brings the in-memory indexes up to date after a card was written."""
+    _bump_deck_version()
+    _DUE_QUEUE.update(item.word, item.status, item.due_date)
+    _SAMPLER.update(item.word, item.status)
+    _DISTRACTORS.update(item.word, item.meaning, item.pos, item.tags)
+
+def _unindex_vocab_word(word: str):
+    _bump_deck_version()
+    _DUE_QUEUE.update(word, None, None)
+    _SAMPLER.discard(word)
+    _DISTRACTORS.discard(word)
+
+def _get_vocab_items(words: List[str]) -> List[Vocabulary]:
+    """Fetches several items by primary key, preserving the order of words."""
+    if not words:
+        return []
+    if _VOCAB_MAP is not None:
+        return [_VOCAB_MAP[w] for w in words if w in _VOCAB_MAP]
+
+    flush_pending_writes()
+    with get_db() as conn:
+        placeholders = ', '.join(['?'] * len(words))
+        rows = conn.execute(f"SELECT * FROM vocabulary WHERE word IN ({placeholders})", words).fetchall()
+    by_word = {row['word']: _row_to_vocab(row) for row in rows}
+    return [by_word[w] for w in words if w in by_word]
+
 def load_vocab() -> List[Vocabulary]:
     global _VOCAB_CACHE, _VOCAB_MAP
     if _VOCAB_CACHE is not None:
         return list(_VOCAB_CACHE)
 
+    flush_pending_writes()
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM vocabulary")
@@ -127,13 +371,21 @@ def load_vocab() -> List[Vocabulary]:
         _VOCAB_CACHE = vocab_list
         _VOCAB_MAP = {v.word: v for v in vocab_list}
 
+        # Callers mutate these objects and hand them back to save_vocab, so
+        # snapshot them now while they still match the table.
+        _CHANGES.invalidate()
+        _CHANGES.ensure(get_db_token(), lambda: [_snapshot(v) for v in vocab_list])
+
         return list(_VOCAB_CACHE)
 
 def save_vocab(vocab_list: List[Vocabulary]):
     """
-    Legacy method: overwrites the entire vocabulary in the DB.
-    Optimized to use transaction for speed, but still O(N).
-    Prefer using add_vocab_item or update_vocab_item for single items.
+    Makes the stored vocabulary match vocab_list.
+    Only cards that differ from what was last persisted are upserted and only
+    words missing from the list are deleted, so saving the whole deck after
+    one review writes one row. Finding them compares a cheap field snapshot
+    per card (about a microsecond each); only changed cards are encoded.
+    Prefer add_vocab_item for single items.
     """
     global _VOCAB_CACHE, _VOCAB_MAP
 
@@ -141,21 +393,61 @@ def save_vocab(vocab_list: List[Vocabulary]):
     _VOCAB_CACHE = list(vocab_list)
     _VOCAB_MAP = {v.word: v for v in _VOCAB_CACHE}
 
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM vocabulary")
-        # Optimized bulk insert using executemany and helper
-        cursor.executemany(VOCAB_INSERT_QUERY, [_vocab_to_row(v) for v in vocab_list])
-        conn.commit()
+    tracker = _get_change_tracker()
+    changed, removed = tracker.diff({v.word: _snapshot(v) for v in _VOCAB_CACHE})
+    if not changed and not removed:
+        return
+
+    items = [_VOCAB_MAP[word] for word in changed]
+    _fill_pitch_patterns(items)
+    try:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            if removed:
+                cursor.executemany("DELETE FROM vocabulary WHERE word = ?", [(w,) for w in removed])
+                cursor.executemany("DELETE FROM vocab_tags WHERE word = ?", [(w,) for w in removed])
+            written = _write_vocab_rows(cursor, items)
+            conn.commit()
+    except Exception:
+        tracker.invalidate()
+        raise
+
+    tracker.record(written)
+    tracker.discard(removed)
+    for item in items:
+        _index_vocab_item(item)
+    for word in removed:
+        _unindex_vocab_word(word)
+
+def _fill_pitch_patterns(items: List[Vocabulary]):
+    # Bulk imports arrive through save_vocab; analyze their new words in one batch
+    pending = [v for v in items if v.pitch_pattern is None]
+    if pending:
+        patterns = get_pitch_patterns([(v.word, v.kana) for v in pending])
+        for v, pattern in zip(pending, patterns):
+            v.pitch_pattern = sys.intern(pattern)
 
 def add_vocab_item(item: Vocabulary):
     global _VOCAB_CACHE, _VOCAB_MAP
 
-    with get_db() as conn:
-        cursor = conn.cursor()
-        _insert_vocab_item(cursor, item)
-        conn.commit()
+    if item.pitch_pattern is None:
+        item.pitch_pattern = get_pitch_pattern(item.word, item.kana)
+
+    journal = _WRITE_BEHIND
+    if journal is not None:
+        # Acknowledge from memory; the journal persists it with the next group
+        journal.record_vocab(item)
+    else:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            written = _insert_vocab_item(cursor, item)
+            conn.commit()
+        _CHANGES.record(written)
 
+    _index_vocab_item(item)
+    _cache_vocab_item(item)
+
+def _cache_vocab_item(item: Vocabulary):
     # Update cache if it exists
     if _VOCAB_MAP is not None:
         if item.word in _VOCAB_MAP:
@@ -175,12 +467,36 @@ def update_vocab_item(item: Vocabulary):
     # Same as add since we use INSERT OR REPLACE
     add_vocab_item(item)
 
+def save_reviews(items: List[Vocabulary], profile: UserProfile):
+    """
+    Writes a batch of reviewed cards and the profile they earned rewards on
+    in a single transaction, so a whole quiz session costs one commit.
+    """
+    _fill_pitch_patterns(items)
+    journal = _WRITE_BEHIND
+    if journal is not None:
+        for item in items:
+            journal.record_vocab(item)
+        journal.record_profile(profile)
+    else:
+        _flush_writes(items, profile)
+
+    for item in items:
+        _index_vocab_item(item)
+        _cache_vocab_item(item)
+
 def get_vocab_item(word: str) -> Optional[Vocabulary]:
     global _VOCAB_MAP
 
     if _VOCAB_MAP is not None:
         return _VOCAB_MAP.get(word)
 
+    journal = _WRITE_BEHIND
+    if journal is not None:
+        pending = journal.get_vocab(word)
+        if pending is not None:
+            return pending
+
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM vocabulary WHERE word = ?", (word,))
@@ -189,29 +505,150 @@ def get_vocab_item(word: str) -> Optional[Vocabulary]:
             return _row_to_vocab(row)
     return None
 
+def find_vocab_items(query: str) -> List[Vocabulary]:
+    """
+    Deck words matching query as typed in any script: romaji, hiragana or
+    katakana readings (half- or full-width) and exact words.
+    """
+    flush_pending_writes()
+    with get_db() as conn:
+        rows = conn.execute(FIND_VOCAB_QUERY, (search_key(query), query.strip())).fetchall()
+    return [_row_to_vocab(row) for row in rows]
+
 def get_due_vocab_items(date_str: str) -> List[Vocabulary]:
+    flush_pending_writes()
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM vocabulary
-            WHERE status != 'new'
-            AND (due_date IS NULL OR due_date <= ?)
-            ORDER BY due_date ASC
-        """, (date_str,))
+        cursor.execute(DUE_VOCAB_QUERY, (date_str,))
         rows = cursor.fetchall()
         return [_row_to_vocab(row) for row in rows]
 
-def get_random_distractors(exclude_word: str, limit: int = 3) -> List[Vocabulary]:
+def get_new_vocab_items(limit: int, tags: Optional[List[str]] = None, by_chapter: bool = False) -> List[Vocabulary]:
+    """
+    Up to `limit` new words, optionally only those carrying one of `tags`.
+    by_chapter orders by Genki chapter (untagged last), otherwise by insertion.
+    While the deck is cached the cached objects are returned, so callers that
+    edit them and save the loaded deck persist their changes.
+    """
+    params = []
+    tag_filter = ""
+    if tags:
+        tag_filter = NEW_VOCAB_TAG_FILTER.format(placeholders=', '.join(['?'] * len(tags)))
+        params.extend(tags)
+    order = "ifnull(chapter, 999), rowid" if by_chapter else "rowid"
+    params.append(limit)
+
+    flush_pending_writes()
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM vocabulary
-            WHERE word != ?
-            ORDER BY RANDOM()
-            LIMIT ?
-        """, (exclude_word, limit))
+        rows = conn.execute(NEW_VOCAB_QUERY.format(tag_filter=tag_filter, order=order), params).fetchall()
+    cached = _VOCAB_MAP or {}
+    return [cached.get(row['word']) or _row_to_vocab(row) for row in rows]
+
+def _read_columns(query: str) -> Dict[str, list]:
+    """Runs query and returns its result as parallel lists keyed by column name."""
+    flush_pending_writes()
+    with get_db() as conn:
+        cursor = conn.execute(query)
+        names = [d[0] for d in cursor.description]
         rows = cursor.fetchall()
-        return [_row_to_vocab(row) for row in rows]
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+def get_schedule_columns() -> Dict[str, list]:
+    """FSRS state of every reviewed, unsuspended card as parallel column lists."""
+    return _read_columns(SCHEDULE_QUERY)
+
+def get_forecast_columns() -> Dict[str, list]:
+    """Stability, difficulty, last review and due date of every active learned card."""
+    return _read_columns(FORECAST_QUERY)
+
+def update_schedules(updates: List[tuple]):
+    """
+    Writes (word, status, due_date, interval, retrievability) tuples in one
+    executemany and brings the cache and due queue along.
+    """
+    if not updates:
+        return
+    flush_pending_writes()
+    with get_db() as conn:
+        conn.executemany(SCHEDULE_UPDATE_QUERY,
+                         [(due, interval, r, word) for word, _, due, interval, r in updates])
+        conn.commit()
+
+    _bump_deck_version()
+    for word, status, due, interval, r in updates:
+        _DUE_QUEUE.update(word, status, due)
+    if _VOCAB_MAP is None:
+        _CHANGES.invalidate()
+        return
+    written = []
+    for word, _, due, interval, r in updates:
+        item = _VOCAB_MAP.get(word)
+        if item is not None:
+            item.due_date, item.interval, item.fsrs_retrievability = due, interval, r
+            written.append(_snapshot(item))
+    _CHANGES.record(written)
+
+PITCH_BACKFILL_BATCH = 500
+
+def backfill_pitch_patterns(batch_size: int = PITCH_BACKFILL_BATCH) -> int:
+    """
+    Computes and stores pitch_pattern for rows that have none, batch_size
+    rows per transaction, and returns how many were filled. Only NULL columns
+    are written, so rows saved meanwhile are never overwritten.
+    """
+    filled = 0
+    while True:
+        with get_db() as conn:
+            rows = conn.execute(PITCH_BACKFILL_QUERY, (batch_size,)).fetchall()
+        if not rows:
+            return filled
+        patterns = list(zip(get_pitch_patterns([(row['word'], row['kana']) for row in rows]),
+                            [row['word'] for row in rows]))
+        with get_db() as conn:
+            conn.executemany(PITCH_UPDATE_QUERY, patterns)
+            conn.commit()
+        filled += len(patterns)
+
+        with _user_lock:
+            if _VOCAB_MAP is None:
+                _CHANGES.invalidate()
+                continue
+            written = []
+            for pattern, word in patterns:
+                item = _VOCAB_MAP.get(word)
+                if item is not None and item.pitch_pattern is None:
+                    item.pitch_pattern = sys.intern(pattern)
+                    written.append(_snapshot(item))
+            _CHANGES.record(written)
+
+def start_pitch_backfill() -> threading.Thread:
+    """Runs backfill_pitch_patterns on a daemon thread, e.g. at API startup."""
+    def run():
+        try:
+            count = backfill_pitch_patterns()
+        except sqlite3.Error as e:
+            print(f"Pitch pattern backfill stopped: {e}")
+            return
+        if count:
+            print(f"Stored pitch patterns for {count} words.")
+
+    thread = threading.Thread(target=run, name="pitch-backfill", daemon=True)
+    thread.start()
+    return thread
+
+def get_due_vocab_count(date_str: str) -> int:
+    return _get_due_queue().count(date_str)
+
+def get_random_due_vocab_item(date_str: str) -> Optional[Vocabulary]:
+    """Picks one due card without materializing the rest of the backlog."""
+    word = _get_due_queue().sample(date_str)
+    if word is None:
+        return None
+    return get_vocab_item(word)
+
+def get_random_distractors(exclude_word: str, limit: int = 3) -> List[Vocabulary]:
+    words = _get_sampler().sample(limit, exclude={exclude_word})
+    return _get_vocab_items(words)
 
 def get_vocab_count() -> int:
     with get_db() as conn:
@@ -222,22 +659,73 @@ def get_vocab_count() -> int:
 def get_learned_vocab_count() -> int:
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT count(*) FROM vocabulary WHERE status != 'new'")
+        cursor.execute(LEARNED_COUNT_QUERY)
         return cursor.fetchone()[0]
 
+def get_similar_distractors(item: Vocabulary, limit: int = 3) -> List[Vocabulary]:
+    """
+    Distractors that share a meaning word, part of speech or chapter with item,
+    topped up with random words when the similarity buckets run dry.
+    """
+    index = _get_distractor_index()
+    words = index.pick(item.word, item.meaning, item.pos, item.tags, limit)
+    _top_up_distractors(index, item, words, limit)
+    return _get_vocab_items(words)
+
+def _top_up_distractors(index: DistractorIndex, item: Vocabulary, words: List[str], limit: int,
+                        exclude: Collection[str] = ()):
+    """
+    Fills words up to limit with random deck words, skipping exclude and, as
+    DistractorIndex.pick does, any word with item's meaning.
+    """
+    skip = set(exclude) | set(words) | {item.word}
+    while len(words) < limit:
+        sampled = _get_sampler().sample(limit - len(words), exclude=skip)
+        if not sampled:
+            break
+        skip.update(sampled)
+        words += [w for w in sampled if not index.shares_meaning(w, item.meaning)]
+
 def get_random_learned_vocab_item() -> Optional[Vocabulary]:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM vocabulary
-            WHERE status != 'new'
-            ORDER BY RANDOM()
-            LIMIT 1
-        """)
-        row = cursor.fetchone()
-        if row:
-            return _row_to_vocab(row)
-    return None
+    sampler = _get_sampler()
+    learned = [s for s in sampler.statuses() if s is not None and s != 'new']
+    words = sampler.sample(1, statuses=learned)
+    if not words:
+        return None
+    return get_vocab_item(words[0])
+
+def get_quiz_session_items(date_str: str, n: int) -> List[Vocabulary]:
+    """
+    Up to n distinct cards for a quiz session: due cards first, topped up with
+    other learned cards when fewer than n are due. One draw from the due queue
+    and one fetch for the whole session.
+    """
+    words = _get_due_queue().sample_many(date_str, n)
+    if len(words) < n:
+        sampler = _get_sampler()
+        learned = [s for s in sampler.statuses() if s is not None and s != 'new']
+        words += sampler.sample(n - len(words), exclude=set(words), statuses=learned)
+    return _get_vocab_items(words)
+
+def get_session_distractors(items: List[Vocabulary], limit: int = 3) -> Dict[str, List[Vocabulary]]:
+    """
+    Distractors for every item of a quiz session, keyed by word. They are drawn
+    without replacement: no word is offered twice, or offered while it is one
+    of the session's answers, unless the deck is too small to avoid it.
+    """
+    index = _get_distractor_index()
+    used = {item.word for item in items}
+    picks: Dict[str, List[str]] = {}
+    for item in items:
+        words = index.pick(item.word, item.meaning, item.pos, item.tags, limit, exclude=used)
+        _top_up_distractors(index, item, words, limit, exclude=used)
+        # Small deck: fall back to words already used elsewhere in the session
+        _top_up_distractors(index, item, words, limit)
+        used.update(words)
+        picks[item.word] = words
+
+    fetched = {v.word: v for v in _get_vocab_items(list({w for words in picks.values() for w in words}))}
+    return {word: [fetched[w] for w in words if w in fetched] for word, words in picks.items()}
 
 def load_grammar() -> List[GrammarLesson]:
     if not os.path.exists(GRAMMAR_FILE):
@@ -264,20 +752,215 @@ _user_lock = threading.RLock()
 def get_user_lock():
     return _user_lock
 
-def load_user_profile() -> UserProfile:
+# Cached, dirty-tracked profile backed by the user_profile tables
+_PROFILE_STORE = ProfileStore()
+
+def _get_profile_store(conn) -> ProfileStore:
+    token = get_db_token()
+    if _PROFILE_STORE.token != token:
+        _PROFILE_STORE.load(conn, token)
+    return _PROFILE_STORE
+
+def _import_user_json():
+    """Import user.json into the profile tables if they are still empty."""
     if not os.path.exists(USER_FILE):
-        return UserProfile()
+        return
+
     with _user_lock:
-        with open(USER_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return UserProfile(**data)
+        with get_db() as conn:
+            store = _get_profile_store(conn)
+            if store.has_row():
+                return
+
+            print("Migrating user.json to SQLite database...")
+            with open(USER_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            store.save(conn, UserProfile(**data))
+            conn.commit()
+            print("Migration complete.")
+
+def load_user_profile() -> UserProfile:
+    journal = _WRITE_BEHIND
+    if journal is not None:
+        pending = journal.get_profile()
+        if pending is not None:
+            return pending
+    with _user_lock:
+        with get_db() as conn:
+            return _get_profile_store(conn).get()
 
 def save_user_profile(profile: UserProfile):
+    journal = _WRITE_BEHIND
+    if journal is not None:
+        journal.record_profile(profile)
+        return
     with _user_lock:
-        # Atomic write: write to temp file then rename
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, dir=DATA_DIR, encoding='utf-8') as f:
-            json.dump(asdict(profile), f, indent=2, ensure_ascii=False)
-            f.flush()
-            os.fsync(f.fileno())
-            temp_name = f.name
-        os.replace(temp_name, USER_FILE)
+        with get_db() as conn:
+            _save_profile(conn, profile)
+            conn.commit()
+
+def _save_profile(conn, profile: UserProfile):
+    try:
+        _get_profile_store(conn).save(conn, profile)
+    except Exception:
+        # The transaction will be rolled back; forget the state we assumed was written
+        _PROFILE_STORE.invalidate()
+        raise
+
+# --- Review log ---
+# Reviews are buffered and appended in batches; the optimizer reads them back
+# one card history at a time.
+
+REVIEW_LOG_BATCH = 50
+REVIEW_LOG_INSERT_QUERY = "INSERT INTO review_log (word, rating, reviewed_at, elapsed_days, state) VALUES (?, ?, ?, ?, ?)"
+REVIEW_HISTORY_QUERY = "SELECT word, rating, elapsed_days, state FROM review_log ORDER BY word, id"
+
+_review_lock = threading.Lock()
+_REVIEW_BUFFER: List[tuple] = []
+# The database the buffered reviews belong to (see get_db_token)
+_REVIEW_BUFFER_TOKEN = None
+
+def record_review(word: str, rating: int, reviewed_at: str, elapsed_days: float, state: int):
+    global _REVIEW_BUFFER_TOKEN
+    token = get_db_token()
+    with _review_lock:
+        moved = _REVIEW_BUFFER and _REVIEW_BUFFER_TOKEN != token
+    if moved:
+        # Reviews of the previous database must not end up in this one
+        flush_review_log()
+    with _review_lock:
+        if not _REVIEW_BUFFER:
+            _REVIEW_BUFFER_TOKEN = token
+        _REVIEW_BUFFER.append((word, int(rating), reviewed_at, elapsed_days, int(state)))
+        full = len(_REVIEW_BUFFER) >= REVIEW_LOG_BATCH
+    if full:
+        flush_review_log()
+
+def flush_review_log():
+    global _REVIEW_BUFFER, _REVIEW_BUFFER_TOKEN
+    with _review_lock:
+        pending, _REVIEW_BUFFER = _REVIEW_BUFFER, []
+        token, _REVIEW_BUFFER_TOKEN = _REVIEW_BUFFER_TOKEN, None
+    if not pending:
+        return
+    if token == get_db_token():
+        with get_db() as conn:
+            conn.executemany(REVIEW_LOG_INSERT_QUERY, pending)
+            conn.commit()
+        return
+    # The app has since moved to another database; write back to the one the
+    # reviews came from, without creating it if it no longer exists.
+    try:
+        conn = sqlite3.connect(f"file:{token[0]}?mode=rw", uri=True)
+        try:
+            with conn:
+                conn.executemany(REVIEW_LOG_INSERT_QUERY, pending)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Dropped {len(pending)} reviews for {token[0]}: {e}")
+
+def get_review_count(min_elapsed_days: float = 0) -> int:
+    flush_review_log()
+    with get_db() as conn:
+        return conn.execute("SELECT count(*) FROM review_log WHERE elapsed_days >= ?", (min_elapsed_days,)).fetchone()[0]
+
+def iter_review_log(chunk_size: int = 10000):
+    """Yields review_log rows ordered by word then time, fetched chunk_size at a time."""
+    flush_review_log()
+    with get_db() as conn:
+        cursor = conn.execute(REVIEW_HISTORY_QUERY)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+
+def load_fsrs_parameters() -> Optional[List[float]]:
+    with get_db() as conn:
+        row = conn.execute("SELECT parameters FROM fsrs_parameters WHERE id = 1").fetchone()
+    return json.loads(row['parameters']) if row else None
+
+def save_fsrs_parameters(parameters: List[float], review_count: int):
+    with get_db() as conn:
+        conn.execute("INSERT OR REPLACE INTO fsrs_parameters (id, parameters, review_count, updated_at) VALUES (1, ?, ?, ?)",
+                     (json.dumps([float(p) for p in parameters]), review_count, datetime.now().isoformat()))
+        conn.commit()
+
+# --- Write-behind ---
+# Optional: when enabled, card and profile writes are acknowledged from memory
+# and persisted in grouped transactions by a WriteBehindJournal. Aggregate SQL
+# counts (get_vocab_count, get_learned_vocab_count) may lag by one flush
+# interval; item reads and bulk loads always see pending writes.
+
+_WRITE_BEHIND: Optional[WriteBehindJournal] = None
+
+def _flush_writes(items: List[Vocabulary], profile: Optional[UserProfile]):
+    # Cards and profile land in a single transaction
+    written = []
+    with _user_lock:
+        with get_db() as conn:
+            if items:
+                written = _write_vocab_rows(conn.cursor(), items)
+            if profile is not None:
+                _save_profile(conn, profile)
+            conn.commit()
+        _CHANGES.record(written)
+
+def flush_pending_writes():
+    journal = _WRITE_BEHIND
+    if journal is not None:
+        journal.flush()
+
+def enable_write_behind(interval: float = 2.0, max_pending: int = 50) -> WriteBehindJournal:
+    global _WRITE_BEHIND
+    if _WRITE_BEHIND is None:
+        journal = WriteBehindJournal(WRITE_BEHIND_LOG, _flush_writes, interval=interval,
+                                     max_pending=max_pending, outer_lock=_user_lock)
+        journal.replay()
+        journal.start()
+        _WRITE_BEHIND = journal
+    return _WRITE_BEHIND
+
+def disable_write_behind():
+    global _WRITE_BEHIND
+    journal = _WRITE_BEHIND
+    if journal is None:
+        return
+    journal.stop()
+    _WRITE_BEHIND = None
+    # Catch anything recorded while the timer was stopping
+    journal.flush()
+
+def _replay_write_behind_log():
+    """Applies writes a crashed write-behind process acknowledged but never flushed."""
+    if os.path.exists(WRITE_BEHIND_LOG):
+        count = WriteBehindJournal(WRITE_BEHIND_LOG, _flush_writes, outer_lock=_user_lock).replay()
+        print(f"Replayed {count} pending writes.")
+
+# --- Schema migrations ---
+# Ordered (version, step) pairs applied by run_migrations against PRAGMA
+# user_version. Append new steps with the next version; never renumber or
+# edit a released one, and keep every step safe to run twice.
+MIGRATIONS = [
+    (1, init_db),
+    (2, _add_column('failure_count', 'INTEGER DEFAULT 0')),
+    (3, _add_column('is_leech', 'BOOLEAN DEFAULT 0')),
+    (4, _add_column('chapter', 'INTEGER', _backfill_tags)),
+    # Left NULL here; backfill_pitch_patterns() fills existing rows off the request path
+    (5, _add_column('pitch_pattern', 'TEXT')),
+    (6, _add_column('search_key', 'TEXT', _backfill_search_keys)),
+    (7, _sync_indexes),
+    (8, _import_vocab_json),
+    (9, _import_user_json),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate_database() -> int:
+    """Creates or upgrades the database to SCHEMA_VERSION; a no-op on a current one."""
+    return run_migrations(MIGRATIONS)
+
+migrate_database()
+_replay_write_behind_log()
+atexit.register(disable_write_behind)
+atexit.register(flush_review_log)
@@ -1,52 +1,294 @@
 import sqlite3
 import os
 import json
+import atexit
+import threading
 from contextlib import contextmanager
+from typing import Callable, Sequence, Tuple
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
-DB_FILE = os.path.join(DATA_DIR, 'vocab.db')
+# JAPANESE_APP_DB points the app at another database file, e.g. a scratch copy
+DB_FILE = os.environ.get("JAPANESE_APP_DB") or os.path.join(DATA_DIR, 'vocab.db')
+
+# Applied once when a pooled connection is opened, not on every get_db() call.
+# WAL lets readers proceed while a writer commits, and synchronous=NORMAL is
+# durable in WAL mode (only the last transactions can be lost on power failure).
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",     # ~16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",   # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+)
+
+class ConnectionPool:
+    """
+    Hands out one reusable SQLite connection per (thread, database file).
+
+    FastAPI runs sync endpoints on a threadpool, so a thread-local connection is
+    never shared between concurrent requests, while each worker thread avoids a
+    connect/close round trip per query. Connections are keyed by path so that
+    tests (and tools) which repoint DB_FILE get a connection to the new file.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.generation = 0
+        self._stats = {"opened": 0, "reused": 0, "closed": 0, "rollbacks": 0}
+
+    def _thread_state(self):
+        local = self._local
+        if getattr(local, "generation", None) != self.generation:
+            # Pool was reset since this thread last used it. The thread closes its
+            # own stale handles; any still in use are closed when released.
+            stale = getattr(local, "stale", {})
+            for path, conn in getattr(local, "conns", {}).items():
+                depth = local.depth.get(path, 0)
+                if depth > 0:
+                    stale[id(conn)] = [conn, depth]
+                else:
+                    self._close(conn)
+            local.conns = {}
+            local.depth = {}
+            local.stale = stale
+            local.generation = self.generation
+        return local
+
+    def _close(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn not in self._connections:
+                return  # Already closed by close_all()
+            self._connections.remove(conn)
+            self._stats["closed"] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        # check_same_thread=False only so close_all() can close handles owned by
+        # other threads at exit; each connection is still used by a single thread.
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._connections.append(conn)
+            self._stats["opened"] += 1
+        return conn
+
+    def acquire(self, path: str) -> sqlite3.Connection:
+        state = self._thread_state()
+        conn = state.conns.get(path)
+        if conn is None:
+            conn = self._open(path)
+            state.conns[path] = conn
+        else:
+            with self._lock:
+                self._stats["reused"] += 1
+        state.depth[path] = state.depth.get(path, 0) + 1
+        return conn
+
+    def release(self, path: str, conn: sqlite3.Connection):
+        state = self._thread_state()
+        entry = state.stale.get(id(conn))
+        if entry is not None:
+            # A handle from before a reset; close it once its outermost user is done
+            # (closing discards uncommitted work, like the rollback below)
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del state.stale[id(conn)]
+                self._close(conn)
+            return
+        depth = state.depth.get(path, 1) - 1
+        state.depth[path] = depth
+        # Match the old connect/close semantics: work that was not committed by
+        # the outermost user is discarded instead of holding the write lock.
+        if depth <= 0 and state.conns.get(path) is conn and conn.in_transaction:
+            conn.rollback()
+            with self._lock:
+                self._stats["rollbacks"] += 1
+
+    def reset(self):
+        """
+        Makes every thread open fresh connections on its next get_db(). Each
+        thread closes its old handles itself, so connections busy in another
+        thread are never closed underneath it.
+        """
+        with self._lock:
+            self.generation += 1
+
+    def close_all(self):
+        """Closes every pooled connection in every thread, e.g. at exit."""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self.generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            self._stats["closed"] += len(connections)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open"] = len(self._connections)
+            stats["generation"] = self.generation
+        return stats
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
+
+def get_pool_stats() -> dict:
+    return pool.stats()
+
+def get_db_token():
+    """
+    Identifies the database currently served by get_db(). In-memory indexes
+    derived from the vocabulary table rebuild themselves when it changes.
+    """
+    return (DB_FILE, pool.generation)
 
 def init_db():
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-
-    # Vocabulary Table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            word TEXT PRIMARY KEY,
-            kana TEXT,
-            romaji TEXT,
-            meaning TEXT,
-            level INTEGER,
-            last_review TEXT,
-            tags TEXT,
-            ease_factor REAL,
-            interval INTEGER,
-            due_date TEXT,
-            status TEXT,
-            pos TEXT,
-            example_sentence TEXT,
-            fsrs_stability REAL,
-            fsrs_difficulty REAL,
-            fsrs_retrievability REAL,
-            fsrs_last_review TEXT,
-            failure_count INTEGER DEFAULT 0,
-            is_leech BOOLEAN DEFAULT 0
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+    # The database file may have been replaced or repointed; never reuse
+    # handles that could still reference the old file.
+    pool.reset()
+
+    with get_db() as conn:
+        c = conn.cursor()
+
+        # Vocabulary Table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS vocabulary (
+                word TEXT PRIMARY KEY,
+                kana TEXT,
+                romaji TEXT,
+                meaning TEXT,
+                level INTEGER,
+                last_review TEXT,
+                tags TEXT,
+                ease_factor REAL,
+                interval INTEGER,
+                due_date TEXT,
+                status TEXT,
+                pos TEXT,
+                example_sentence TEXT,
+                fsrs_stability REAL,
+                fsrs_difficulty REAL,
+                fsrs_retrievability REAL,
+                fsrs_last_review TEXT,
+                failure_count INTEGER DEFAULT 0,
+                is_leech BOOLEAN DEFAULT 0,
+                chapter INTEGER,
+                pitch_pattern TEXT,
+                search_key TEXT
+            )
+        ''')
+
+        # Normalized tags (vocabulary.tags keeps a JSON copy for loading rows)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS vocab_tags (
+                word TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (word, tag)
+            ) WITHOUT ROWID
+        ''')
+
+        # User Profile (single row) and its list-valued fields
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS user_profile (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                xp INTEGER NOT NULL DEFAULT 0,
+                level INTEGER NOT NULL DEFAULT 1,
+                streak INTEGER NOT NULL DEFAULT 0,
+                last_login TEXT NOT NULL DEFAULT '',
+                hearts INTEGER NOT NULL DEFAULT 5,
+                selected_track TEXT NOT NULL DEFAULT 'General',
+                gems INTEGER NOT NULL DEFAULT 0,
+                settings_show_furigana BOOLEAN NOT NULL DEFAULT 1,
+                settings_max_jlpt_level INTEGER NOT NULL DEFAULT 5,
+                settings_theme TEXT NOT NULL DEFAULT 'default',
+                settings_display_mode TEXT NOT NULL DEFAULT 'kanji',
+                settings_show_romaji BOOLEAN NOT NULL DEFAULT 1
+            )
+        ''')
+        for table, column in [('user_inventory', 'item'),
+                              ('user_completed_lessons', 'lesson_id'),
+                              ('user_unlocked_units', 'unit_id')]:
+            c.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    position INTEGER PRIMARY KEY,
+                    {column} TEXT NOT NULL
+                )
+            ''')
+
+        # Append-only history of FSRS reviews, the input to the parameter optimizer
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS review_log (
+                id INTEGER PRIMARY KEY,
+                word TEXT NOT NULL,
+                rating INTEGER NOT NULL,
+                reviewed_at TEXT NOT NULL,
+                elapsed_days REAL NOT NULL DEFAULT 0,
+                state INTEGER NOT NULL
+            )
+        ''')
+
+        # Fitted FSRS parameters (single row); absent means scheduler defaults
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS fsrs_parameters (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                parameters TEXT NOT NULL,
+                review_count INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        ''')
+
+        conn.commit()
+
+def get_schema_version() -> int:
+    """The database's PRAGMA user_version; 0 for a database that does not exist yet."""
+    if not os.path.exists(DB_FILE):
+        return 0
+    with get_db() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def set_schema_version(version: int):
+    with get_db() as conn:
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+
+def run_migrations(migrations: Sequence[Tuple[int, Callable[[], None]]]) -> int:
+    """
+    Brings the database up to date with migrations, a list of (version, step)
+    in ascending version order. Every step newer than PRAGMA user_version runs
+    in turn and its version is recorded as soon as it returns, so a current
+    database costs a single PRAGMA read. Steps must be idempotent: one that was
+    interrupted before its version was recorded runs again on the next start.
+    Returns the resulting version.
+    """
+    version = get_schema_version()
+    for step_version, step in migrations:
+        if step_version <= version:
+            continue
+        step()
+        set_schema_version(step_version)
+        version = step_version
+    return version
 
 @contextmanager
 def get_db():
-    conn = sqlite3.connect(DB_FILE)
-    # Enable row factory for dict-like access if needed, but we'll map manually to dataclass
-    conn.row_factory = sqlite3.Row
+    path = DB_FILE
+    conn = pool.acquire(path)
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(path, conn)
@@ -1,10 +1,12 @@
-import sqlite3
-import random
+import os
 import threading
-import string
 import logging
-from typing import List, Dict, Any
-from jamdict import Jamdict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from .candidate_index import ensure_candidate_index, pick_candidates, readings_for_key, simplify_pos, source_signature
+from .search_keys import search_key
+from .lookup_cache import LookupCache, normalize_query
 
 # Use thread-local storage for Jamdict connection
 _local = threading.local()
@@ -14,17 +16,12 @@ logger = logging.getLogger(__name__)
 
 def get_jam():
     if not hasattr(_local, "jam"):
+        from jamdict import Jamdict
         _local.jam = Jamdict()
     return _local.jam
 
-def get_db_conn(db_file):
-    if not hasattr(_local, "conn"):
-        _local.conn = sqlite3.connect(db_file)
-    return _local.conn
-
 def _extract_pos(entry) -> str:
     """Extracts a simplified Part of Speech from the entry."""
-    # Priority: Verb > Adjective > Noun
     all_pos = []
     for sense in entry.senses:
         # Check if 'pos' attribute exists and is iterable
@@ -36,32 +33,148 @@ def _extract_pos(entry) -> str:
             else:
                 all_pos.append(str(pos_val).lower())
 
-    if any('verb' in p for p in all_pos):
-        if any('ichidan' in p for p in all_pos): return 'v1'
-        if any('godan' in p for p in all_pos): return 'v5'
-        if any('suru' in p for p in all_pos): return 'vs'
-        return 'verb'
-
-    if any('adjective' in p for p in all_pos):
-        if any('keiyoushi' in p for p in all_pos): return 'adj-i'
-        if any('keiyodoshi' in p for p in all_pos): return 'adj-na'
-        return 'adj'
+    return simplify_pos(all_pos)
 
-    if any('noun' in p for p in all_pos):
-        return 'noun'
+LOOKUP_CACHE_FILE = os.path.join(os.path.dirname(__file__), '../data/lookup_cache.db')
+# Common queries looked up at API startup, one per line
+SEARCH_WARMUP_FILE = os.path.join(os.path.dirname(__file__), '../data/search_warmup.txt')
+SEARCH_CACHE_SIZE = 1024
 
-    return 'unknown'
+# Search results by normalized query; the Dictionary page searches on every keystroke
+_SEARCH_CACHE = LookupCache(maxsize=SEARCH_CACHE_SIZE)
+# (word, kana) -> POS of recently returned entries, so adding a search result needs no second lookup
+_RECENT_POS: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_recent_lock = threading.Lock()
 
 def search(query: str):
-    jam = get_jam()
     try:
-        result = jam.lookup(query)
+        entries = _SEARCH_CACHE.get(query, _lookup)
     except Exception as e:
         logger.error(f"Jamdict lookup error: {e}", exc_info=True)
         return []
+    _remember_pos(entries)
+    return entries
+
+def _remember_pos(entries: List[Dict[str, Any]]):
+    with _recent_lock:
+        for e in entries:
+            _RECENT_POS[(e["word"], e["kana"])] = e["pos"]
+            _RECENT_POS.move_to_end((e["word"], e["kana"]))
+        while len(_RECENT_POS) > SEARCH_CACHE_SIZE:
+            _RECENT_POS.popitem(last=False)
+
+# --- Async search on a dedicated executor ---
+#
+# Lookups run on their own small pool of threads, each holding a warm Jamdict
+# connection, instead of the server's shared threadpool, so a burst of searches
+# queues here and never holds up quiz handlers.
+
+DICTIONARY_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# (event loop, normalized query) -> the lookup every request for it is waiting on
+_inflight: Dict[Tuple["asyncio.AbstractEventLoop", str], "_InFlight"] = {}
+
+class _InFlight:
+    def __init__(self, future: "asyncio.Future"):
+        self.future = future
+        self.waiters = 0
+
+def _warm_worker(barrier: threading.Barrier):
+    # Every warm-up task waits for the others, so each one lands on its own thread
+    get_jam().lookup("あ", lookup_chars=False, lookup_ne=False)
+    barrier.wait(timeout=30)
+
+def start_dictionary_executor(workers: int = DICTIONARY_WORKERS, warm: bool = True) -> ThreadPoolExecutor:
+    """
+    Creates the dictionary executor. With warm, its threads start now and open
+    their Jamdict connections, so the first searches do not pay for that.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dictionary")
+            if warm:
+                barrier = threading.Barrier(workers)
+                for _ in range(workers):
+                    _executor.submit(_warm_worker, barrier)
+        return _executor
+
+def stop_dictionary_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def search_async(query: str) -> List[Dict[str, Any]]:
+    """
+    search() for async handlers. Cached results return straight away; misses
+    run on the dictionary executor, and concurrent requests for the same
+    query share one lookup. A lookup nobody waits for any more (every caller
+    was cancelled) is dropped if it has not started yet.
+    """
+    entries = _SEARCH_CACHE.peek(query)
+    if entries is not None:
+        _remember_pos(entries)
+        return entries
+
+    import asyncio  # Only async callers get here; keeps it out of CLI and headless start-up
+    loop = asyncio.get_running_loop()
+    key = (loop, normalize_query(query))
+    flight = _inflight.get(key)
+    if flight is None:
+        executor = _executor or start_dictionary_executor(warm=False)
+        flight = _InFlight(loop.run_in_executor(executor, search, query))
+        _inflight[key] = flight
+        flight.future.add_done_callback(lambda _, f=flight: _inflight.get(key) is f and _inflight.pop(key))
+
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.future)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.future.done():
+            flight.future.cancel()
+
+def lookup_pos(word: str, kana: str) -> str:
+    """POS of a dictionary entry, preferring the exact (word, kana) entry of a recent search."""
+    with _recent_lock:
+        pos = _RECENT_POS.get((word, kana))
+    if pos is not None:
+        return pos
+
+    results = search(word)
+    for r in results:
+        if r['word'] == word and r['kana'] == kana and r.get('pos'):
+            return r['pos']
+    return results[0].get('pos', '') if results else ""
+
+def _spellings(query: str) -> List[str]:
+    """
+    The query plus every dictionary kana spelling sharing its search key, so
+    "taberu", "ｺｰﾋｰ" or "こーひー" reach the entries jamdict files under たべる
+    and コーヒー. English and kanji queries have no readings and go through as is.
+    """
+    spellings = [query]
+    for kana in readings_for_key(search_key(query)):
+        if kana != query:
+            spellings.append(kana)
+    return spellings
+
+def _lookup(query: str) -> List[Dict[str, Any]]:
+    jam = get_jam()
+    found, seen = [], set()
+    for spelling in _spellings(query):
+        # Only entries are used; kanji character and named-entity lookups made up most of the time
+        for entry in jam.lookup(spelling, lookup_chars=False, lookup_ne=False).entries:
+            if entry.idseq not in seen:
+                seen.add(entry.idseq)
+                found.append(entry)
 
     entries = []
-    for entry in result.entries:
+    for entry in found:
         kanji = entry.kanji_forms[0].text if entry.kanji_forms else ""
         kana = entry.kana_forms[0].text if entry.kana_forms else ""
 
@@ -85,124 +198,78 @@ def search(query: str):
 
     return entries
 
-def get_recommendations(track: str = "General", limit: int = 5, exclude_words: List[str] = [], user_level: int = 1) -> List[Dict[str, Any]]:
-    jam = get_jam()
-
-    # We fetch a larger pool of random IDs to filter in Python
-    fetch_limit = limit * 40 # Increased fetch limit to find enough candidates
+def warm_search_cache(queries: Iterable[str]) -> int:
+    """Looks up queries ahead of time; returns how many were not cached yet."""
+    return _SEARCH_CACHE.warm(queries, _lookup)
 
-    try:
-        conn = get_db_conn(jam.db_file)
-        cursor = conn.cursor()
-        # Fetch random entry IDs
-        cursor.execute("SELECT idseq FROM entry ORDER BY RANDOM() LIMIT ?", (fetch_limit,))
-        rows = cursor.fetchall()
-        idseqs = [r[0] for r in rows]
-        # Connection is persistent, do not close
-    except Exception as e:
-        logger.error(f"DB Error: {e}", exc_info=True)
+def load_search_warmup(path: str = SEARCH_WARMUP_FILE) -> List[str]:
+    """The queries listed in path, skipping blank lines and # comments; none if it is missing."""
+    if not os.path.exists(path):
         return []
+    with open(path, encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith('#')]
 
-    results = []
-    count = 0
-
-    for idseq in idseqs:
-        if count >= limit: break
-
+def start_search_warmup(path: str = SEARCH_WARMUP_FILE) -> threading.Thread:
+    """Warms the search cache with the queries in path on a daemon thread."""
+    def run():
         try:
-            # Lookup by ID using the correct method for this jamdict version
-            # jam.lookup(idseq=...) seems broken or deprecated in this version based on error log
-            # Use jam.jmdict.get_entry(idseq) instead
-            entry = jam.jmdict.get_entry(idseq)
-            if not entry: continue
-
-            # Extract Text
-            k_forms = entry.kanji_forms
-            r_forms = entry.kana_forms
-
-            kanji = k_forms[0].text if k_forms else ""
-            kana = r_forms[0].text if r_forms else ""
-
-            # Use kanji as main word if available, else kana
-            word = kanji if kanji else kana
-
-            if not word: continue
-            if word in exclude_words: continue
-
-            # --- DIFFICULTY FILTERING ---
-            is_common = False
-
-            # Check priority tags in Kanji forms
-            for form in k_forms:
-                # in jamdict 0.1a, pri is a list of strings like ['news1']
-                if hasattr(form, 'pri') and form.pri:
-                    if any(p in ['news1', 'ichi1', 'spec1', 'gai1'] for p in form.pri):
-                        is_common = True
-                        break
-
-            # If not found in Kanji, check Kana forms
-            if not is_common:
-                for form in r_forms:
-                    if hasattr(form, 'pri') and form.pri:
-                        if any(p in ['news1', 'ichi1', 'spec1', 'gai1'] for p in form.pri):
-                            is_common = True
-                            break
-
-            # Autopilot Logic: If user is beginner (< Level 10), enforce common words only
-            if user_level < 10 and not is_common:
-                continue
-            # -----------------------------
-
-            # --- TRACK FILTERING ---
-            # Collect all glosses to check for keywords
-            all_gloss = []
-            for s in entry.senses:
-                for g in getattr(s, 'gloss', []):
-                    all_gloss.append(str(g).lower())
-
-            # Simple keyword matching for tracks
-            if track == "Pop Culture":
-                if not any(k in g for k in ['slang', 'anime', 'manga', 'game', 'internet', 'net'] for g in all_gloss):
-                    # stricter: 95% chance to skip if not relevant
-                    if random.random() > 0.05: continue
-            elif track == "Business":
-                if not any(k in g for k in ['business', 'company', 'finance', 'economy', 'money', 'office', 'corporate'] for g in all_gloss):
-                    if random.random() > 0.05: continue
-            elif track == "Travel":
-                if not any(k in g for k in ['travel', 'trip', 'hotel', 'train', 'station', 'airport', 'ticket', 'reservation'] for g in all_gloss):
-                    if random.random() > 0.05: continue
-            # -----------------------
-
-            # QC Checks
-            # Skip very long words (compounds) for beginners
-            if len(word) > 6 and user_level < 10: continue
-
-            # Skip words with punctuation
-            if any(c in string.punctuation for c in word): continue
-            if any(c in "！？。、～・" for c in word): continue
-
-            # Skip single characters unless they are common words (like 目, 手, etc.) which are handled by is_common check above.
-            # But let's be stricter for single chars: must be hiragana/katakana common particles OR common kanji.
-            if len(word) == 1:
-                # If it's kana, only allow specific particles
-                is_kana_only = all('\u3040' <= c <= '\u309f' or '\u30a0' <= c <= '\u30ff' for c in word)
-                if is_kana_only:
-                    if word not in ['は', 'が', 'に', 'で', 'を', 'も', 'へ', 'と', 'や', 'の', 'ね', 'よ', 'わ']:
-                        continue
-                # If it's kanji, 'is_common' check handles it (most common 1-char kanji have pri tags)
-
-            pos = _extract_pos(entry)
-
-            results.append({
-                "word": word,
-                "kana": kana,
-                "meanings": all_gloss[:3], # Top 3 meanings
-                "pos": pos
-            })
-            count += 1
-
+            count = warm_search_cache(load_search_warmup(path))
+            logger.info(f"Warmed the search cache with {count} queries.")
         except Exception as e:
-            logger.error(f"Error processing entry {idseq}: {e}", exc_info=True)
-            continue
+            logger.error(f"Search cache warm-up failed: {e}", exc_info=True)
+
+    thread = threading.Thread(target=run, name="search-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def get_search_cache_stats() -> Dict[str, int]:
+    return _SEARCH_CACHE.stats()
+
+def enable_search_persistence(path: str = LOOKUP_CACHE_FILE, preload: int = SEARCH_CACHE_SIZE // 4):
+    """Keeps search results in a SQLite file across restarts, reloading the most recent ones now."""
+    _SEARCH_CACHE.open(path, source_signature(get_jam().db_file), preload=preload)
+
+def disable_search_persistence():
+    _SEARCH_CACHE.close()
+
+def clear_search_cache():
+    _SEARCH_CACHE.clear()
+    with _recent_lock:
+        _RECENT_POS.clear()
+
+def autocomplete(prefix: str, limit: int = 10) -> List[Dict[str, str]]:
+    """Top dictionary entries whose kanji, kana or English gloss starts with prefix."""
+    from .autocomplete import get_autocomplete_index  # numpy; only the API needs it
+    return get_autocomplete_index(get_jam().db_file).complete(prefix, limit)
+
+def start_index_builds() -> threading.Thread:
+    """
+    Builds missing or stale dictionary indexes (autopilot candidates, then
+    autocomplete) on a daemon thread, so requests find them ready.
+    """
+    def run():
+        from .autocomplete import get_autocomplete_index
+        try:
+            ensure_candidate_index(get_jam().db_file)
+            get_autocomplete_index(get_jam().db_file)
+        except Exception as e:
+            logger.error(f"Dictionary index build failed: {e}", exc_info=True)
+
+    thread = threading.Thread(target=run, name="dictionary-indexes", daemon=True)
+    thread.start()
+    return thread
 
-    return results
+def get_recommendations(track: str = "General", limit: int = 5, exclude_words: List[str] = [], user_level: int = 1) -> List[Dict[str, Any]]:
+    """
+    Random new words for the track at the user's difficulty, drawn from the
+    prebuilt candidate index (built from JMdict on first use, or ahead of time
+    with `python learn.py build-index`).
+    """
+    jam = get_jam()
+    try:
+        ensure_candidate_index(jam.db_file)
+        return pick_candidates(track, limit, exclude_words=set(exclude_words), user_level=user_level)
+    except Exception as e:
+        logger.error(f"Recommendation index error: {e}", exc_info=True)
+        return []
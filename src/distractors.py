@@ -0,0 +1,165 @@
+import re
+import random
+import threading
+from typing import Callable, Collection, Dict, Iterable, List, Tuple
+
+# Gloss words too common to say anything about meaning similarity
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'one', 'something', 'someone', 'somebody',
+    'thing', 'person', 'that', 'this', 'very', 'not', 'get', 'make', 'become', 'etc',
+}
+
+# Random probes per bucket before moving on to the next, less similar bucket
+PROBES_PER_BUCKET = 3
+
+def meaning_tokens(meaning: str) -> List[str]:
+    tokens = re.findall(r"[a-z]+", (meaning or "").lower())
+    return sorted({t for t in tokens if len(t) >= 3 and t not in STOPWORDS})
+
+def chapter_tags(tags: Iterable[str]) -> List[str]:
+    return [t for t in tags if t.startswith('ch') and t[2:].isdigit()]
+
+def _normalize_meaning(meaning: str) -> str:
+    return (meaning or "").strip().lower()
+
+class _Bucket:
+    """A set of words with O(1) add, remove and uniform random choice."""
+
+    __slots__ = ('words', 'positions')
+
+    def __init__(self):
+        self.words = []
+        self.positions = {}
+
+    def add(self, word: str):
+        if word not in self.positions:
+            self.positions[word] = len(self.words)
+            self.words.append(word)
+
+    def remove(self, word: str):
+        idx = self.positions.pop(word, None)
+        if idx is None:
+            return
+        last = self.words.pop()
+        if last != word:
+            self.words[idx] = last
+            self.positions[last] = idx
+
+    def choice(self, rng) -> str:
+        return self.words[rng.randrange(len(self.words))]
+
+    def __len__(self):
+        return len(self.words)
+
+class DistractorIndex:
+    """
+    Buckets words by meaning token, part of speech and Genki chapter so that
+    multiple-choice distractors can be drawn from plausible neighbours of the
+    answer instead of the whole deck. Each draw is a constant number of random
+    probes into a few buckets; no per-request scans.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._entries: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {}  # word -> (meaning, keys)
+        self.token = None
+
+    @staticmethod
+    def _keys(meaning: str, pos: str, tags: Iterable[str]) -> List[Tuple[str, str]]:
+        # Ordered from most to least similar
+        keys = [('tok', t) for t in meaning_tokens(meaning)]
+        if pos and pos != 'unknown':
+            keys.append(('pos', pos))
+        keys.extend(('ch', t) for t in chapter_tags(tags))
+        return keys
+
+    def ensure(self, token, loader: Callable[[], Iterable[Tuple[str, str, str, List[str]]]]):
+        """Rebuilds the buckets from loader() if they were built for a different database."""
+        if self.token == token:
+            return
+        with self._lock:
+            if self.token == token:
+                return
+            self._buckets = {}
+            self._entries = {}
+            for word, meaning, pos, tags in loader():
+                self._add(word, meaning, pos, tags)
+            self.token = token
+
+    def invalidate(self):
+        with self._lock:
+            self._buckets = {}
+            self._entries = {}
+            self.token = None
+
+    def _add(self, word, meaning, pos, tags):
+        keys = self._keys(meaning, pos, tags)
+        self._entries[word] = (_normalize_meaning(meaning), keys)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+            bucket.add(word)
+
+    def _remove(self, word):
+        entry = self._entries.pop(word, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.remove(word)
+                if not bucket:
+                    del self._buckets[key]
+
+    def update(self, word: str, meaning: str, pos: str, tags: Iterable[str]):
+        with self._lock:
+            if self.token is None:
+                return  # Not built yet; the next ensure() reads the current rows.
+            self._remove(word)
+            self._add(word, meaning, pos, list(tags))
+
+    def discard(self, word: str):
+        with self._lock:
+            self._remove(word)
+
+    def pick(self, word: str, meaning: str, pos: str, tags: Iterable[str], k: int,
+             rng: random.Random = random, exclude: Collection[str] = ()) -> List[str]:
+        """
+        Returns up to k distinct words that share a meaning token, part of speech
+        or chapter with the given item, skipping those in exclude. Words with the
+        same meaning are skipped so a question never has two correct options.
+        """
+        answer = _normalize_meaning(meaning)
+        picked = []
+        with self._lock:
+            keys = [key for key in self._keys(meaning, pos, tags) if key in self._buckets]
+            # First round takes one word per bucket to mix kinds of similarity,
+            # the second lets the closest buckets fill any remaining slots.
+            for per_bucket in (1, k):
+                for key in keys:
+                    bucket = self._buckets[key]
+                    taken = 0
+                    for _ in range(PROBES_PER_BUCKET * per_bucket):
+                        if taken >= per_bucket or len(picked) >= k:
+                            break
+                        candidate = bucket.choice(rng)
+                        if candidate == word or candidate in picked or candidate in exclude:
+                            continue
+                        if self._entries[candidate][0] == answer:
+                            continue
+                        picked.append(candidate)
+                        taken += 1
+                    if len(picked) >= k:
+                        return picked
+        return picked
+
+    def shares_meaning(self, word: str, meaning: str) -> bool:
+        """True if word is indexed with the same meaning, i.e. would be a second correct option."""
+        with self._lock:
+            entry = self._entries.get(word)
+        return entry is not None and entry[0] == _normalize_meaning(meaning)
+
+    def __len__(self):
+        return len(self._entries)
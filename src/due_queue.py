@@ -0,0 +1,84 @@
+import bisect
+import random
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+class DueQueue:
+    """
+    In-memory review queue ordered by due date.
+
+    Holds only (due_key, word) pairs for learned cards, sorted by due_key, so the
+    number of due cards is a single bisect and a random due card is one index
+    into the sorted prefix. Cards without a due date use '' as their key, which
+    sorts before every date (they are always due), mirroring DUE_VOCAB_QUERY.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []  # sorted list of (due_key, word)
+        self._keys = {}     # word -> due_key
+        self.token = None   # identifies the database the queue was built from
+
+    @staticmethod
+    def _key(due_date: Optional[str]) -> str:
+        return due_date or ''
+
+    @staticmethod
+    def _cutoff(date_str: str) -> Tuple[str]:
+        # A 1-tuple that sorts after every (date_str, word) entry and before the next date.
+        return (date_str + '\x00',)
+
+    def ensure(self, token, loader: Callable[[], Iterable[Tuple[str, Optional[str]]]]):
+        """Rebuilds the queue from loader() if it was built for a different database."""
+        if self.token == token:
+            return
+        with self._lock:
+            if self.token == token:
+                return
+            self._keys = {word: self._key(due_date) for word, due_date in loader()}
+            self._entries = sorted((key, word) for word, key in self._keys.items())
+            self.token = token
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = []
+            self._keys = {}
+            self.token = None
+
+    def update(self, word: str, status: str, due_date: Optional[str]):
+        """Moves, inserts or removes a card after it was written to the database."""
+        with self._lock:
+            if self.token is None:
+                return  # Not built yet; the next ensure() reads the current rows.
+
+            old_key = self._keys.pop(word, None)
+            if old_key is not None:
+                idx = bisect.bisect_left(self._entries, (old_key, word))
+                if idx < len(self._entries) and self._entries[idx] == (old_key, word):
+                    del self._entries[idx]
+
+            if status is not None and status != 'new':
+                key = self._key(due_date)
+                self._keys[word] = key
+                bisect.insort(self._entries, (key, word))
+
+    def count(self, date_str: str) -> int:
+        with self._lock:
+            return bisect.bisect_left(self._entries, self._cutoff(date_str))
+
+    def sample(self, date_str: str, rng: random.Random = random) -> Optional[str]:
+        """Returns the word of a uniformly random card due on or before date_str."""
+        with self._lock:
+            due = bisect.bisect_left(self._entries, self._cutoff(date_str))
+            if due == 0:
+                return None
+            return self._entries[rng.randrange(due)][1]
+
+    def sample_many(self, date_str: str, k: int, rng: random.Random = random) -> List[str]:
+        """Up to k distinct words of cards due on or before date_str, in random order."""
+        with self._lock:
+            due = bisect.bisect_left(self._entries, self._cutoff(date_str))
+            return [self._entries[i][1] for i in rng.sample(range(due), min(k, due))]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,101 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from fsrs import Rating
+
+from . import srs_engine
+from .fsrs_batch import BatchScheduler, parse_timestamps, SECONDS_PER_DAY
+from .data_manager import get_forecast_columns, get_deck_version
+
+# Small decks are simulated several times over and averaged so the daily
+# counts are smooth; big decks average out on their own in one run.
+MIN_SIMULATED_CARDS = 20000
+MAX_RUNS = 32
+SEED = 0
+
+def simulate_workload(stability: np.ndarray, difficulty: np.ndarray, due_days: np.ndarray,
+                      last_review_days: np.ndarray, days: int, batch: BatchScheduler,
+                      runs: int = 1, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Monte Carlo estimate of reviews per day for days 0..days-1.
+
+    Cards are given as arrays; due_days and last_review_days are day numbers
+    relative to today (overdue cards count as due on day 0). Every day, the
+    cards due that day are recalled with their FSRS retrievability, reviewed
+    as Good or Again through batch.review, and rescheduled. `runs` copies of
+    the deck are simulated side by side and the counts averaged.
+    """
+    counts = np.zeros(days)
+    if len(stability) == 0:
+        return counts
+    rng = rng or np.random.default_rng()
+
+    s = np.tile(np.asarray(stability, dtype=float), runs)
+    d = np.tile(np.asarray(difficulty, dtype=float), runs)
+    due = np.tile(np.maximum(np.asarray(due_days, dtype=np.int64), 0), runs)
+    last = np.tile(np.asarray(last_review_days, dtype=float), runs)
+
+    for day in range(days):
+        idx = np.flatnonzero(due == day)
+        if idx.size == 0:
+            continue
+        counts[day] = idx.size
+        elapsed = day - last[idx]
+        recalled = rng.random(idx.size) < batch.retrievability(s[idx], elapsed)
+        ratings = np.where(recalled, int(Rating.Good), int(Rating.Again))
+        s[idx], d[idx], interval = batch.review(s[idx], d[idx], elapsed, ratings)
+        last[idx] = day
+        # Lapses come back through a same-day relearning step; count them again tomorrow
+        due[idx] = day + np.maximum(interval, 1)
+    return counts / runs
+
+def _deck_arrays(columns: Dict[str, list], today: date, batch: BatchScheduler):
+    stability = np.asarray([v or 0.0 for v in columns['fsrs_stability']], dtype=float)
+    difficulty = np.asarray([v or 0.0 for v in columns['fsrs_difficulty']], dtype=float)
+    # Cards scheduled before FSRS was introduced have no memory state; start them as a fresh Good
+    stability = np.where(stability > 0, stability, batch.initial_stability(np.full(len(stability), int(Rating.Good))))
+    difficulty = np.where(difficulty > 0, difficulty, batch.initial_difficulty(np.full(len(difficulty), int(Rating.Good))))
+
+    today_str = today.isoformat()
+    due = np.array([v or today_str for v in columns['due_date']], dtype='datetime64[D]')
+    due_days = (due - np.datetime64(today_str, 'D')).astype(np.int64)
+
+    today_day = (np.datetime64(today_str, 'D') - np.datetime64('1970-01-01', 'D')).astype(np.int64)
+    last_review = np.floor(parse_timestamps(columns['fsrs_last_review']) / SECONDS_PER_DAY) - today_day
+    # Without a recorded review, assume the card was scheduled one full interval before it is due
+    last_review = np.where(np.isnan(last_review), due_days - batch.next_interval(stability), last_review)
+    return stability, difficulty, due_days, last_review
+
+_lock = threading.Lock()
+_cache_key = None
+_cache: Dict[int, List[dict]] = {}
+
+def get_forecast(days: int, today: Optional[date] = None) -> List[dict]:
+    """
+    Expected reviews per day for the next `days` days, as {"date", "reviews"}
+    dicts. Results are cached until the deck or the scheduler changes.
+    """
+    global _cache_key, _cache
+    today = today or date.today()
+    scheduler = srs_engine.get_scheduler()
+    key = (get_deck_version(), today, tuple(scheduler.parameters), scheduler.desired_retention)
+
+    with _lock:
+        if key != _cache_key:
+            _cache_key, _cache = key, {}
+        cached = _cache.get(days)
+        if cached is not None:
+            return cached
+
+        batch = BatchScheduler(scheduler)
+        stability, difficulty, due_days, last_review = _deck_arrays(get_forecast_columns(), today, batch)
+        runs = min(MAX_RUNS, max(1, -(-MIN_SIMULATED_CARDS // max(len(stability), 1))))
+        counts = simulate_workload(stability, difficulty, due_days, last_review, days, batch,
+                                   runs=runs, rng=np.random.default_rng(SEED))
+
+        result = [{"date": (today + timedelta(days=i)).isoformat(), "reviews": round(float(c), 1)}
+                  for i, c in enumerate(counts)]
+        _cache[days] = result
+        return result
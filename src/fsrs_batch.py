@@ -0,0 +1,166 @@
+import datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from fsrs import Scheduler, Rating
+from fsrs.scheduler import FUZZ_RANGES, MIN_DIFFICULTY, MAX_DIFFICULTY, STABILITY_MIN
+
+SECONDS_PER_DAY = 86400.0
+
+def parse_timestamps(values: Iterable[Optional[str]]) -> np.ndarray:
+    """
+    ISO datetimes (as stored in fsrs_last_review) to float seconds since the
+    epoch, NaN where missing. Naive values are taken as UTC like update_card_fsrs does.
+    """
+    values = list(values)
+    out = np.full(len(values), np.nan)
+    fast_idx, fast_vals = [], []
+    for i, v in enumerate(values):
+        if not v:
+            continue
+        if v.endswith('+00:00'):
+            v = v[:-6]
+        elif v.endswith('Z'):
+            v = v[:-1]
+        if '+' in v[10:] or '-' in v[10:]:
+            # Some other offset; rare enough to parse one by one
+            dt = datetime.datetime.fromisoformat(v)
+            out[i] = dt.timestamp()
+        else:
+            fast_idx.append(i)
+            fast_vals.append(v)
+    if fast_idx:
+        out[fast_idx] = np.array(fast_vals, dtype='datetime64[us]').astype(np.int64) / 1e6
+    return out
+
+def format_dates(seconds: np.ndarray) -> np.ndarray:
+    """Float seconds since the epoch to 'YYYY-MM-DD' strings (UTC)."""
+    return np.datetime_as_string(seconds.astype('datetime64[s]'), unit='D')
+
+class BatchScheduler:
+    """
+    Array version of fsrs.Scheduler for whole-deck work: current
+    retrievability, next intervals and reviews of many cards in one pass.
+
+    Mirrors the Scheduler's formulas and parameters exactly; review() covers
+    cards in the Review state, which is where every card past its learning
+    steps lives. Cards still in (re)learning steps go through the per-card
+    Scheduler.review_card path.
+    """
+
+    def __init__(self, scheduler: Optional[Scheduler] = None):
+        scheduler = scheduler or Scheduler()
+        self.parameters = np.asarray(scheduler.parameters, dtype=float)
+        self.desired_retention = scheduler.desired_retention
+        self.maximum_interval = scheduler.maximum_interval
+        self.relearning = len(scheduler.relearning_steps) > 0
+        self.decay = -self.parameters[20]
+        self.factor = 0.9 ** (1 / self.decay) - 1
+
+    @classmethod
+    def from_parameters(cls, parameters: np.ndarray) -> 'BatchScheduler':
+        """
+        A scheduler over an array whose first axis holds the 21 weights. Extra
+        axes broadcast against the card arrays, so e.g. a (21, P, 1) array
+        evaluates P parameter sets against (n,) cards as (P, n) results.
+        """
+        batch = cls()
+        batch.parameters = np.asarray(parameters, dtype=float)
+        batch.decay = -batch.parameters[20]
+        batch.factor = 0.9 ** (1 / batch.decay) - 1
+        return batch
+
+    @staticmethod
+    def elapsed_days(last_review: np.ndarray, now: float) -> np.ndarray:
+        """Whole days between last_review and now (seconds), like timedelta.days."""
+        return np.floor((now - last_review) / SECONDS_PER_DAY)
+
+    def retrievability(self, stability: np.ndarray, elapsed_days: np.ndarray) -> np.ndarray:
+        """Recall probability per card; 0 for cards never reviewed (NaN elapsed)."""
+        stability = np.asarray(stability, dtype=float)
+        elapsed = np.maximum(0, np.asarray(elapsed_days, dtype=float))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = (1 + self.factor * elapsed / stability) ** self.decay
+        return np.where(np.isnan(elapsed) | ~(stability > 0), 0.0, r)
+
+    def next_interval(self, stability: np.ndarray, fuzz: bool = False,
+                      rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Days until the next review at the desired retention, optionally fuzzed like the Scheduler."""
+        raw = (np.asarray(stability, dtype=float) / self.factor) * (self.desired_retention ** (1 / self.decay) - 1)
+        interval = np.clip(np.round(raw), 1, self.maximum_interval).astype(np.int64)
+        if fuzz:
+            interval = self._fuzz(interval, rng or np.random.default_rng())
+        return interval
+
+    def _fuzz(self, interval: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        days = interval.astype(float)
+        delta = np.ones_like(days)
+        for r in FUZZ_RANGES:
+            delta += r["factor"] * np.maximum(np.minimum(days, r["end"]) - r["start"], 0.0)
+        max_ivl = np.minimum(np.round(days + delta), self.maximum_interval)
+        min_ivl = np.minimum(np.maximum(2, np.round(days - delta)), max_ivl)
+        fuzzed = np.minimum(np.round(rng.random(len(days)) * (max_ivl - min_ivl + 1) + min_ivl), self.maximum_interval)
+        # Like the Scheduler, intervals under 2.5 days are left alone
+        return np.where(days < 2.5, interval, fuzzed).astype(np.int64)
+
+    # --- Memory model, element-wise over cards ---
+
+    def initial_stability(self, ratings: np.ndarray) -> np.ndarray:
+        w = self.parameters
+        return np.maximum(np.choose(np.asarray(ratings) - 1, [w[0], w[1], w[2], w[3]]), STABILITY_MIN)
+
+    def initial_difficulty(self, ratings: np.ndarray) -> np.ndarray:
+        w = self.parameters
+        return np.clip(w[4] - np.exp(w[5] * (np.asarray(ratings) - 1)) + 1, MIN_DIFFICULTY, MAX_DIFFICULTY)
+
+    def _next_difficulty(self, difficulty: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        w = self.parameters
+        easy_initial = w[4] - np.exp(w[5] * (Rating.Easy - 1)) + 1
+        delta = -(w[6] * (ratings - 3))
+        damped = difficulty + (10.0 - difficulty) * delta / 9.0
+        return np.clip(w[7] * easy_initial + (1 - w[7]) * damped, MIN_DIFFICULTY, MAX_DIFFICULTY)
+
+    def _short_term_stability(self, stability: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        w = self.parameters
+        increase = np.exp(w[17] * (ratings - 3 + w[18])) * stability ** -w[19]
+        increase = np.where(ratings >= Rating.Hard, np.maximum(increase, 1.0), increase)
+        return np.maximum(stability * increase, STABILITY_MIN)
+
+    def _next_stability(self, difficulty, stability, retrievability, ratings) -> np.ndarray:
+        w = self.parameters
+        forget_long = (w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1)
+                       * np.exp((1 - retrievability) * w[14]))
+        forget_short = stability / np.exp(w[17] * w[18])
+        forget = np.minimum(forget_long, forget_short)
+
+        hard_penalty = np.where(ratings == Rating.Hard, w[15], 1.0)
+        easy_bonus = np.where(ratings == Rating.Easy, w[16], 1.0)
+        recall = stability * (1 + np.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+                              * (np.exp((1 - retrievability) * w[10]) - 1) * hard_penalty * easy_bonus)
+
+        return np.maximum(np.where(ratings == Rating.Again, forget, recall), STABILITY_MIN)
+
+    def review(self, stability: np.ndarray, difficulty: np.ndarray, elapsed_days: np.ndarray,
+               ratings: np.ndarray, fuzz: bool = False,
+               rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Reviews Review-state cards with the given ratings (1-4).
+        Returns (stability, difficulty, interval days). Lapsed cards that enter
+        relearning steps get an interval of 0 days.
+        """
+        stability = np.asarray(stability, dtype=float)
+        difficulty = np.asarray(difficulty, dtype=float)
+        elapsed = np.asarray(elapsed_days, dtype=float)
+        ratings = np.asarray(ratings, dtype=np.int64)
+
+        retrievability = self.retrievability(stability, elapsed)
+        same_day = elapsed < 1
+        new_stability = np.where(same_day,
+                                 self._short_term_stability(stability, ratings),
+                                 self._next_stability(difficulty, stability, retrievability, ratings))
+        new_difficulty = self._next_difficulty(difficulty, ratings)
+
+        interval = self.next_interval(new_stability, fuzz=fuzz, rng=rng)
+        if self.relearning:
+            interval = np.where(ratings == Rating.Again, 0, interval)
+        return new_stability, new_difficulty, interval
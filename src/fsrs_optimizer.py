@@ -0,0 +1,163 @@
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fsrs.scheduler import DEFAULT_PARAMETERS, LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS
+
+from .fsrs_batch import BatchScheduler
+from .data_manager import iter_review_log, get_review_count, load_fsrs_parameters, save_fsrs_parameters
+from .srs_engine import STATE_NEW, configure_scheduler, reschedule_deck
+
+# Same thresholds as fsrs.Optimizer: below MIN_REVIEWS the defaults are a
+# better guess, and only the first MAX_SEQ_LEN reviews of a card are used.
+MIN_REVIEWS = 512
+MAX_SEQ_LEN = 64
+BATCH_CARDS = 512
+EPOCHS = 5
+LEARNING_RATE = 4e-2
+
+LOWER = np.asarray(LOWER_BOUNDS_PARAMETERS, dtype=float)
+UPPER = np.asarray(UPPER_BOUNDS_PARAMETERS, dtype=float)
+
+Batch = Tuple[np.ndarray, np.ndarray, np.ndarray]  # ratings, elapsed days, mask; each (cards, steps)
+
+def iter_histories(rows: Iterable) -> Iterator[Tuple[List[int], List[float]]]:
+    """
+    Groups review_log rows (word, rating, elapsed_days, state), ordered by
+    word then time, into per-card (ratings, elapsed days) histories. Cards
+    whose first logged review is not their first review ever are skipped,
+    since their starting memory state is unknown.
+    """
+    word = None
+    ratings, elapsed, usable = [], [], False
+    for row in rows:
+        if row[0] != word:
+            if usable and len(ratings) > 1:
+                yield ratings, elapsed
+            word = row[0]
+            ratings, elapsed = [], []
+            usable = row[3] == STATE_NEW
+        if usable and len(ratings) < MAX_SEQ_LEN:
+            ratings.append(int(row[1]))
+            elapsed.append(float(np.floor(row[2])))
+    if usable and len(ratings) > 1:
+        yield ratings, elapsed
+
+def iter_batches(rows: Iterable, batch_cards: int = BATCH_CARDS) -> Iterator[Batch]:
+    """Pads histories into fixed-size arrays, batch_cards cards at a time."""
+    histories = []
+    for history in iter_histories(rows):
+        histories.append(history)
+        if len(histories) >= batch_cards:
+            yield _pad(histories)
+            histories = []
+    if histories:
+        yield _pad(histories)
+
+def _pad(histories) -> Batch:
+    steps = max(len(r) for r, _ in histories)
+    # Padding uses harmless values (Good, one day); the mask keeps it out of the loss.
+    ratings = np.full((len(histories), steps), 3, dtype=np.int64)
+    elapsed = np.ones((len(histories), steps))
+    mask = np.zeros((len(histories), steps), dtype=bool)
+    for i, (r, e) in enumerate(histories):
+        ratings[i, :len(r)] = r
+        elapsed[i, :len(e)] = e
+        mask[i, :len(r)] = True
+    return ratings, elapsed, mask
+
+def batch_loss(parameters: np.ndarray, batch: Batch) -> Tuple[np.ndarray, int]:
+    """
+    Summed log loss of recall predictions for each row of parameters (P, 21)
+    over a batch, and the number of predictions scored. Each card is replayed
+    from its first review; reviews at least a day after the previous one are
+    scored, as in the FSRS optimizer.
+    """
+    ratings, elapsed, mask = batch
+    model = BatchScheduler.from_parameters(np.clip(parameters, LOWER, UPPER).T[:, :, None])
+    stability = model.initial_stability(ratings[:, 0])
+    difficulty = model.initial_difficulty(ratings[:, 0])
+
+    total = np.zeros(parameters.shape[0])
+    count = 0
+    for t in range(1, ratings.shape[1]):
+        step, rating, days = mask[:, t], ratings[:, t], elapsed[:, t]
+        retrievability = model.retrievability(stability, days)
+
+        scored = step & (days >= 1)
+        p = np.clip(retrievability, 1e-6, 1 - 1e-6)
+        total -= np.where(scored, np.where(rating > 1, np.log(p), np.log(1 - p)), 0.0).sum(axis=1)
+        count += int(scored.sum())
+
+        new_stability = np.where(days < 1, model._short_term_stability(stability, rating),
+                                 model._next_stability(difficulty, stability, retrievability, rating))
+        new_difficulty = model._next_difficulty(difficulty, rating)
+        stability = np.where(step, new_stability, stability)
+        difficulty = np.where(step, new_difficulty, difficulty)
+    return total, count
+
+def fit_parameters(rows_factory: Callable[[], Iterable], initial: Sequence[float] = DEFAULT_PARAMETERS,
+                   epochs: int = EPOCHS, learning_rate: float = LEARNING_RATE,
+                   batch_cards: int = BATCH_CARDS) -> Tuple[List[float], float, float]:
+    """
+    Fits FSRS weights to review histories with Adam, streaming rows_factory()
+    once per epoch so only one batch of cards is in memory at a time. Gradients
+    are central differences, evaluated for all 21 weights in one vectorized
+    pass per batch. Returns (parameters, initial loss, final loss), mean per
+    scored review; the initial parameters are returned if fitting did not help.
+    """
+    params = np.clip(np.asarray(initial, dtype=float), LOWER, UPPER)
+    n = len(params)
+    step = 1e-4 * np.maximum(1.0, np.abs(params))
+    m, v = np.zeros(n), np.zeros(n)
+    t = 0
+
+    def epoch_loss(p):
+        total, count = 0.0, 0
+        for batch in iter_batches(rows_factory(), batch_cards):
+            loss, c = batch_loss(p[None, :], batch)
+            total += loss[0]
+            count += c
+        return total / max(count, 1)
+
+    initial_loss = epoch_loss(params)
+    for _ in range(epochs):
+        for batch in iter_batches(rows_factory(), batch_cards):
+            # Rows 0..n-1 step each weight up, rows n..2n-1 step it down
+            probes = np.vstack([params + np.diag(step), params - np.diag(step)])
+            loss, count = batch_loss(probes, batch)
+            if count == 0:
+                continue
+            grad = (loss[:n] - loss[n:]) / (2 * step * count)
+
+            t += 1
+            m = 0.9 * m + 0.1 * grad
+            v = 0.999 * v + 0.001 * grad ** 2
+            m_hat, v_hat = m / (1 - 0.9 ** t), v / (1 - 0.999 ** t)
+            params = np.clip(params - learning_rate * m_hat / (np.sqrt(v_hat) + 1e-8), LOWER, UPPER)
+
+    final_loss = epoch_loss(params)
+    if final_loss > initial_loss:
+        return list(map(float, np.clip(initial, LOWER, UPPER))), initial_loss, initial_loss
+    return params.tolist(), initial_loss, final_loss
+
+def run_optimizer(epochs: int = EPOCHS, reschedule: bool = True) -> Optional[List[float]]:
+    """
+    Offline command: fits parameters to the stored review log, saves them
+    (srs_engine loads them on first use), applies them to the running scheduler
+    and reschedules the deck with them.
+    """
+    count = get_review_count(min_elapsed_days=1)
+    if count < MIN_REVIEWS:
+        print(f"Only {count} reviews in the log; at least {MIN_REVIEWS} are needed. Keeping current parameters.")
+        return None
+
+    initial = load_fsrs_parameters() or DEFAULT_PARAMETERS
+    print(f"Optimizing FSRS parameters over {count} reviews...")
+    params, before, after = fit_parameters(iter_review_log, initial, epochs=epochs)
+    print(f"Log loss {before:.4f} -> {after:.4f}")
+
+    save_fsrs_parameters(params, count)
+    configure_scheduler(params)
+    if reschedule:
+        print(f"Rescheduled {reschedule_deck()} cards.")
+    return params
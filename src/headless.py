@@ -1,47 +1,29 @@
 import json
 import sys
 import random
-from dataclasses import asdict
+from collections import OrderedDict
 from datetime import datetime
-
-from src.data_manager import load_vocab, save_vocab, load_user_profile, save_user_profile
-from src.srs_engine import update_card_srs
-from src.models import Vocabulary
-from src.sentence_builder import check_sentence_answer, Sentence, load_sentences, get_random_sentence
+from typing import Any, Dict, Optional, Tuple
+
+from src.data_manager import (
+    load_user_profile, save_user_profile, update_vocab_item, get_vocab_item, get_vocab_count,
+    get_random_due_vocab_item, get_random_learned_vocab_item
+)
+from src.models import UserProfile
+from src.sentence_builder import check_sentence_answer, get_random_sentence
 from src.study import get_new_items, mark_as_learning
 
-def get_due_vocab(vocab_list):
-    today = datetime.now().strftime('%Y-%m-%d')
-    due = []
-    sorted_vocab = sorted(vocab_list, key=lambda v: v.due_date if v.due_date else "0000-00-00")
-    for card in sorted_vocab:
-        if card.status == 'new':
-            continue
-        if not card.due_date:
-            due.append(card)
-        elif card.due_date <= today:
-            due.append(card)
-    return due
-
-def run_headless_study():
-    # Headless Study Mode: Fetch new items and output them
-    vocab = load_vocab()
+def next_study_card() -> Dict[str, Any]:
+    """The next new word on the user's track, marked as learning so the next call moves on."""
     profile = load_user_profile()
-
-    # Get 1 new item for headless interaction
     new_items = get_new_items(limit=1, track=profile.selected_track)
-
     if not new_items:
-        print(json.dumps({"error": "No new items to learn in current track"}))
-        return
+        return {"error": "No new items to learn in current track"}
 
     item = new_items[0]
-    # Mark as learning immediately in headless mode so next call gets next item
     mark_as_learning(item)
-    save_vocab(vocab)
-
-    # Output Study Card JSON
-    study_data = {
+    update_vocab_item(item)
+    return {
         "type": "study",
         "word": item.word,
         "kana": item.kana,
@@ -50,90 +32,52 @@ def run_headless_study():
         "tags": item.tags,
         "tts_text": item.word # Requested TTS field
     }
-    print(json.dumps(study_data))
-    sys.stdout.flush()
-    # No input expected for study mode one-shot, just acknowledgment by consumer
-
-def run_headless_quiz():
-    vocab = load_vocab()
-    profile = load_user_profile()
-
-    # Simple Question Selection Logic
-    q_type = "vocab"
-    q_data = {}
-    context = None
 
+def next_question(profile: UserProfile) -> Tuple[Dict[str, Any], Any]:
+    """
+    A question as JSON-ready data plus the sentence or card it asks about.
+    Questions that cannot be asked come back as {"error": ...} with no context.
+    """
     # Try Sentence
     if random.random() < 0.2:
         s = get_random_sentence(profile.settings.max_jlpt_level)
         if s:
-            q_type = "sentence"
-            context = s
-            q_data = {
+            return {
                 "type": "sentence",
                 "question": f"Translate: {s.english}",
                 "hint": s.broken_down,
                 "id": f"sentence:{s.english[:10]}",
                 "tts_text": s.japanese
-            }
-
-    # Fallback to Vocab
-    if q_type == "vocab":
-        if not vocab:
-            print(json.dumps({"error": "No vocabulary data found"}))
-            return
-
-        due_items = get_due_vocab(vocab)
-        if due_items:
-             item = random.choice(due_items)
-        else:
-             learned_items = [v for v in vocab if v.status != 'new']
-             if learned_items:
-                 item = random.choice(learned_items)
-             else:
-                 print(json.dumps({"error": "No learned vocabulary. Please use Study Mode first."}))
-                 return
-
-        context = item
-        display_mode = getattr(profile.settings, "display_mode", "kanji")
-        # Fallback
-        if not hasattr(profile.settings, "display_mode"):
-             display_mode = "furigana" if getattr(profile.settings, "show_furigana", True) else "kanji"
-
-        if display_mode == "kana":
-            display = item.kana
-        elif display_mode == "kanji":
-            display = item.word
-        else: # furigana or default
-            display = f"{item.word} ({item.kana})"
-
-        q_data = {
-            "type": "vocab",
-            "question": f"Meaning of: {display}",
-            "id": f"vocab:{item.word}",
-            "tts_text": item.word
-        }
-
-    # 1. Output Question JSON
-    print(json.dumps(q_data))
-    sys.stdout.flush()
-
-    # 2. Wait for Input JSON
-    try:
-        raw_input = sys.stdin.readline()
-        if not raw_input:
-            return
-        user_input = json.loads(raw_input)
-        answer = user_input.get("answer", "")
-    except json.JSONDecodeError:
-        print(json.dumps({"error": "Invalid JSON input", "correct": False}))
-        return
-
-    # 3. Validation Logic
-    is_correct = False
-    correct_ans_str = ""
-    tts_feedback = ""
-
+            }, s
+
+    # Fallback to Vocab: a due card, otherwise any learned one
+    if get_vocab_count() == 0:
+        return {"error": "No vocabulary data found"}, None
+    item = get_random_due_vocab_item(datetime.now().strftime('%Y-%m-%d')) or get_random_learned_vocab_item()
+    if item is None:
+        return {"error": "No learned vocabulary. Please use Study Mode first."}, None
+
+    display_mode = getattr(profile.settings, "display_mode", "kanji")
+    # Fallback
+    if not hasattr(profile.settings, "display_mode"):
+         display_mode = "furigana" if getattr(profile.settings, "show_furigana", True) else "kanji"
+
+    if display_mode == "kana":
+        display = item.kana
+    elif display_mode == "kanji":
+        display = item.word
+    else: # furigana or default
+        display = f"{item.word} ({item.kana})"
+
+    return {
+        "type": "vocab",
+        "question": f"Meaning of: {display}",
+        "id": f"vocab:{item.word}",
+        "tts_text": item.word
+    }, item
+
+def grade_answer(q_type: str, context, answer: str, profile: UserProfile) -> Dict[str, Any]:
+    """Checks answer, updates the card and profile, and returns the result JSON."""
     if q_type == "sentence":
         is_correct = check_sentence_answer(context, answer)
         correct_ans_str = context.romaji
@@ -145,9 +89,10 @@ def run_headless_quiz():
         correct_ans_str = context.meaning
         tts_feedback = context.word
 
+        from src.srs_engine import update_card_srs  # fsrs; not needed until the first answer
         rating = 5 if is_correct else 0
         update_card_srs(context, rating)
-        save_vocab(vocab)
+        update_vocab_item(context)
 
         if is_correct:
             profile.xp += 10
@@ -155,8 +100,7 @@ def run_headless_quiz():
 
     save_user_profile(profile)
 
-    # 4. Output Result JSON
-    result = {
+    return {
         "correct": is_correct,
         "correct_answer": correct_ans_str,
         "xp_gained": 20 if (is_correct and q_type == "sentence") else (10 if is_correct else 0),
@@ -164,10 +108,116 @@ def run_headless_quiz():
         "new_level": profile.level,
         "tts_text": tts_feedback if is_correct else "" # Maybe read correct answer?
     }
-    print(json.dumps(result))
+
+def run_headless_study():
+    # Headless Study Mode: Fetch new items and output them
+    print(json.dumps(next_study_card()))
+    sys.stdout.flush()
+    # No input expected for study mode one-shot, just acknowledgment by consumer
+
+def run_headless_quiz():
+    profile = load_user_profile()
+    q_data, context = next_question(profile)
+
+    # 1. Output Question JSON
+    print(json.dumps(q_data))
+    sys.stdout.flush()
+    if context is None:
+        return
+
+    # 2. Wait for Input JSON
+    try:
+        raw_input = sys.stdin.readline()
+        if not raw_input:
+            return
+        user_input = json.loads(raw_input)
+        answer = user_input.get("answer", "")
+    except json.JSONDecodeError:
+        print(json.dumps({"error": "Invalid JSON input", "correct": False}))
+        return
+
+    # 3. Validate and output Result JSON
+    print(json.dumps(grade_answer(q_data["type"], context, answer, profile)))
 
 def run_headless(mode="quiz"):
     if mode == "study":
         run_headless_study()
     else:
         run_headless_quiz()
+
+# --- Daemon mode ---
+
+# Unanswered sentence questions kept for a later "answer"; vocab questions are
+# looked up again by word, so only sentences need remembering.
+MAX_PENDING_SENTENCES = 1000
+
+class HeadlessDaemon:
+    """
+    Long-lived headless session: one JSON request per line in, one JSON
+    response per line out, in order. Requests are {"op": "study"},
+    {"op": "quiz"} or {"op": "answer", "question_id": ..., "answer": ...};
+    an optional "request_id" is echoed back so callers can pipeline requests.
+    (Questions already use "id" for their question id.)
+    """
+
+    def __init__(self):
+        self._sentences: "OrderedDict[str, Any]" = OrderedDict()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "study":
+            return next_study_card()
+        if op == "quiz":
+            return self._quiz()
+        if op == "answer":
+            return self._answer(request.get("question_id", ""), request.get("answer", ""))
+        return {"error": f"Unknown op: {op!r}"}
+
+    def _quiz(self) -> Dict[str, Any]:
+        q_data, context = next_question(load_user_profile())
+        if q_data.get("type") == "sentence":
+            self._sentences[q_data["id"]] = context
+            self._sentences.move_to_end(q_data["id"])
+            while len(self._sentences) > MAX_PENDING_SENTENCES:
+                self._sentences.popitem(last=False)
+        return q_data
+
+    def _answer(self, question_id: str, answer: str) -> Dict[str, Any]:
+        if question_id.startswith("sentence:"):
+            q_type, context = "sentence", self._sentences.pop(question_id, None)
+        elif question_id.startswith("vocab:"):
+            q_type, context = "vocab", get_vocab_item(question_id.split("vocab:", 1)[1])
+        else:
+            return {"error": "Invalid question ID format"}
+        if context is None:
+            return {"error": "Unknown question"}
+        return grade_answer(q_type, context, str(answer), load_user_profile())
+
+    def respond(self, line: str) -> Optional[Dict[str, Any]]:
+        """The response to one input line, or None for a blank line."""
+        if not line.strip():
+            return None
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            return {"request_id": None, "error": "Invalid JSON input"}
+        if not isinstance(request, dict):
+            return {"request_id": None, "error": "Request must be a JSON object"}
+
+        try:
+            response = self.handle(request)
+        except Exception as e:
+            # One bad request must not take the session down
+            response = {"error": f"{type(e).__name__}: {e}"}
+        return {"request_id": request.get("request_id"), **response}
+
+def run_daemon(stdin=None, stdout=None):
+    """Serves JSON-lines requests from stdin until it closes, keeping the deck and caches warm."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    daemon = HeadlessDaemon()
+    for line in stdin:
+        response = daemon.respond(line)
+        if response is not None:
+            stdout.write(json.dumps(response) + "\n")
+            stdout.flush()
@@ -0,0 +1,147 @@
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+def normalize_query(query: str) -> str:
+    """Cache key for a search: NFKC (full/half-width forms fold together), trimmed, single-spaced."""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+class LookupCache:
+    """
+    Dictionary search results keyed by normalized query: a bounded LRU in
+    memory, optionally backed by a SQLite file so results survive restarts.
+
+    The file remembers which dictionary build produced it (`source`) and is
+    emptied when that changes. Counters report memory hits, disk hits and
+    misses (lookups that reached the dictionary).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, query: str, loader: Callable[[str], List[dict]]) -> List[dict]:
+        """Results for query, calling loader(normalized query) only if no cache level has them."""
+        key = normalize_query(query)
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entries
+            entries = self._read_disk(key)
+            if entries is not None:
+                self.disk_hits += 1
+                self._remember(key, entries)
+                return entries
+            self.misses += 1
+
+        # Dictionary lookups run outside the lock; a concurrent miss on the same key just loads twice
+        entries = loader(key)
+        with self._lock:
+            self._remember(key, entries)
+            self._write_disk(key, entries)
+        return entries
+
+    def peek(self, query: str) -> Optional[List[dict]]:
+        """Results for query if they are in memory, without touching disk or the dictionary."""
+        key = normalize_query(query)
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entries
+
+    def warm(self, queries: Iterable[str], loader: Callable[[str], List[dict]]) -> int:
+        """Loads each query that is not cached yet; returns how many reached the dictionary."""
+        before = self.misses
+        for query in queries:
+            self.get(query, loader)
+        return self.misses - before
+
+    def _remember(self, key: str, entries: List[dict]):
+        self._entries[key] = entries
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    # --- Optional persistence ---
+
+    def open(self, path: str, source: str, preload: int = 0):
+        """
+        Backs the cache with the SQLite file at path, built from dictionary
+        `source`. The `preload` most recently used stored queries are pulled
+        into memory straight away.
+        """
+        with self._lock:
+            self.close()
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS lookup (query TEXT PRIMARY KEY, entries TEXT, used REAL)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            if row is None or row[0] != source:
+                conn.execute("DELETE FROM lookup")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (source,))
+            conn.commit()
+            self._conn = conn
+
+            if preload:
+                rows = conn.execute("SELECT query, entries FROM lookup ORDER BY used DESC LIMIT ?",
+                                    (min(preload, self.maxsize),)).fetchall()
+                for query, entries in reversed(rows):
+                    self._remember(query, json.loads(entries))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _read_disk(self, key: str) -> Optional[List[dict]]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT entries FROM lookup WHERE query = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._touch(key)
+        return json.loads(row[0])
+
+    def _write_disk(self, key: str, entries: List[dict]):
+        if self._conn is None:
+            return
+        self._conn.execute("INSERT OR REPLACE INTO lookup VALUES (?, ?, ?)",
+                           (key, json.dumps(entries, ensure_ascii=False), time.time()))
+        self._conn.commit()
+
+    def _touch(self, key: str):
+        self._conn.execute("UPDATE lookup SET used = ? WHERE query = ?", (time.time(), key))
+        self._conn.commit()
+
+    # --- Introspection ---
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "size": len(self._entries)}
+
+    def clear(self):
+        """Empties memory and disk and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM lookup")
+                self._conn.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -14,7 +14,6 @@ from .ui import (
     display_study_session, display_settings_menu
 )
 from .study import get_new_items, mark_as_learning
-from .migrate_data import migrate
 
 def get_due_cards(vocab_list):
     now = datetime.now()
@@ -103,12 +102,6 @@ def run_grammar_lesson(lesson, profile):
 
 def main():
     try:
-        # Auto-migrate data if needed
-        try:
-             migrate()
-        except Exception as e:
-             rprint(f"[red]Migration failed: {e}[/red]")
-
         vocab = load_vocab()
         grammar = load_grammar()
         profile = load_user_profile()
@@ -1,8 +1,9 @@
 from dataclasses import dataclass, field, fields
 from typing import List, Dict, Optional, Any
 
-@dataclass
+@dataclass(slots=True)
 class Vocabulary:
+    # Slotted: a large deck is held in memory as these, and per-instance __dict__s dominated RSS
     word: str
     kana: str
     romaji: str
@@ -23,6 +24,7 @@ class Vocabulary:
     fsrs_last_review: Optional[str] = None # ISO format datetime
     failure_count: int = 0
     is_leech: bool = False
+    pitch_pattern: Optional[str] = None # H/L per kana character, filled on first save
 
 @dataclass
 class GrammarExample:
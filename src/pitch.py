@@ -1,19 +1,32 @@
+import os
 import threading
 import logging
-from typing import List, Optional
-import MeCab
-import unidic_lite
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Thread-local storage for MeCab tagger to ensure thread safety
 _local = threading.local()
 
+# Recently computed patterns, keyed by (word, reading). Known vocabulary keeps
+# its pattern in the vocabulary table; this covers words outside the deck
+# (dictionary results) and repeats between a row being read and backfilled.
+PITCH_CACHE_SIZE = 4096
+_pitch_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_pitch_cache_lock = threading.Lock()
+
+# get_pitch_patterns hands lists of this many distinct words to a process pool
+PROCESS_POOL_THRESHOLD = 50000
+PROCESS_CHUNK_SIZE = 5000
+
 def get_tagger():
     """Returns a thread-local MeCab Tagger instance."""
     if not hasattr(_local, "tagger"):
         try:
-            # Initialize MeCab with unidic-lite dictionary
+            # Imported here so loading the module stays cheap for callers that never parse
+            import MeCab
+            import unidic_lite
             _local.tagger = MeCab.Tagger(f'-d "{unidic_lite.DICDIR}"')
         except Exception as e:
             logger.error(f"Failed to initialize MeCab: {e}")
@@ -68,6 +81,9 @@ def get_pitch_from_kernel(kernel: int, num_moras: int) -> str:
 
     return "".join(pattern)
 
+_ACCENT_INDICES = [23, 24, 22, 17, 21]
+_FEATURE_FIELDS = max(_ACCENT_INDICES) + 1
+
 def _find_accent_kernel(features: List[str]) -> Optional[int]:
     """
     Attempts to find the accent kernel (aType) in the MeCab features list.
@@ -76,7 +92,7 @@ def _find_accent_kernel(features: List[str]) -> Optional[int]:
     """
     # Priority order: 23 (unidic-lite default), 24 (often pronunciation), 22 (sometimes), 17 (standard UniDic), 21
     # We validate by ensuring the value is a digit and within reasonable bounds (0-20).
-    search_indices = [23, 24, 22, 17, 21]
+    search_indices = _ACCENT_INDICES
 
     for idx in search_indices:
         if idx < len(features):
@@ -94,25 +110,111 @@ def get_pitch_pattern(word: str, reading: str) -> str:
     Returns a binary pitch pattern string (H=High, L=Low) for the word.
     The output length matches len(reading) (character count), ensuring that
     characters within the same mora share the same pitch value.
+    Results are memoized in a bounded LRU.
     """
-    if not reading:
-        return ""
+    key = (word, reading)
+    with _pitch_cache_lock:
+        pattern = _pitch_cache.get(key)
+        if pattern is not None:
+            _pitch_cache.move_to_end(key)
+            return pattern
 
-    moras = get_moras(reading)
-    num_moras = len(moras)
+    pattern, analyzed = _compute_pitch_pattern(word, reading)
+    if analyzed:
+        # Fallbacks from a missing or failing tagger are not cached, so a later call can retry
+        with _pitch_cache_lock:
+            _pitch_cache[key] = pattern
+            if len(_pitch_cache) > PITCH_CACHE_SIZE:
+                _pitch_cache.popitem(last=False)
+    return pattern
 
-    kernel = 0 # Default to Heiban if MeCab fails or no accent found
+def clear_pitch_cache():
+    with _pitch_cache_lock:
+        _pitch_cache.clear()
+
+def get_pitch_patterns(pairs: Iterable[Tuple[str, str]], processes: Optional[int] = None) -> List[str]:
+    """
+    Pitch patterns for many (word, reading) pairs, in order, for bulk imports.
+    Cached pairs are answered from the LRU; the rest are analyzed with one
+    tagger, each distinct word parsed once, on its own, whatever its
+    readings. Lists of PROCESS_POOL_THRESHOLD or more words are spread over a
+    process pool (processes workers, default one per CPU) when more than one
+    CPU is available.
+    """
+    pairs = list(pairs)
+    results: List[Optional[str]] = [None] * len(pairs)
+    missing: Dict[Tuple[str, str], List[int]] = {}
+    with _pitch_cache_lock:
+        for i, key in enumerate(pairs):
+            pattern = _pitch_cache.get(key)
+            if pattern is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                results[i] = pattern
+    if not missing:
+        return results
+
+    # Empty readings have nothing to analyze
+    words = list(dict.fromkeys(word for word, reading in missing if reading))
+    workers = processes or os.cpu_count() or 1
+    if len(words) >= PROCESS_POOL_THRESHOLD and workers > 1:
+        kernels = _analyze_kernels_in_pool(words, workers)
+    else:
+        kernels = _analyze_kernels(words)
+    kernel_of = dict(zip(words, kernels))
 
+    computed = {}
+    for key, positions in missing.items():
+        word, reading = key
+        kernel, analyzed = kernel_of.get(word, (0, True)) if reading else (0, True)
+        pattern = _expand_pattern(kernel, reading)
+        for i in positions:
+            results[i] = pattern
+        if analyzed:
+            computed[key] = pattern
+
+    # A bulk import larger than the cache would only evict the hot entries
+    if len(computed) <= PITCH_CACHE_SIZE:
+        with _pitch_cache_lock:
+            _pitch_cache.update(computed)
+            while len(_pitch_cache) > PITCH_CACHE_SIZE:
+                _pitch_cache.popitem(last=False)
+    return results
+
+def _analyze_kernels(words: List[str]) -> List[Tuple[int, bool]]:
+    # Words are parsed on their own, never joined: MeCab would otherwise pick
+    # lexemes from the neighbouring words and give some of them another accent
     tagger = get_tagger()
+    return [_analyze_kernel(word, tagger) for word in words]
+
+def _analyze_kernels_in_pool(words: List[str], processes: int) -> List[Tuple[int, bool]]:
+    # Each worker builds its own tagger on first use
+    chunks = [words[i:i + PROCESS_CHUNK_SIZE] for i in range(0, len(words), PROCESS_CHUNK_SIZE)]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return [kernel for chunk in pool.map(_analyze_kernels, chunks) for kernel in chunk]
+
+def _compute_pitch_pattern(word: str, reading: str) -> Tuple[str, bool]:
+    """get_pitch_pattern without the cache; also reports whether MeCab ran cleanly."""
+    if not reading:
+        return "", True
+    kernel, analyzed = _analyze_kernel(word, get_tagger())
+    return _expand_pattern(kernel, reading), analyzed
+
+def _analyze_kernel(word: str, tagger) -> Tuple[int, bool]:
+    """Accent kernel of the word (0 if none is found) and whether MeCab ran cleanly."""
+    kernel = 0 # Default to Heiban if MeCab fails or no accent found
+    analyzed = False
+
     if tagger:
         try:
             # Parse the word to find the accent kernel.
             # We assume the first significant token holds the relevant accent for the word.
             node = tagger.parseToNode(word)
-            found = False
 
             while node:
-                features = node.feature.split(',')
+                # Only the leading fields can hold the accent; leave the rest unsplit
+                features = node.feature.split(',', _FEATURE_FIELDS)
                 # Skip BOS/EOS or empty features
                 if len(features) < 1 or features[0] == "BOS/EOS":
                     node = node.next
@@ -124,7 +226,6 @@ def get_pitch_pattern(word: str, reading: str) -> str:
                 found_kernel = _find_accent_kernel(features)
                 if found_kernel is not None:
                     kernel = found_kernel
-                    found = True
                     break # Stop after finding the first valid accent
 
                 # If valid word surface but no accent found, check next token?
@@ -135,13 +236,19 @@ def get_pitch_pattern(word: str, reading: str) -> str:
                     break
 
                 node = node.next
+            analyzed = True
 
         except Exception as e:
             logger.error(f"MeCab parsing error for {word}: {e}")
             # Fallback to kernel=0 (Heiban)
 
+    return kernel, analyzed
+
+def _expand_pattern(kernel: int, reading: str) -> str:
+    moras = get_moras(reading)
+
     # Generate mora-based pattern
-    mora_pattern = get_pitch_from_kernel(kernel, num_moras)
+    mora_pattern = get_pitch_from_kernel(kernel, len(moras))
 
     # Expand to character-based pattern
     # Mapping: Mora 1 -> Chars of Mora 1 get Mora 1's pitch.
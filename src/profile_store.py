@@ -0,0 +1,112 @@
+import copy
+import threading
+from typing import Dict, List, Optional
+
+from .models import UserProfile, UserSettings
+
+# Scalar UserProfile fields stored as typed columns of user_profile
+PROFILE_COLUMNS = ['xp', 'level', 'streak', 'last_login', 'hearts', 'selected_track', 'gems']
+# UserSettings fields, stored as settings_<name> columns of the same row
+SETTINGS_COLUMNS = ['show_furigana', 'max_jlpt_level', 'theme', 'display_mode', 'show_romaji']
+BOOL_SETTINGS = {'show_furigana', 'show_romaji'}
+# List fields -> (child table, value column), ordered by position
+PROFILE_LISTS = {
+    'inventory': ('user_inventory', 'item'),
+    'completed_lessons': ('user_completed_lessons', 'lesson_id'),
+    'unlocked_units': ('user_unlocked_units', 'unit_id'),
+}
+
+def _flatten(profile: UserProfile) -> Dict[str, object]:
+    row = {name: getattr(profile, name) for name in PROFILE_COLUMNS}
+    for name in SETTINGS_COLUMNS:
+        value = getattr(profile.settings, name)
+        row[f'settings_{name}'] = int(value) if name in BOOL_SETTINGS else value
+    return row
+
+class ProfileStore:
+    """
+    Cached, dirty-tracked access to the single user profile row and its child
+    tables. Reads are served from memory; save() compares against the last
+    persisted state and only touches changed columns and lists. Callers pass in
+    the connection so a profile write can share a transaction with card writes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._profile: Optional[UserProfile] = None
+        self._row: Optional[Dict[str, object]] = None      # None until a row exists
+        self._lists: Dict[str, List[str]] = {}
+        self.token = None
+
+    def load(self, conn, token):
+        with self._lock:
+            row = conn.execute("SELECT * FROM user_profile WHERE id = 1").fetchone()
+            lists = {}
+            for name, (table, column) in PROFILE_LISTS.items():
+                rows = conn.execute(f"SELECT {column} FROM {table} ORDER BY position").fetchall()
+                lists[name] = [r[0] for r in rows]
+
+            self._lists = lists
+            if row is None:
+                self._profile = UserProfile()
+                self._row = None
+            else:
+                data = {name: row[name] for name in PROFILE_COLUMNS}
+                settings = {}
+                for name in SETTINGS_COLUMNS:
+                    value = row[f'settings_{name}']
+                    settings[name] = bool(value) if name in BOOL_SETTINGS else value
+                self._profile = UserProfile(settings=UserSettings(**settings), **data, **lists)
+                self._row = _flatten(self._profile)
+            self.token = token
+
+    def get(self) -> UserProfile:
+        """Returns a copy callers may mutate freely before passing it to save()."""
+        with self._lock:
+            return copy.deepcopy(self._profile)
+
+    def has_row(self) -> bool:
+        with self._lock:
+            return self._row is not None
+
+    def save(self, conn, profile: UserProfile):
+        """Writes the differences from the persisted state. Does not commit."""
+        with self._lock:
+            new_row = _flatten(profile)
+            if self._row is None:
+                columns = ['id'] + list(new_row)
+                placeholders = ', '.join(['?'] * len(columns))
+                conn.execute(f"INSERT INTO user_profile ({', '.join(columns)}) VALUES ({placeholders})",
+                             [1] + list(new_row.values()))
+            else:
+                changed = {k: v for k, v in new_row.items() if self._row.get(k) != v}
+                if changed:
+                    assignments = ', '.join(f"{k} = ?" for k in changed)
+                    conn.execute(f"UPDATE user_profile SET {assignments} WHERE id = 1", list(changed.values()))
+
+            new_lists = {}
+            for name, (table, column) in PROFILE_LISTS.items():
+                values = list(getattr(profile, name))
+                old = self._lists.get(name, [])
+                new_lists[name] = values
+                if values == old:
+                    continue
+                if values[:len(old)] == old:
+                    # Common case (buying an item, finishing a lesson): append only
+                    start = len(old)
+                else:
+                    conn.execute(f"DELETE FROM {table}")
+                    start = 0
+                conn.executemany(f"INSERT INTO {table} (position, {column}) VALUES (?, ?)",
+                                 [(i, values[i]) for i in range(start, len(values))])
+
+            self._row = new_row
+            self._lists = new_lists
+            self._profile = copy.deepcopy(profile)
+
+    def invalidate(self):
+        with self._lock:
+            self._profile = None
+            self._row = None
+            self._lists = {}
+            self.token = None
@@ -4,13 +4,19 @@ import re
 from typing import List, Optional, Any
 from dataclasses import dataclass
 
-import MeCab
-import unidic_lite
 
 from .models import Vocabulary, GrammarLesson, UserSettings, UserProfile
 
-# Initialize MeCab tagger once
-tagger = MeCab.Tagger(f"-d {unidic_lite.DICDIR} -Owakati")
+_tagger = None
+
+def get_tagger():
+    """The wakati MeCab tagger, created on first use rather than at import."""
+    global _tagger
+    if _tagger is None:
+        import MeCab
+        import unidic_lite
+        _tagger = MeCab.Tagger(f"-d {unidic_lite.DICDIR} -Owakati")
+    return _tagger
 
 def normalize_answer(text: str) -> str:
     """
@@ -81,7 +87,7 @@ def decompose_sentence(sentence: str) -> Optional[List[str]]:
 
     try:
         # MeCab output with -Owakati is space-separated tokens
-        result = tagger.parse(sentence).strip()
+        result = get_tagger().parse(sentence).strip()
         if not result:
             return None
         return result.split(" ")
@@ -0,0 +1,80 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Set
+
+# Sessions are kept for a few hours; beyond MAX_SESSIONS the oldest are dropped
+SESSION_TTL = 4 * 60 * 60  # seconds
+MAX_SESSIONS = 1000
+
+class SessionNotFound(KeyError):
+    """The token was never issued, or its session has expired."""
+
+class QuizSessionStore:
+    """
+    Question ids handed out per quiz session, so answers can be checked
+    against what was actually asked. Each question can be answered once.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token -> (created_at, pending question ids), oldest first
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def create(self, question_ids: Iterable[str]) -> str:
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._sessions[token] = (now, set(question_ids))
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return token
+
+    def _expire(self, now: float):
+        # Creation order is expiry order, so expired sessions are all at the front
+        while self._sessions:
+            created, _ = next(iter(self._sessions.values()))
+            if now - created < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def _pending(self, token: str) -> Set[str]:
+        self._expire(self._clock())
+        session = self._sessions.get(token)
+        if session is None:
+            raise SessionNotFound(token)
+        return session[1]
+
+    def consume(self, token: str, question_id: str) -> bool:
+        """
+        Marks question_id as answered. False if it is not part of the session
+        or was already answered; SessionNotFound for an unknown token.
+        """
+        with self._lock:
+            pending = self._pending(token)
+            if question_id not in pending:
+                return False
+            pending.remove(question_id)
+            return True
+
+    def consume_all(self, token: str, question_ids: Iterable[str]) -> bool:
+        """
+        As consume, for several questions at once: either all of them are
+        marked answered, or none are if any is unknown, answered or repeated.
+        """
+        question_ids = list(question_ids)
+        with self._lock:
+            pending = self._pending(token)
+            if len(set(question_ids)) != len(question_ids) or not pending.issuperset(question_ids):
+                return False
+            pending.difference_update(question_ids)
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
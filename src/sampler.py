@@ -0,0 +1,115 @@
+import random
+import threading
+from typing import Callable, Collection, Iterable, List, Optional, Tuple
+
+class VocabSampler:
+    """
+    Uniform random sampling of vocabulary words without ORDER BY RANDOM().
+
+    Words are kept in one array per status, with a word -> (status, index) map so
+    inserts, status changes and removals are O(1) swap-removes. Sampling k words
+    draws random positions across the selected status arrays and rejects
+    excluded or repeated words, which is O(k) while the exclusions are small
+    compared to the population.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = {}    # status -> list of words
+        self._positions = {}  # word -> (status, index in bucket)
+        self.token = None     # identifies the database the sampler was built from
+
+    def ensure(self, token, loader: Callable[[], Iterable[Tuple[str, Optional[str]]]]):
+        """Rebuilds the arrays from loader() if they were built for a different database."""
+        if self.token == token:
+            return
+        with self._lock:
+            if self.token == token:
+                return
+            self._buckets = {}
+            self._positions = {}
+            for word, status in loader():
+                self._add(word, status)
+            self.token = token
+
+    def invalidate(self):
+        with self._lock:
+            self._buckets = {}
+            self._positions = {}
+            self.token = None
+
+    def _add(self, word: str, status: Optional[str]):
+        bucket = self._buckets.setdefault(status, [])
+        self._positions[word] = (status, len(bucket))
+        bucket.append(word)
+
+    def _remove(self, word: str):
+        status, idx = self._positions.pop(word)
+        bucket = self._buckets[status]
+        last = bucket.pop()
+        if last != word:
+            bucket[idx] = last
+            self._positions[last] = (status, idx)
+
+    def update(self, word: str, status: Optional[str]):
+        """Inserts a word or moves it to its current status after a database write."""
+        with self._lock:
+            if self.token is None:
+                return  # Not built yet; the next ensure() reads the current rows.
+            current = self._positions.get(word)
+            if current is not None:
+                if current[0] == status:
+                    return
+                self._remove(word)
+            self._add(word, status)
+
+    def discard(self, word: str):
+        with self._lock:
+            if word in self._positions:
+                self._remove(word)
+
+    def statuses(self) -> List[Optional[str]]:
+        with self._lock:
+            return [status for status, bucket in self._buckets.items() if bucket]
+
+    def sample(self, k: int, exclude: Collection[str] = (), statuses: Optional[Iterable[Optional[str]]] = None,
+               rng: random.Random = random) -> List[str]:
+        """
+        Returns up to k distinct words, uniformly at random, that are not in exclude.
+        If statuses is given only words with one of those statuses are considered.
+        """
+        with self._lock:
+            if statuses is None:
+                buckets = [b for b in self._buckets.values() if b]
+            else:
+                buckets = [self._buckets[s] for s in statuses if self._buckets.get(s)]
+            total = sum(len(b) for b in buckets)
+            if k <= 0 or total == 0:
+                return []
+
+            picked = []
+            seen = set()
+            # Rejection sampling; bail out to an explicit filter when exclusions
+            # crowd the population and random probes keep missing.
+            attempts = 4 * k + 16
+            while len(picked) < k and attempts > 0:
+                attempts -= 1
+                r = rng.randrange(total)
+                for bucket in buckets:
+                    if r < len(bucket):
+                        word = bucket[r]
+                        break
+                    r -= len(bucket)
+                if word in seen or word in exclude:
+                    continue
+                seen.add(word)
+                picked.append(word)
+
+            if len(picked) < k:
+                remaining = [w for b in buckets for w in b if w not in seen and w not in exclude]
+                picked.extend(rng.sample(remaining, min(k - len(picked), len(remaining))))
+
+            return picked
+
+    def __len__(self):
+        return len(self._positions)
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from typing import Dict, Optional
+
+# Canonical search keys: whatever script a word is typed in (romaji, hiragana,
+# katakana, half- or full-width), its key is the same hiragana string, so a
+# single indexed lookup on the key finds it.
+
+_VOWELS = 'aiueo'
+
+ROMAJI_TO_KANA: Dict[str, str] = {
+    'a': 'あ', 'i': 'い', 'u': 'う', 'e': 'え', 'o': 'お',
+    'ka': 'か', 'ki': 'き', 'ku': 'く', 'ke': 'け', 'ko': 'こ',
+    'sa': 'さ', 'shi': 'し', 'si': 'し', 'su': 'す', 'se': 'せ', 'so': 'そ',
+    'ta': 'た', 'chi': 'ち', 'ti': 'ち', 'tsu': 'つ', 'tu': 'つ', 'te': 'て', 'to': 'と',
+    'na': 'な', 'ni': 'に', 'nu': 'ぬ', 'ne': 'ね', 'no': 'の',
+    'ha': 'は', 'hi': 'ひ', 'fu': 'ふ', 'hu': 'ふ', 'he': 'へ', 'ho': 'ほ',
+    'ma': 'ま', 'mi': 'み', 'mu': 'む', 'me': 'め', 'mo': 'も',
+    'ya': 'や', 'yu': 'ゆ', 'yo': 'よ',
+    'ra': 'ら', 'ri': 'り', 'ru': 'る', 're': 'れ', 'ro': 'ろ',
+    'wa': 'わ', 'wi': 'うぃ', 'we': 'うぇ', 'wo': 'を',
+    'ga': 'が', 'gi': 'ぎ', 'gu': 'ぐ', 'ge': 'げ', 'go': 'ご',
+    'za': 'ざ', 'ji': 'じ', 'zi': 'じ', 'zu': 'ず', 'ze': 'ぜ', 'zo': 'ぞ',
+    'da': 'だ', 'di': 'ぢ', 'du': 'づ', 'de': 'で', 'do': 'ど',
+    'ba': 'ば', 'bi': 'び', 'bu': 'ぶ', 'be': 'べ', 'bo': 'ぼ',
+    'pa': 'ぱ', 'pi': 'ぴ', 'pu': 'ぷ', 'pe': 'ぺ', 'po': 'ぽ',
+    'fa': 'ふぁ', 'fi': 'ふぃ', 'fe': 'ふぇ', 'fo': 'ふぉ',
+    'va': 'ゔぁ', 'vi': 'ゔぃ', 'vu': 'ゔ', 've': 'ゔぇ', 'vo': 'ゔぉ',
+    'she': 'しぇ', 'che': 'ちぇ', 'je': 'じぇ',
+    'xa': 'ぁ', 'xi': 'ぃ', 'xu': 'ぅ', 'xe': 'ぇ', 'xo': 'ぉ',
+    'xya': 'ゃ', 'xyu': 'ゅ', 'xyo': 'ょ', 'xtsu': 'っ', 'xtu': 'っ',
+    '-': 'ー',
+}
+# Contracted sounds (kya, sho, ja...) in Hepburn, Kunrei and IME spellings
+for _prefix, _kana in {'ky': 'き', 'gy': 'ぎ', 'sh': 'し', 'sy': 'し', 'ch': 'ち', 'cy': 'ち',
+                       'ty': 'ち', 'j': 'じ', 'jy': 'じ', 'zy': 'じ', 'dy': 'ぢ', 'ny': 'に',
+                       'hy': 'ひ', 'by': 'び', 'py': 'ぴ', 'my': 'み', 'ry': 'り'}.items():
+    for _vowel, _small in (('a', 'ゃ'), ('u', 'ゅ'), ('o', 'ょ')):
+        ROMAJI_TO_KANA[_prefix + _vowel] = _kana + _small
+_LONGEST = max(len(k) for k in ROMAJI_TO_KANA)
+
+# Macron and circumflex long vowels, written out the way kana spell them
+_LONG_VOWELS = str.maketrans({'ā': 'aa', 'ī': 'ii', 'ū': 'uu', 'ē': 'ee', 'ō': 'ou',
+                              'â': 'aa', 'î': 'ii', 'û': 'uu', 'ê': 'ee', 'ô': 'ou'})
+_LATIN_RUN = re.compile(r"[a-z'\-āīūēōâîûêô]+")
+
+# The vowel each kana ends in, for spelling out long vowels
+_VOWEL_KANA = dict(zip(_VOWELS, 'あいうえお'))
+_VOWEL_OF: Dict[str, str] = {}
+for _romaji, _kana in ROMAJI_TO_KANA.items():
+    if _romaji[-1] in _VOWELS:
+        _VOWEL_OF.setdefault(_kana[-1], _VOWEL_KANA[_romaji[-1]])
+
+def katakana_to_hiragana(text: str) -> str:
+    # Katakana ァ..ヶ sit exactly 0x60 code points above their hiragana
+    return ''.join(chr(ord(c) - 0x60) if 'ァ' <= c <= 'ヶ' else c for c in text)
+
+def romaji_to_kana(text: str) -> Optional[str]:
+    """Hiragana for lowercase romaji, or None if text is not entirely romaji."""
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        nxt = text[i + 1] if i + 1 < n else ''
+        if c == 'n' and (not nxt or nxt not in _VOWELS + 'y'):
+            # Syllabic n: before a consonant, at the end, or as n' / nn
+            out.append('ん')
+            i += 1
+            if nxt == "'" or (nxt == 'n' and (i + 1 >= n or text[i + 1] not in _VOWELS + 'y')):
+                i += 1
+            continue
+        if c == 'm' and nxt in ('b', 'm', 'p'):
+            out.append('ん')  # Hepburn shimbun
+            i += 1
+            continue
+        if c == nxt and c.isalpha() and c not in _VOWELS or (c == 't' and text.startswith('ch', i + 1)):
+            out.append('っ')  # Doubled consonant (kitte, matcha)
+            i += 1
+            continue
+        for size in range(min(_LONGEST, n - i), 0, -1):
+            kana = ROMAJI_TO_KANA.get(text[i:i + size])
+            if kana is not None:
+                out.append(kana)
+                i += size
+                break
+        else:
+            return None
+    return ''.join(out)
+
+def _convert_run(match) -> str:
+    run = match.group(0)
+    kana = romaji_to_kana(run.translate(_LONG_VOWELS))
+    # Anything that is not entirely romaji (English, abbreviations) stays as typed
+    return kana if kana is not None else run
+
+def _spell_long_vowels(text: str) -> str:
+    # ー repeats the previous vowel. A long o is written おう (とうきょう), おお
+    # (おおきい) or ー, and romanized ō, oo or ou, so all of them fold to おう.
+    out = []
+    for c in text:
+        if out and c in ('ー', 'お', 'う'):
+            vowel = _VOWEL_OF.get(out[-1])
+            if vowel == 'お':
+                c = 'う'
+            elif c == 'ー' and vowel is not None:
+                c = vowel
+        out.append(c)
+    return ''.join(out)
+
+def search_key(text: str) -> str:
+    """
+    Canonical key for text: NFKC (folds half- and full-width forms), lowercase,
+    single-spaced, romaji runs converted to hiragana, katakana to hiragana and
+    long vowels spelled out. "Kōhī", "koohii", "コーヒー" and "ｺｰﾋｰ" all give
+    "こうひい"; kanji and words that are not romaji are kept as they are.
+    """
+    text = " ".join(unicodedata.normalize("NFKC", text).lower().split())
+    text = _LATIN_RUN.sub(_convert_run, text)
+    return _spell_long_vowels(katakana_to_hiragana(text))
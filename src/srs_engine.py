@@ -1,9 +1,41 @@
 import datetime
+import logging
+from typing import Optional, Sequence
 from fsrs import Scheduler, Card, Rating
 from .models import Vocabulary
+from .data_manager import record_review, load_fsrs_parameters, get_schedule_columns, update_schedules
 
-# Initialize Global FSRS Scheduler
+logger = logging.getLogger(__name__)
+
+# Initialize Global FSRS Scheduler; saved parameters are applied on first use
 scheduler = Scheduler()
+_parameters_loaded = False
+
+# review_log.state for a card's first review; other values are fsrs.State
+STATE_NEW = 0
+
+def configure_scheduler(parameters: Optional[Sequence[float]] = None):
+    """Replaces the global scheduler, e.g. with parameters fitted by the optimizer."""
+    global scheduler, _parameters_loaded
+    scheduler = Scheduler(parameters=parameters) if parameters else Scheduler()
+    _parameters_loaded = True
+
+def _load_saved_parameters():
+    try:
+        parameters = load_fsrs_parameters()
+        if parameters:
+            configure_scheduler(parameters)
+    except Exception as e:
+        # Bad or out-of-range saved weights must not stop the app; fall back to defaults
+        logger.warning(f"Ignoring saved FSRS parameters: {e}")
+
+def get_scheduler() -> Scheduler:
+    """The global scheduler, with the saved parameters once they have been read."""
+    global _parameters_loaded
+    if not _parameters_loaded:
+        _parameters_loaded = True
+        _load_saved_parameters()
+    return scheduler
 
 def _get_now():
     return datetime.datetime.now(datetime.timezone.utc)
@@ -25,15 +57,20 @@ def _map_rating(performance_rating: int) -> Rating:
     else:
         return Rating.Easy
 
-def update_card_fsrs(vocab_item: Vocabulary, performance_rating: int):
+def update_card_fsrs(vocab_item: Vocabulary, performance_rating: int,
+                     now: Optional[datetime.datetime] = None):
     """
-    Updates a Vocabulary item using FSRS logic.
+    Updates a Vocabulary item using FSRS logic. now is when the answer was
+    given (timezone-aware), for answers submitted after the fact; defaults
+    to the current time.
     """
     rating = _map_rating(performance_rating)
-    now = _get_now()
+    now = now or _get_now()
 
     # Create FSRS Card from Vocabulary data
     card = Card()
+    state = STATE_NEW
+    elapsed_days = 0.0
 
     # If this item has FSRS history, load it
     if vocab_item.fsrs_last_review:
@@ -46,6 +83,7 @@ def update_card_fsrs(vocab_item: Vocabulary, performance_rating: int):
              last_review_date = last_review_date.replace(tzinfo=datetime.timezone.utc)
 
         card.last_review = last_review_date
+        elapsed_days = max(0.0, (now - last_review_date).total_seconds() / 86400)
 
         if vocab_item.due_date:
              # Basic conversion
@@ -58,9 +96,11 @@ def update_card_fsrs(vocab_item: Vocabulary, performance_rating: int):
             card.state = 2 # Review
         else:
             card.state = 1 # Learning/Relearning
+        state = int(card.state)
 
     # Perform Review
-    card, review_log = scheduler.review_card(card, rating, review_datetime=now)
+    card, review_log = get_scheduler().review_card(card, rating, review_datetime=now)
+    record_review(vocab_item.word, int(review_log.rating), now.isoformat(), elapsed_days, state)
 
     # Update Vocabulary item
     vocab_item.fsrs_stability = card.stability
@@ -83,5 +123,35 @@ def update_card_fsrs(vocab_item: Vocabulary, performance_rating: int):
             vocab_item.status = 'suspended'
             vocab_item.interval = 0
 
+def reschedule_deck(now: Optional[datetime.datetime] = None, fuzz: Optional[bool] = None) -> int:
+    """
+    Recomputes the due date of every reviewed card from its stored stability
+    under the current scheduler (e.g. after new parameters or a change of
+    desired retention) and refreshes its retrievability. One vectorized pass
+    and one batched write; returns the number of cards rescheduled.
+    """
+    # NumPy is only needed for whole-deck work, not for single reviews
+    import numpy as np
+    from .fsrs_batch import BatchScheduler, parse_timestamps, format_dates, SECONDS_PER_DAY
+
+    now = now or _get_now()
+    columns = get_schedule_columns()
+    if not columns['word']:
+        return 0
+
+    scheduler = get_scheduler()
+    batch = BatchScheduler(scheduler)
+    stability = np.asarray(columns['fsrs_stability'], dtype=float)
+    last_review = parse_timestamps(columns['fsrs_last_review'])
+
+    retrievability = batch.retrievability(stability, batch.elapsed_days(last_review, now.timestamp()))
+    fuzz = scheduler.enable_fuzzing if fuzz is None else fuzz
+    interval = batch.next_interval(stability, fuzz=fuzz)
+    due = format_dates(last_review + interval * SECONDS_PER_DAY)
+
+    update_schedules(list(zip(columns['word'], columns['status'], due.tolist(),
+                              interval.tolist(), retrievability.tolist())))
+    return len(columns['word'])
+
 # Backward compatibility alias
 update_card_srs = update_card_fsrs
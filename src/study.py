@@ -2,46 +2,36 @@ from typing import List
 from datetime import datetime
 
 from .models import Vocabulary
-from .data_manager import load_vocab, save_vocab, load_user_profile
+from .data_manager import load_vocab, save_vocab, load_user_profile, get_new_vocab_items
 from .dictionary import get_recommendations
 from .sentence_mining import mine_sentence
 
-def get_new_items(limit: int = 5, track: str = "General") -> List[Vocabulary]:
-    vocab = load_vocab()
-    profile = load_user_profile()
-    new_items = [v for v in vocab if v.status == 'new']
+# Tags that put a word on each themed track
+TRACK_TAGS = {
+    "Pop Culture": ['anime', 'manga', 'game', 'rpg', 'slang'],
+    "Business": ['finance', 'business', 'office', 'corporate'],
+}
 
-    # Filter by Track
-    filtered = []
+def get_new_items(limit: int = 5, track: str = "General") -> List[Vocabulary]:
+    # Filter by Track (indexed lookups on vocab_tags / chapter)
     if track == "General":
-        # Prioritize 'core' tags (Genki), or fallback to any
-        # Sort by Genki chapter if possible? Tags: "ch1", "ch2"
-        # We can try to sort by chapter number in tags.
-        core_items = [v for v in new_items if 'core' in v.tags]
-
-        # Helper to extract chapter number
-        def get_chapter(v):
-            for t in v.tags:
-                if t.startswith('ch') and t[2:].isdigit():
-                    return int(t[2:])
-            return 999 # Late if no chapter
-
-        filtered = sorted(core_items, key=get_chapter)
+        # Prioritize 'core' tags (Genki) in chapter order
+        filtered = get_new_vocab_items(limit, tags=['core'], by_chapter=True)
 
         # If no core items, fallback to any 'new' items
         if not filtered:
-             filtered = new_items
+             filtered = get_new_vocab_items(limit)
 
-    elif track == "Pop Culture":
-        filtered = [v for v in new_items if any(t in v.tags for t in ['anime', 'manga', 'game', 'rpg', 'slang'])]
-    elif track == "Business":
-        filtered = [v for v in new_items if any(t in v.tags for t in ['finance', 'business', 'office', 'corporate'])]
+    elif track in TRACK_TAGS:
+        filtered = get_new_vocab_items(limit, tags=TRACK_TAGS[track])
     else:
         # Fallback to general/all
-        filtered = new_items
+        filtered = get_new_vocab_items(limit)
 
     # If not enough items, autopilot from dictionary
     if len(filtered) < limit:
+        vocab = load_vocab()
+        profile = load_user_profile()
         needed = limit - len(filtered)
         # Exclude existing words to avoid duplicates
         exclude_words = [v.word for v in vocab]
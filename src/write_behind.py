@@ -0,0 +1,149 @@
+import os
+import json
+import copy
+import logging
+import threading
+from contextlib import nullcontext
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+from .models import Vocabulary, UserProfile
+
+logger = logging.getLogger(__name__)
+
+FlushFn = Callable[[List[Vocabulary], Optional[UserProfile]], None]
+
+class WriteBehindJournal:
+    """
+    Buffers card and profile writes in memory and persists them in groups.
+
+    Every recorded change is appended to a JSON-lines log (flushed to the OS, not
+    fsync'd) so a crashed process can replay it on the next start. flush() hands
+    the latest state of each pending card plus the latest profile to flush_fn in
+    one call, then truncates the log. Flushes happen every `interval` seconds
+    once start() is called, or as soon as `max_pending` cards are waiting.
+
+    If callers record changes while holding some lock that flush_fn also takes,
+    pass it as outer_lock so flushes acquire it first and lock order stays fixed.
+    """
+
+    def __init__(self, log_file: str, flush_fn: FlushFn, interval: float = 2.0, max_pending: int = 50,
+                 outer_lock=None):
+        self.log_file = log_file
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_pending = max_pending
+        self.outer_lock = outer_lock
+
+        self._lock = threading.RLock()
+        self._vocab: Dict[str, Vocabulary] = {}
+        self._profile: Optional[UserProfile] = None
+        self._log = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Recording ---
+
+    def _append(self, kind: str, data: dict):
+        if self._log is None:
+            self._log = open(self.log_file, 'a', encoding='utf-8')
+        self._log.write(json.dumps({"type": kind, "data": data}, ensure_ascii=False) + "\n")
+        self._log.flush()
+
+    def record_vocab(self, item: Vocabulary):
+        with self._lock:
+            self._append("vocab", asdict(item))
+            self._vocab[item.word] = item
+            full = len(self._vocab) >= self.max_pending
+        if full:
+            self.flush()
+
+    def record_profile(self, profile: UserProfile):
+        with self._lock:
+            self._append("profile", asdict(profile))
+            self._profile = copy.deepcopy(profile)
+
+    # --- Read-through ---
+
+    def get_vocab(self, word: str) -> Optional[Vocabulary]:
+        with self._lock:
+            return self._vocab.get(word)
+
+    def get_profile(self) -> Optional[UserProfile]:
+        with self._lock:
+            if self._profile is None:
+                return None
+            return copy.deepcopy(self._profile)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._vocab) + (1 if self._profile is not None else 0)
+
+    # --- Persistence ---
+
+    def flush(self):
+        with self.outer_lock or nullcontext(), self._lock:
+            if not self._vocab and self._profile is None:
+                return
+            self.flush_fn(list(self._vocab.values()), self._profile)
+            self._vocab = {}
+            self._profile = None
+            self._truncate_log()
+
+    def _truncate_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+
+    def replay(self) -> int:
+        """Re-applies records left in the log by a process that died before flushing."""
+        with self.outer_lock or nullcontext(), self._lock:
+            if not os.path.exists(self.log_file):
+                return 0
+            vocab: Dict[str, Vocabulary] = {}
+            profile = None
+            count = 0
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from the crash; everything before it is intact.
+                        logger.warning("Skipping unreadable write-behind record")
+                        continue
+                    if record.get("type") == "vocab":
+                        item = Vocabulary(**record["data"])
+                        vocab[item.word] = item
+                    elif record.get("type") == "profile":
+                        profile = UserProfile(**record["data"])
+                    count += 1
+            if vocab or profile is not None:
+                self.flush_fn(list(vocab.values()), profile)
+            self._truncate_log()
+            return count
+
+    # --- Background flushing ---
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}", exc_info=True)
+
+    def stop(self):
+        """Stops the timer and flushes whatever is still pending."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
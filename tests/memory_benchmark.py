@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import shutil
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Vocabulary
+import src.data_manager as dm
+
+# Run with: python -m unittest tests.memory_benchmark -v
+DECK_SIZE = 20000
+TAG_SETS = [["core", f"ch{n}"] for n in range(1, 24)] + [["anime"], ["rpg", "game"], []]
+STATUSES = ["new", "learning", "mastered"]
+
+# The pre-slots layout: same fields, plain dataclass with a per-instance __dict__
+LegacyVocabulary = make_dataclass(
+    'LegacyVocabulary',
+    [(f.name, f.type, field(default=f.default, default_factory=f.default_factory)) for f in fields(Vocabulary)]
+)
+
+_VOCAB_FIELDS = [f.name for f in fields(Vocabulary)]
+
+def _legacy_row_to_vocab(row):
+    # Derived columns (chapter, search_key, ...) are not Vocabulary fields
+    data = {name: row[name] for name in _VOCAB_FIELDS}
+    data['tags'] = json.loads(data['tags']) if data['tags'] else []
+    return LegacyVocabulary(**data)
+
+class MemoryBenchmark(unittest.TestCase):
+    """Compares the in-memory cache footprint of the old and current Vocabulary layouts."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.test_dir, 'vocab.db'))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"CREATE TABLE vocabulary ({', '.join(dm.VOCAB_KEYS)})")
+        rows = []
+        for i in range(DECK_SIZE):
+            v = Vocabulary(word=f"word{i}", kana=f"kana{i}", romaji=f"romaji{i}", meaning=f"meaning {i}",
+                           status=STATUSES[i % 3], due_date=f"2024-01-{i % 28 + 1:02d}",
+                           tags=TAG_SETS[i % len(TAG_SETS)], pos="Noun")
+            rows.append(dm._vocab_to_row(v))
+        self.conn.executemany(dm.VOCAB_INSERT_QUERY.replace('INSERT OR REPLACE', 'INSERT'), rows)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.test_dir)
+
+    def _measure(self, convert):
+        rows = self.conn.execute("SELECT * FROM vocabulary").fetchall()
+        tracemalloc.start()
+        cache = [convert(row) for row in rows]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(len(cache), DECK_SIZE)
+        return size
+
+    def test_cache_footprint(self):
+        legacy = self._measure(_legacy_row_to_vocab)
+        dm._parse_tags.cache_clear()
+        compact = self._measure(dm._row_to_vocab)
+
+        print(f"\n[Memory] {DECK_SIZE} cards: legacy {legacy / 1024:.0f} KiB, "
+              f"compact {compact / 1024:.0f} KiB ({compact / legacy:.0%})")
+        self.assertLess(compact, legacy)
+
+if __name__ == '__main__':
+    unittest.main()
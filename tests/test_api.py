@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from src.api import app
 from src.auth import verify_api_key
+from src.models import Vocabulary
 import unittest
 from unittest.mock import patch, MagicMock
 
@@ -10,6 +11,10 @@ client = TestClient(app)
 class TestAPI(unittest.TestCase):
     def setUp(self):
         app.dependency_overrides[verify_api_key] = lambda: True
+        # Answers are graded against the shared database; keep them out of its review log
+        patcher = patch('src.srs_engine.record_review')
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def tearDown(self):
         app.dependency_overrides = {}
@@ -19,6 +24,26 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("xp", response.json())
 
+    def test_get_forecast(self):
+        response = client.get("/api/forecast?days=7")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 7)
+        self.assertIn("reviews", data[0])
+
+        self.assertEqual(client.get("/api/forecast?days=0").status_code, 400)
+
+    @patch('src.api.autocomplete')
+    def test_dictionary_autocomplete(self, mock_autocomplete):
+        mock_autocomplete.return_value = [{"word": "食べる", "kana": "たべる", "gloss": "to eat"}]
+        response = client.get("/api/dictionary/autocomplete?q=tab&k=5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["word"], "食べる")
+        mock_autocomplete.assert_called_once_with("tab", 5)
+
+        self.assertEqual(client.get("/api/dictionary/autocomplete?q=tab&k=0").status_code, 400)
+        self.assertEqual(client.get("/api/dictionary/autocomplete?q=tab&k=51").status_code, 400)
+
     def test_get_quiz_vocab(self):
         # Ensure we have vocab to load, or mock it.
         # For simplicity, we assume the environment has vocab.json as created in previous steps
@@ -50,5 +75,144 @@ class TestAPI(unittest.TestCase):
         # 3. Submit right answer? Hard to know without mocking logic,
         # but we verified the endpoint handles the request.
 
+    @patch('src.api.find_vocab_items')
+    def test_search_vocab(self, mock_find):
+        mock_find.return_value = [Vocabulary(word="食べる", kana="たべる", romaji="taberu", meaning="to eat",
+                                             pitch_pattern="LHL")]
+        response = client.get("/api/vocab/search?q=taberu")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(w["word"], w["pitch_pattern"]) for w in response.json()], [("食べる", "LHL")])
+        mock_find.assert_called_once_with("taberu")
+
+        self.assertEqual(client.get("/api/vocab/search?q=%20").status_code, 400)
+
+    @patch('src.api.save_user_profile')
+    @patch('src.api.update_vocab_item')
+    @patch('src.api.get_vocab_item')
+    @patch('src.api.get_session_distractors')
+    @patch('src.api.get_quiz_session_items')
+    def test_quiz_session(self, mock_items, mock_distractors, mock_get, mock_update, mock_save):
+        cat = Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat", status="learning")
+        dog = Vocabulary(word="犬", kana="いぬ", romaji="inu", meaning="dog", status="learning", pitch_pattern="LH")
+        others = [Vocabulary(word=w, kana=w, romaji=w, meaning=m) for w, m in [("鳥", "bird"), ("魚", "fish"), ("馬", "horse")]]
+        mock_items.return_value = [cat, dog]
+        mock_distractors.return_value = {"猫": others, "犬": []}
+        mock_get.side_effect = {"猫": cat, "犬": dog}.get
+
+        response = client.get("/api/quiz/session?n=2")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        mock_items.assert_called_once()
+        self.assertEqual(mock_items.call_args[0][1], 2)
+        questions = {q["question_id"]: q for q in data["questions"]}
+        self.assertEqual(list(questions), ["vocab:猫", "vocab:犬"])
+        # Stored patterns are used as is, missing ones analyzed in one batch
+        self.assertEqual(questions["vocab:犬"]["pitch_pattern"], "LH")
+        self.assertEqual(questions["vocab:猫"]["pitch_pattern"], "HL")
+        # Without three distractors a question is always typed in
+        self.assertEqual(questions["vocab:犬"]["type"], "input")
+
+        token = data["session_token"]
+        # A word that can't be found doesn't use up its question
+        mock_get.side_effect = {"猫": cat}.get
+        answer = {"question_id": "vocab:犬", "answer": "dog", "session_token": token}
+        self.assertEqual(client.post("/api/quiz/answer", json=answer).status_code, 404)
+        mock_get.side_effect = {"猫": cat, "犬": dog, "鳥": others[0]}.get
+        self.assertEqual(client.post("/api/quiz/answer", json=answer).status_code, 200)
+        # Each issued question counts once
+        self.assertEqual(client.post("/api/quiz/answer", json=answer).status_code, 409)
+        self.assertEqual(client.post("/api/quiz/answer", json={**answer, "question_id": "vocab:鳥"}).status_code, 409)
+        self.assertEqual(client.post("/api/quiz/answer", json={**answer, "session_token": "bogus"}).status_code, 404)
+        self.assertEqual(mock_update.call_count, 1)
+
+        self.assertEqual(client.get("/api/quiz/session?n=0").status_code, 400)
+        self.assertEqual(client.get("/api/quiz/session?n=51").status_code, 400)
+
+    @patch('src.api.save_reviews')
+    @patch('src.api.update_card_fsrs')
+    @patch('src.api.save_user_profile')
+    @patch('src.api.load_user_profile')
+    @patch('src.api.get_vocab_item')
+    def test_submit_answers_batch(self, mock_get, mock_load, mock_save_profile, mock_fsrs, mock_save_reviews):
+        from src.models import UserProfile
+        cards = {w: Vocabulary(word=w, kana=w, romaji=w, meaning=m, status="learning")
+                 for w, m in [("猫", "cat"), ("犬", "dog")]}
+        mock_get.side_effect = cards.get
+        profile = UserProfile()
+        mock_load.return_value = profile
+
+        answers = [
+            {"question_id": "vocab:犬", "answer": "dog", "answered_at": "2024-03-01T10:05:00Z"},
+            {"question_id": "vocab:猫", "answer": "dog", "answered_at": "2024-03-01T10:00:00Z"},
+            {"question_id": "vocab:猫", "answer": "cat", "answered_at": "2024-03-01T10:10:00Z"},
+        ]
+        response = client.post("/api/quiz/answers", json={"answers": answers})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        # Results come back in submission order...
+        self.assertEqual([r["correct"] for r in data["results"]], [True, False, True])
+        self.assertEqual(data["xp_gained"], sum(r["xp_gained"] for r in data["results"]))
+        self.assertEqual(data["new_xp"], profile.xp)
+        # ...while cards are reviewed in the order the answers were given
+        reviews = [(c.args[0].word, c.args[1], c.args[2].minute) for c in mock_fsrs.call_args_list]
+        self.assertEqual(reviews, [("猫", 0, 0), ("犬", 5, 5), ("猫", 5, 10)])
+        # One save for every card and the profile together
+        mock_save_reviews.assert_called_once()
+        saved_items, saved_profile = mock_save_reviews.call_args[0]
+        self.assertEqual(sorted(v.word for v in saved_items), ["犬", "猫"])
+        self.assertIs(saved_profile, profile)
+        mock_save_profile.assert_not_called()
+
+        # Nothing is applied unless every answer is valid
+        mock_fsrs.reset_mock()
+        bad_word = answers + [{"question_id": "vocab:鳥", "answer": "bird"}]
+        self.assertEqual(client.post("/api/quiz/answers", json={"answers": bad_word}).status_code, 404)
+        bad_id = answers + [{"question_id": "sentence:1", "answer": "x"}]
+        self.assertEqual(client.post("/api/quiz/answers", json={"answers": bad_id}).status_code, 400)
+        mock_fsrs.assert_not_called()
+        self.assertEqual(mock_save_reviews.call_count, 1)
+
+    @patch('src.api.save_reviews')
+    @patch('src.api.save_user_profile')
+    @patch('src.api.load_user_profile')
+    @patch('src.api.get_vocab_item')
+    def test_offline_answer_older_than_last_review(self, mock_get, mock_load, mock_save_profile, mock_save_reviews):
+        from datetime import datetime, timedelta, timezone
+        from src.models import UserProfile
+        from src.srs_engine import update_card_fsrs
+
+        cat = Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat", status="learning")
+        update_card_fsrs(cat, 5)
+        reviewed = datetime.fromisoformat(cat.fsrs_last_review)
+        mock_get.return_value = cat
+        mock_load.return_value = UserProfile()
+
+        # Recorded offline three days before the review the card has had since
+        stale = (reviewed - timedelta(days=3)).astimezone(timezone.utc).isoformat()
+        answers = [{"question_id": "vocab:猫", "answer": "cat", "answered_at": stale}]
+        self.assertEqual(client.post("/api/quiz/answers", json={"answers": answers}).status_code, 200)
+        self.assertGreaterEqual(datetime.fromisoformat(cat.fsrs_last_review), reviewed)
+
+    @patch('src.api.save_reviews')
+    @patch('src.api.update_card_fsrs')
+    @patch('src.api.get_vocab_item')
+    @patch('src.api.get_session_distractors')
+    @patch('src.api.get_quiz_session_items')
+    def test_submit_answers_with_session(self, mock_items, mock_distractors, mock_get, mock_fsrs, mock_save_reviews):
+        cards = {w: Vocabulary(word=w, kana=w, romaji=w, meaning=m, status="learning", pitch_pattern="LH")
+                 for w, m in [("猫", "cat"), ("犬", "dog")]}
+        mock_items.return_value = list(cards.values())
+        mock_distractors.return_value = {}
+        mock_get.side_effect = cards.get
+        token = client.get("/api/quiz/session?n=2").json()["session_token"]
+
+        repeated = [{"question_id": "vocab:猫", "answer": "cat"}] * 2
+        self.assertEqual(client.post("/api/quiz/answers", json={"answers": repeated, "session_token": token}).status_code, 409)
+        answers = [{"question_id": "vocab:猫", "answer": "cat"}, {"question_id": "vocab:犬", "answer": "dog"}]
+        self.assertEqual(client.post("/api/quiz/answers", json={"answers": answers, "session_token": token}).status_code, 200)
+        self.assertEqual(client.post("/api/quiz/answers", json={"answers": answers[:1], "session_token": token}).status_code, 409)
+        mock_save_reviews.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import shutil
+import sqlite3
+from src import autocomplete
+from src.autocomplete import AutocompleteIndex, build_autocomplete_index, get_autocomplete_index, is_current
+from test_candidate_index import _make_jamdict
+
+class TestAutocomplete(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_autocomplete_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.source = os.path.join(self.test_dir, 'jamdict.db')
+        self.index_dir = os.path.join(self.test_dir, 'autocomplete')
+        _make_jamdict(self.source)
+
+    def tearDown(self):
+        autocomplete._loaded.pop(self.index_dir, None)
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _words(self, prefix, k=10):
+        return [r["word"] for r in AutocompleteIndex(self.index_dir).complete(prefix, k)]
+
+    def test_ranked_by_priority(self):
+        build_autocomplete_index(self.source, self.index_dir)
+        # nf10 beats the priority-1 tags, which beat untagged entries
+        self.assertEqual(self._words("t"), ["食べる", "切符", "は", "乗車券販売機械"])
+        self.assertEqual(self._words("き"), ["切符", "稀覯"])
+        self.assertEqual(self._words("t", k=2), ["食べる", "切符"])
+
+    def test_labels_and_normalization(self):
+        build_autocomplete_index(self.source, self.index_dir)
+        index = AutocompleteIndex(self.index_dir)
+        self.assertEqual(index.complete("たべ"), [{"word": "食べる", "kana": "たべる", "gloss": "to eat"}])
+        # Kana-only entries show their kana as the word
+        self.assertEqual(index.complete("topic")[0]["word"], "は")
+        # Glosses match without their leading "to", case and width folded
+        self.assertEqual(self._words("EAT"), ["食べる"])
+        self.assertEqual(self._words("ＴＩＣＫ"), ["切符"])
+        self.assertEqual(self._words("xyz"), [])
+        self.assertEqual(self._words(""), [])
+
+    def test_exact_match_first(self):
+        conn = sqlite3.connect(self.source)
+        conn.execute("INSERT INTO Entry VALUES (8)")
+        conn.execute("INSERT INTO Kana (idseq, text) VALUES (8, 'き')")
+        conn.commit()
+        conn.close()
+        build_autocomplete_index(self.source, self.index_dir)
+        # An untagged exact match still comes before common completions
+        self.assertEqual(self._words("き"), ["き", "切符", "稀覯"])
+
+    def test_built_when_missing_or_stale(self):
+        self.assertFalse(is_current(self.source, self.index_dir))
+        index = get_autocomplete_index(self.source, self.index_dir)
+        self.assertTrue(is_current(self.source, self.index_dir))
+        self.assertIs(get_autocomplete_index(self.source, self.index_dir), index)
+
+        os.utime(self.source, (0, 0))
+        self.assertFalse(is_current(self.source, self.index_dir))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import random
+import sqlite3
+from src.candidate_index import build_candidate_index, ensure_candidate_index, is_current, pick_candidates, readings_for_key
+from src.search_keys import search_key
+
+# (idseq, kanji, kana, priorities, pos, glosses)
+ENTRIES = [
+    (1, "食べる", "たべる", ["ichi1", "nf10"], ["Ichidan verb", "transitive verb"], ["to eat"]),
+    (2, "切符", "きっぷ", ["news1"], ["noun (common) (futsuumeishi)"], ["ticket"]),
+    (3, "乗車券販売機械", "じょうしゃけんはんばいきかい", ["news1"], ["noun (common) (futsuumeishi)"], ["train ticket machine"]),
+    (4, "", "は", ["spec1"], ["particle"], ["topic marker particle"]),
+    (5, "", "ぬ", [], ["particle"], ["archaic negative"]),
+    (6, "何？", "なに", ["ichi1"], ["pronoun"], ["what"]),
+    (7, "稀覯", "きこう", [], ["noun (common) (futsuumeishi)"], ["rare book"]),
+]
+
+def _make_jamdict(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Entry (idseq INTEGER NOT NULL UNIQUE);
+        CREATE TABLE Kanji (ID INTEGER PRIMARY KEY, idseq INTEGER, text TEXT);
+        CREATE TABLE KJP (kid INTEGER, text TEXT);
+        CREATE TABLE Kana (ID INTEGER PRIMARY KEY, idseq INTEGER, text TEXT, nokanji BOOLEAN);
+        CREATE TABLE KNP (kid INTEGER, text TEXT);
+        CREATE TABLE Sense (ID INTEGER PRIMARY KEY, idseq INTEGER);
+        CREATE TABLE pos (sid INTEGER, text TEXT);
+        CREATE TABLE SenseGloss (sid INTEGER, lang TEXT, gend TEXT, text TEXT);
+    """)
+    for idseq, kanji, kana, pri, pos, glosses in ENTRIES:
+        conn.execute("INSERT INTO Entry VALUES (?)", (idseq,))
+        if kanji:
+            kid = conn.execute("INSERT INTO Kanji (idseq, text) VALUES (?, ?)", (idseq, kanji)).lastrowid
+            conn.executemany("INSERT INTO KJP VALUES (?, ?)", [(kid, p) for p in pri])
+        rid = conn.execute("INSERT INTO Kana (idseq, text) VALUES (?, ?)", (idseq, kana)).lastrowid
+        if not kanji:
+            conn.executemany("INSERT INTO KNP VALUES (?, ?)", [(rid, p) for p in pri])
+        sid = conn.execute("INSERT INTO Sense (idseq) VALUES (?)", (idseq,)).lastrowid
+        conn.executemany("INSERT INTO pos VALUES (?, ?)", [(sid, p) for p in pos])
+        conn.executemany("INSERT INTO SenseGloss VALUES (?, 'eng', NULL, ?)", [(sid, g) for g in glosses])
+    conn.commit()
+    conn.close()
+
+class TestCandidateIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_candidate_index_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.source = os.path.join(self.test_dir, 'jamdict.db')
+        self.index = os.path.join(self.test_dir, 'candidates.db')
+        _make_jamdict(self.source)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _pick_all(self, track, user_level, exclude=()):
+        return pick_candidates(track, 10, set(exclude), user_level, index_file=self.index, rng=random.Random(1))
+
+    def test_build_filters_and_tiers(self):
+        self.assertEqual(build_candidate_index(self.source, self.index), 5)
+
+        beginner = {r["word"]: r for r in self._pick_all("General", 1)}
+        self.assertEqual(set(beginner), {"食べる", "切符", "は"})
+        self.assertEqual(beginner["食べる"], {"word": "食べる", "kana": "たべる", "meanings": ["to eat"], "pos": "v1"})
+
+        # Long compounds and uncommon words open up from level 10
+        advanced = {r["word"] for r in self._pick_all("General", 10)}
+        self.assertEqual(advanced, {"食べる", "切符", "は", "乗車券販売機械", "稀覯"})
+
+    def test_tracks_and_exclusions(self):
+        build_candidate_index(self.source, self.index)
+        travel = [r["word"] for r in pick_candidates("Travel", 2, set(), 10, index_file=self.index)]
+        self.assertEqual(sorted(travel), ["乗車券販売機械", "切符"])
+
+        # Travel words come first; once they are exhausted the track falls back to General
+        picked = pick_candidates("Travel", 3, {"乗車券販売機械"}, 1, index_file=self.index, rng=random.Random(2))
+        self.assertEqual(picked[0]["word"], "切符")
+        self.assertEqual(len(picked), 3)
+        self.assertNotIn("乗車券販売機械", [r["word"] for r in picked])
+
+        self.assertEqual(self._pick_all("General", 1, exclude=["食べる", "切符", "は"]), [])
+
+    def test_readings_by_search_key(self):
+        self.assertEqual(readings_for_key(search_key("kippu"), index_file=self.index), [])
+        build_candidate_index(self.source, self.index)
+        # Every kana spelling is indexed, candidate or not
+        for query in ["kippu", "KIPPU", "キップ", "ｷｯﾌﾟ"]:
+            self.assertEqual(readings_for_key(search_key(query), index_file=self.index), ["きっぷ"])
+        self.assertEqual(readings_for_key(search_key("nu"), index_file=self.index), ["ぬ"])
+        self.assertEqual(readings_for_key(search_key("ticket"), index_file=self.index), [])
+
+    def test_rebuilt_when_source_changes(self):
+        self.assertFalse(is_current(self.source, self.index))
+        self.assertEqual(pick_candidates("General", 3, index_file=self.index), [])
+        ensure_candidate_index(self.source, self.index)
+        self.assertTrue(is_current(self.source, self.index))
+
+        os.utime(self.source, (0, 0))
+        self.assertFalse(is_current(self.source, self.index))
+        ensure_candidate_index(self.source, self.index)
+        self.assertTrue(is_current(self.source, self.index))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from src.change_tracker import ChangeTracker
+
+class TestChangeTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ChangeTracker()
+        self.tracker.ensure("db", lambda: [("a", "x", 1), ("b", "y", 2)])
+
+    def test_diff_reports_changed_and_removed(self):
+        changed, removed = self.tracker.diff({"a": ("a", "x", 1), "b": ("b", "y", 3), "c": ("c", "z", 0)})
+        self.assertEqual(sorted(changed), ["b", "c"])
+        self.assertEqual(removed, [])
+
+        changed, removed = self.tracker.diff({"a": ("a", "x", 1)})
+        self.assertEqual(changed, [])
+        self.assertEqual(removed, ["b"])
+
+    def test_equal_hashes_are_not_taken_as_unchanged(self):
+        self.assertEqual(hash(-1), hash(-2))
+        self.tracker.record([("a", -1)])
+        self.assertEqual(self.tracker.diff({"a": ("a", -2)}), (["a"], ["b"]))
+
+    def test_record_and_discard(self):
+        self.tracker.record([("b", "y", 3)])
+        self.tracker.discard(["a"])
+        changed, removed = self.tracker.diff({"a": ("a", "x", 1), "b": ("b", "y", 3)})
+        self.assertEqual(changed, ["a"])
+        self.assertEqual(removed, [])
+
+    def test_record_ignored_until_built(self):
+        tracker = ChangeTracker()
+        tracker.record([("a", "x", 1)])
+        self.assertEqual(len(tracker), 0)
+        tracker.ensure("db", lambda: [])
+        self.assertEqual(tracker.diff({"a": ("a", "x", 1)}), (["a"], []))
+
+    def test_ensure_rebuilds_for_new_token(self):
+        self.tracker.ensure("db", lambda: self.fail("same database should not reload"))
+        self.tracker.ensure("other", lambda: [])
+        self.assertEqual(len(self.tracker), 0)
+
+if __name__ == '__main__':
+    unittest.main()
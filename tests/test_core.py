@@ -1,6 +1,7 @@
 import sys
 import os
 import unittest
+from unittest.mock import patch
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.models import UserProfile, Vocabulary, GrammarLesson, UserSettings
@@ -13,7 +14,8 @@ class TestCore(unittest.TestCase):
         self.assertEqual(v.ease_factor, 2.5)
         self.assertIsNone(v.due_date)
 
-    def test_srs_update_logic(self):
+    @patch('src.srs_engine.record_review')
+    def test_srs_update_logic(self, mock_record):
         v = Vocabulary(word="a", kana="a", romaji="a", meaning="a")
 
         # 1. Correct (Easy) -> Rating 5 (FSRS: Easy)
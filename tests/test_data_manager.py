@@ -32,6 +32,8 @@ class TestDataManager(unittest.TestCase):
 
         self.original_vocab_file = src.data_manager.VOCAB_FILE
         src.data_manager.VOCAB_FILE = self.vocab_json
+        self.original_user_file = src.data_manager.USER_FILE
+        src.data_manager.USER_FILE = os.path.join(self.test_dir, 'user.json')
 
         # Initialize DB in test location
         src.db.init_db()
@@ -45,6 +47,7 @@ class TestDataManager(unittest.TestCase):
         import src.data_manager
         src.db.DB_FILE = self.original_db_file
         src.data_manager.VOCAB_FILE = self.original_vocab_file
+        src.data_manager.USER_FILE = self.original_user_file
 
         # Clear cache
         src.data_manager._VOCAB_CACHE = None
@@ -92,21 +95,286 @@ class TestDataManager(unittest.TestCase):
     def test_migration(self):
         # Create a json file
         data = [
-            asdict(Vocabulary(word="migrated", meaning="m", kana="m", romaji="m"))
+            asdict(Vocabulary(word="migrated", meaning="m", kana="m", romaji="m")),
+            # Entries saved before cards had a status get one from their history
+            {"word": "reviewed", "meaning": "r", "kana": "r", "romaji": "r", "level": 2},
+            {"word": "known", "meaning": "k", "kana": "k", "romaji": "k", "level": 6, "interval": 30},
         ]
         with open(self.vocab_json, 'w') as f:
             json.dump(data, f)
 
         # Run migration manually since import already happened
-        from src.data_manager import _migrate_json_to_db, get_vocab_item
+        from src.data_manager import _import_vocab_json, get_vocab_item
 
         # Ensure DB is empty first (setUp inits empty DB)
 
-        _migrate_json_to_db()
+        _import_vocab_json()
 
         fetched = get_vocab_item("migrated")
         self.assertIsNotNone(fetched)
         self.assertEqual(fetched.word, "migrated")
+        self.assertEqual(fetched.status, "new")
+        self.assertEqual(get_vocab_item("reviewed").status, "learning")
+        self.assertEqual(get_vocab_item("known").status, "mastered")
+
+    def test_migrations_run_once(self):
+        from unittest.mock import Mock, patch
+        import src.db
+        import src.data_manager as dm
+
+        # A fresh database is created at the latest version
+        os.remove(self.db_file)
+        self.assertEqual(src.db.get_schema_version(), 0)
+        self.assertEqual(dm.migrate_database(), dm.SCHEMA_VERSION)
+        self.assertEqual(src.db.get_schema_version(), dm.SCHEMA_VERSION)
+        self.assertEqual([v for v, _ in dm.MIGRATIONS], list(range(1, dm.SCHEMA_VERSION + 1)))
+
+        # A current one runs no steps at all
+        steps = [(v, Mock()) for v, _ in dm.MIGRATIONS]
+        with patch.object(dm, 'MIGRATIONS', steps):
+            self.assertEqual(dm.migrate_database(), dm.SCHEMA_VERSION)
+        for _, step in steps:
+            step.assert_not_called()
+
+    def test_run_migrations_records_each_step(self):
+        import src.db
+        calls = []
+
+        def failing():
+            raise RuntimeError("boom")
+
+        migrations = [(1, lambda: calls.append(1)), (2, lambda: calls.append(2)), (3, failing)]
+        with self.assertRaises(RuntimeError):
+            src.db.run_migrations(migrations)
+        # Steps that finished stay recorded; the failed one is retried next time
+        self.assertEqual(src.db.get_schema_version(), 2)
+        migrations[2] = (3, lambda: calls.append(3))
+        self.assertEqual(src.db.run_migrations(migrations), 3)
+        self.assertEqual(calls, [1, 2, 3])
+
+    def _query_plan(self, query, params=()):
+        from src.db import get_db
+        with get_db() as conn:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        return [row['detail'] for row in rows]
+
+    def test_hot_queries_use_indexes(self):
+        from src.data_manager import (_sync_indexes, DUE_VOCAB_QUERY, LEARNED_COUNT_QUERY,
+                                      NEW_VOCAB_QUERY, NEW_VOCAB_TAG_FILTER)
+        _sync_indexes()
+
+        core_query = NEW_VOCAB_QUERY.format(tag_filter=NEW_VOCAB_TAG_FILTER.format(placeholders='?'),
+                                            order="ifnull(chapter, 999), rowid")
+        for query, params in [(DUE_VOCAB_QUERY, ("2024-01-01",)), (LEARNED_COUNT_QUERY, ()),
+                              (core_query, ("core", 5))]:
+            plan = self._query_plan(query, params)
+            self.assertTrue(plan)
+            for detail in plan:
+                self.assertFalse(detail.startswith("SCAN"), f"{detail!r} in plan for {query!r}")
+
+    def test_index_definitions_upgraded(self):
+        from src.db import get_db
+        from src.data_manager import _sync_indexes, VOCAB_INDEXES
+
+        with get_db() as conn:
+            conn.execute("CREATE INDEX idx_vocab_due ON vocabulary(due_date)")
+            conn.commit()
+
+        _sync_indexes()
+
+        with get_db() as conn:
+            rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall()
+        self.assertEqual({row['name']: row['sql'] for row in rows}, VOCAB_INDEXES)
+
+    def test_due_items_include_missing_due_date(self):
+        from src.data_manager import _sync_indexes, add_vocab_item, get_due_vocab_items
+        _sync_indexes()
+
+        add_vocab_item(Vocabulary(word="nodate", meaning="n", kana="n", romaji="n", status="learning"))
+        add_vocab_item(Vocabulary(word="past", meaning="p", kana="p", romaji="p", status="learning", due_date="2023-06-01"))
+        add_vocab_item(Vocabulary(word="future", meaning="f", kana="f", romaji="f", status="learning", due_date="2099-01-01"))
+        add_vocab_item(Vocabulary(word="fresh", meaning="f", kana="f", romaji="f", status="new"))
+
+        due = get_due_vocab_items("2024-01-01")
+        self.assertEqual([v.word for v in due], ["nodate", "past"])
+
+    def test_new_items_filtered_by_tag_in_chapter_order(self):
+        from src.data_manager import add_vocab_item, get_new_vocab_items
+
+        add_vocab_item(Vocabulary(word="ch3", meaning="c", kana="c", romaji="c", tags=["core", "ch3"]))
+        add_vocab_item(Vocabulary(word="nochapter", meaning="n", kana="n", romaji="n", tags=["core"]))
+        add_vocab_item(Vocabulary(word="ch1", meaning="c", kana="c", romaji="c", tags=["core", "ch1"]))
+        add_vocab_item(Vocabulary(word="rpg", meaning="r", kana="r", romaji="r", tags=["rpg"]))
+        add_vocab_item(Vocabulary(word="known", meaning="k", kana="k", romaji="k", status="learning", tags=["core", "ch1"]))
+
+        core = get_new_vocab_items(5, tags=["core"], by_chapter=True)
+        self.assertEqual([v.word for v in core], ["ch1", "ch3", "nochapter"])
+        self.assertEqual(core[0].tags, ["core", "ch1"])
+
+        pop = get_new_vocab_items(5, tags=["anime", "rpg"])
+        self.assertEqual([v.word for v in pop], ["rpg"])
+        self.assertEqual(len(get_new_vocab_items(2)), 2)
+
+        # Retagging replaces the old tag rows
+        add_vocab_item(Vocabulary(word="rpg", meaning="r", kana="r", romaji="r", tags=["business"]))
+        self.assertEqual(get_new_vocab_items(5, tags=["rpg"]), [])
+
+    def test_save_vocab_writes_only_changes(self):
+        from unittest.mock import patch
+        from src.db import get_db
+        from src.data_manager import save_vocab, load_vocab, get_vocab_item, get_due_vocab_count
+
+        save_vocab([Vocabulary(word=f"w{i}", meaning="m", kana="k", romaji="r") for i in range(50)])
+        vocab = load_vocab()
+
+        def changes_during(fn):
+            with get_db() as conn:
+                before = conn.total_changes
+                fn()
+                return conn.total_changes - before
+
+        self.assertEqual(changes_during(lambda: save_vocab(vocab)), 0)
+
+        vocab[7].status = "learning"
+        vocab[7].due_date = "2024-01-01"
+        # Only the changed card is encoded into a row
+        import src.data_manager as dm
+        with patch.object(dm, '_vocab_to_row', wraps=dm._vocab_to_row) as to_row:
+            self.assertEqual(changes_during(lambda: save_vocab(vocab)), 1)
+        self.assertEqual(to_row.call_count, 1)
+        self.assertEqual(get_due_vocab_count("2024-01-01"), 1)
+
+        # Words left out of the list are deleted
+        dropped = vocab.pop(3).word
+        self.assertEqual(changes_during(lambda: save_vocab(vocab)), 1)
+        with get_db() as conn:
+            self.assertEqual(conn.execute("SELECT count(*) FROM vocabulary").fetchone()[0], 49)
+        self.assertIsNone(get_vocab_item(dropped))
+
+    def test_cached_rows_share_tag_strings(self):
+        from src.data_manager import add_vocab_item, load_vocab
+        import src.data_manager as dm
+
+        add_vocab_item(Vocabulary(word="one", meaning="1", kana="1", romaji="1", tags=["core", "ch1"]))
+        add_vocab_item(Vocabulary(word="two", meaning="2", kana="2", romaji="2", tags=["core", "ch1"]))
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+
+        one, two = sorted(load_vocab(), key=lambda v: v.word)
+        self.assertEqual(one.tags, ["core", "ch1"])
+        self.assertIsNot(one.tags, two.tags)
+        self.assertIs(one.tags[0], two.tags[0])
+        self.assertIs(one.status, two.status)
+
+    def test_chapter_and_tags_backfilled(self):
+        from src.db import get_db
+        from src.data_manager import migrate_database, get_new_vocab_items
+
+        # A database from before vocab_tags / chapter existed
+        os.remove(self.db_file)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute('''CREATE TABLE vocabulary (word TEXT PRIMARY KEY, kana TEXT, romaji TEXT, meaning TEXT,
+                        level INTEGER, last_review TEXT, tags TEXT, ease_factor REAL, interval INTEGER,
+                        due_date TEXT, status TEXT, pos TEXT, example_sentence TEXT, fsrs_stability REAL,
+                        fsrs_difficulty REAL, fsrs_retrievability REAL, fsrs_last_review TEXT)''')
+        conn.execute("INSERT INTO vocabulary (word, kana, romaji, meaning, status, tags) VALUES (?, ?, ?, ?, ?, ?)",
+                     ("old", "o", "o", "o", "new", json.dumps(["core", "ch2"])))
+        conn.commit()
+        conn.close()
+
+        migrate_database()
+
+        with get_db() as conn:
+            row = conn.execute("SELECT chapter FROM vocabulary WHERE word = 'old'").fetchone()
+        self.assertEqual(row['chapter'], 2)
+        self.assertEqual([v.word for v in get_new_vocab_items(5, tags=["core"])], ["old"])
+
+    def test_pitch_pattern_stored_and_backfilled(self):
+        from unittest.mock import patch
+        from src.db import get_db
+        import src.data_manager as dm
+
+        dm.add_vocab_item(Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat"))
+        dm.save_vocab(dm.load_vocab() + [Vocabulary(word="今日", kana="きょう", romaji="kyou", meaning="today")])
+        self.assertEqual(dm.get_vocab_item("猫").pitch_pattern, "HL")
+        self.assertEqual(dm.get_vocab_item("今日").pitch_pattern, "HHL")
+
+        # A row written before the column existed
+        with get_db() as conn:
+            conn.execute("INSERT INTO vocabulary (word, kana, romaji, meaning, status, tags) VALUES ('犬', 'いぬ', 'inu', 'dog', 'new', '[]')")
+            conn.commit()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        self.assertIsNone(dm.get_vocab_item("犬").pitch_pattern)
+
+        self.assertEqual(dm.backfill_pitch_patterns(batch_size=1), 1)
+        self.assertEqual(dm.get_vocab_item("犬").pitch_pattern, "LH")
+        with get_db() as conn:
+            rows = dict(conn.execute("SELECT word, pitch_pattern FROM vocabulary").fetchall())
+        self.assertEqual(rows, {"猫": "HL", "今日": "HHL", "犬": "LH"})
+
+        # Stored patterns are served without touching MeCab
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        with patch('src.pitch.get_tagger') as get_tagger:
+            self.assertEqual(dm.get_vocab_item("犬").pitch_pattern, "LH")
+            self.assertEqual(dm.backfill_pitch_patterns(), 0)
+            get_tagger.assert_not_called()
+
+    def test_find_vocab_items_by_search_key(self):
+        from src.db import get_db
+        import src.data_manager as dm
+        dm._sync_indexes()
+
+        dm.add_vocab_item(Vocabulary(word="食べる", kana="たべる", romaji="taberu", meaning="to eat"))
+        dm.add_vocab_item(Vocabulary(word="コーヒー", kana="コーヒー", romaji="koohii", meaning="coffee"))
+        for query in ["taberu", "タベル", "ﾀﾍﾞﾙ", "食べる"]:
+            self.assertEqual([v.word for v in dm.find_vocab_items(query)], ["食べる"], query)
+        for query in ["koohii", "kōhī", "こーひー", "コーヒー"]:
+            self.assertEqual([v.word for v in dm.find_vocab_items(query)], ["コーヒー"], query)
+        self.assertEqual(dm.find_vocab_items("nomu"), [])
+
+        plan = self._query_plan(dm.FIND_VOCAB_QUERY, ("たべる", "たべる"))
+        self.assertIn("MULTI-INDEX OR", plan)
+        for detail in plan:
+            self.assertFalse(detail.startswith("SCAN"), detail)
+
+        # Rows from before the column existed get their keys on migration
+        with get_db() as conn:
+            conn.execute("DROP INDEX idx_vocab_search_key")
+            conn.execute("ALTER TABLE vocabulary DROP COLUMN search_key")
+            conn.execute("PRAGMA user_version = 5")
+            conn.commit()
+        dm.migrate_database()
+        self.assertEqual([v.word for v in dm.find_vocab_items("taberu")], ["食べる"])
+
+    def test_save_reviews_commits_once(self):
+        from src.db import get_db
+        from src.models import UserProfile
+        import src.data_manager as dm
+
+        words = [f"w{i}" for i in range(20)]
+        for w in words:
+            dm.add_vocab_item(Vocabulary(word=w, kana=w, romaji=w, meaning=w, status="learning", pitch_pattern="LH"))
+        items = [dm.get_vocab_item(w) for w in words]
+        for item in items:
+            item.due_date = "2099-01-01"
+
+        statements = []
+        with get_db() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                dm.save_reviews(items, UserProfile(xp=42, gems=3))
+            finally:
+                conn.set_trace_callback(None)
+
+        self.assertEqual(sum(1 for sql in statements if sql.strip().upper() == "COMMIT"), 1)
+        self.assertEqual(dm.get_due_vocab_count("2024-01-01"), 0)
+        dm._PROFILE_STORE.invalidate()
+        self.assertEqual(dm.load_user_profile().xp, 42)
+        with get_db() as conn:
+            dates = {row[0] for row in conn.execute("SELECT due_date FROM vocabulary")}
+        self.assertEqual(dates, {"2099-01-01"})
 
 if __name__ == '__main__':
     unittest.main()
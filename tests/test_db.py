@@ -3,7 +3,8 @@ import os
 import unittest
 import sqlite3
 import json
-from src.db import init_db, get_db, DB_FILE
+import threading
+from src.db import init_db, get_db, get_pool_stats, pool, DB_FILE
 
 class TestDB(unittest.TestCase):
     def setUp(self):
@@ -21,8 +22,10 @@ class TestDB(unittest.TestCase):
         init_db()
 
     def tearDown(self):
-        if os.path.exists(self.test_db_file):
-            os.remove(self.test_db_file)
+        pool.close_all()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.test_db_file + suffix):
+                os.remove(self.test_db_file + suffix)
         # Restore
         import src.db
         src.db.DB_FILE = self.original_db_file
@@ -53,5 +56,85 @@ class TestDB(unittest.TestCase):
             self.assertEqual(row['level'], 1)
             self.assertEqual(json.loads(row['tags']), ["tag1", "tag2"])
 
+    def test_connection_reused_within_thread(self):
+        with get_db() as first:
+            pass
+        before = get_pool_stats()
+        with get_db() as second:
+            pass
+        after = get_pool_stats()
+        self.assertIs(first, second)
+        self.assertEqual(after["opened"], before["opened"])
+        self.assertEqual(after["reused"], before["reused"] + 1)
+
+    def test_connection_per_thread(self):
+        with get_db() as main_conn:
+            pass
+        seen = []
+
+        def worker():
+            with get_db() as conn:
+                seen.append(conn)
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        self.assertEqual(len(seen), 1)
+        self.assertIsNot(seen[0], main_conn)
+
+    def test_wal_mode_enabled(self):
+        with get_db() as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_uncommitted_work_rolled_back(self):
+        with get_db() as conn:
+            conn.execute("INSERT INTO vocabulary (word, kana, romaji, meaning) VALUES ('x', 'x', 'x', 'x')")
+            # No commit: must not leak into the next user of the pooled connection
+
+        with get_db() as conn:
+            self.assertFalse(conn.in_transaction)
+            row = conn.execute("SELECT count(*) FROM vocabulary").fetchone()
+            self.assertEqual(row[0], 0)
+
+    def test_nested_get_db_keeps_outer_transaction(self):
+        with get_db() as outer:
+            outer.execute("INSERT INTO vocabulary (word, kana, romaji, meaning) VALUES ('y', 'y', 'y', 'y')")
+            with get_db() as inner:
+                self.assertIs(inner, outer)
+            self.assertTrue(outer.in_transaction)
+            outer.commit()
+
+        with get_db() as conn:
+            row = conn.execute("SELECT count(*) FROM vocabulary").fetchone()
+            self.assertEqual(row[0], 1)
+
+    def test_reset_leaves_busy_connections_open(self):
+        started, reset_done = threading.Event(), threading.Event()
+        result = {}
+
+        def worker():
+            with get_db() as conn:
+                started.set()
+                reset_done.wait(5)
+                # Mid-request when another thread re-initialized the pool
+                result["count"] = conn.execute("SELECT count(*) FROM vocabulary").fetchone()[0]
+            result["conn"] = conn
+            with get_db() as fresh:
+                result["fresh"] = fresh
+
+        t = threading.Thread(target=worker)
+        t.start()
+        started.wait(5)
+        init_db()
+        reset_done.set()
+        t.join()
+
+        self.assertEqual(result["count"], 0)
+        self.assertIsNot(result["fresh"], result["conn"])
+        # The stale handle was closed by its own thread once released
+        with self.assertRaises(sqlite3.ProgrammingError):
+            result["conn"].execute("SELECT 1")
+
 if __name__ == '__main__':
     unittest.main()
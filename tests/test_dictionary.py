@@ -1,18 +1,36 @@
 import unittest
+import asyncio
+import os
+import threading
+import src.dictionary
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
-from src.api import app
+from starlette.requests import Request
+from src.api import app, search_dictionary
 from src.auth import verify_api_key
-from src.dictionary import search
+from src.models import Vocabulary
+from src.dictionary import (
+    search, search_async, clear_search_cache, get_search_cache_stats,
+    start_dictionary_executor, stop_dictionary_executor, load_search_warmup, start_search_warmup
+)
 
 client = TestClient(app)
 
 class TestDictionary(unittest.TestCase):
     def setUp(self):
         app.dependency_overrides[verify_api_key] = lambda: True
+        clear_search_cache()
 
     def tearDown(self):
         app.dependency_overrides = {}
+        clear_search_cache()
+
+    def _mock_entry(self, word, kana, glosses, pos):
+        entry = MagicMock()
+        entry.kanji_forms = [MagicMock(text=word)]
+        entry.kana_forms = [MagicMock(text=kana)]
+        entry.senses = [MagicMock(gloss=glosses, pos=pos)]
+        return entry
 
     @patch('src.dictionary.get_jam')
     def test_dictionary_search_logic(self, mock_get_jam):
@@ -48,7 +66,76 @@ class TestDictionary(unittest.TestCase):
         self.assertEqual(results[0]['kana'], "たべる")
         self.assertEqual(results[0]['meanings'], ["to eat"])
 
-    @patch('src.api.search')
+    @patch('src.dictionary.get_jam')
+    def test_search_results_cached(self, mock_get_jam):
+        mock_lookup = mock_get_jam.return_value.lookup
+        mock_lookup.return_value.entries = [self._mock_entry("食べる", "たべる", ["to eat"], ["Ichidan verb"])]
+
+        first = search("たべる")
+        # Full-width and padded spellings share the cache entry
+        self.assertEqual(search(" たべる "), first)
+        self.assertEqual(mock_lookup.call_count, 1)
+        self.assertEqual(get_search_cache_stats()["hits"], 1)
+        self.assertEqual(get_search_cache_stats()["misses"], 1)
+
+        # A failed lookup is not cached
+        mock_lookup.side_effect = RuntimeError("db locked")
+        self.assertEqual(search("のむ"), [])
+        mock_lookup.side_effect = None
+        search("のむ")
+        self.assertEqual(mock_lookup.call_count, 3)
+
+    @patch('src.dictionary.readings_for_key', return_value=[])
+    @patch('src.dictionary.get_jam')
+    def test_startup_warmup(self, mock_get_jam, mock_readings):
+        self.assertIn("食べる", load_search_warmup())
+
+        path = os.path.join(os.path.dirname(__file__), 'test_search_warmup.txt')
+        self.addCleanup(os.remove, path)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("# common searches\nたべる\n\n  cat \n")
+        self.assertEqual(load_search_warmup(path), ["たべる", "cat"])
+        self.assertEqual(load_search_warmup(path + ".missing"), [])
+
+        mock_lookup = mock_get_jam.return_value.lookup
+        mock_lookup.return_value.entries = [self._mock_entry("食べる", "たべる", ["to eat"], ["Ichidan verb"])]
+        start_search_warmup(path).join(5)
+        self.assertEqual(get_search_cache_stats()["misses"], 2)
+        search("たべる")
+        self.assertEqual(mock_lookup.call_count, 2)
+
+    @patch('src.dictionary.readings_for_key')
+    @patch('src.dictionary.get_jam')
+    def test_search_resolves_readings(self, mock_get_jam, mock_readings):
+        coffee = self._mock_entry("珈琲", "コーヒー", ["coffee"], ["noun (common) (futsuumeishi)"])
+        mock_lookup = mock_get_jam.return_value.lookup
+        mock_lookup.side_effect = lambda q, **kw: MagicMock(entries=[coffee] if q == "コーヒー" else [])
+        mock_readings.return_value = ["コーヒー"]
+
+        results = search("koohii")
+        self.assertEqual([r["word"] for r in results], ["珈琲"])
+        mock_readings.assert_called_once_with("こうひい")
+        self.assertEqual([c.args[0] for c in mock_lookup.call_args_list], ["koohii", "コーヒー"])
+
+        # A spelling reached twice yields its entry once
+        mock_readings.return_value = ["こーひー", "コーヒー"]
+        mock_lookup.side_effect = lambda q, **kw: MagicMock(entries=[coffee])
+        self.assertEqual(len(search("kōhī")), 1)
+
+    @patch('src.api.find_vocab_items', return_value=[])
+    @patch('src.api.add_vocab_item')
+    @patch('src.dictionary.get_jam')
+    def test_add_after_search_reuses_lookup(self, mock_get_jam, mock_add, mock_find):
+        mock_lookup = mock_get_jam.return_value.lookup
+        mock_lookup.return_value.entries = [self._mock_entry("飲む", "のむ", ["to drink"], ["Godan verb with 'mu' ending"])]
+
+        client.get("/api/dictionary/search?q=のむ")
+        response = client.post("/api/dictionary/add", json={"word": "飲む", "kana": "のむ", "meanings": ["to drink"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_lookup.call_count, 1)
+        self.assertEqual(mock_add.call_args[0][0].pos, "v5")
+
+    @patch('src.api.search_async')
     def test_search_api(self, mock_search):
         # This mocks the search function we just tested above
         mock_search.return_value = [
@@ -61,11 +148,11 @@ class TestDictionary(unittest.TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["word"], "食べる")
 
-    @patch('src.api.get_vocab_item')
+    @patch('src.api.find_vocab_items')
     @patch('src.api.add_vocab_item')
-    def test_add_dictionary_item(self, mock_add, mock_get):
-        # Mock get_vocab_item to return None (not found)
-        mock_get.return_value = None
+    def test_add_dictionary_item(self, mock_add, mock_find):
+        # Only a homophone is in the deck
+        mock_find.return_value = [Vocabulary(word="蚤", kana="のみ", romaji="nomi", meaning="flea")]
 
         payload = {
             "word": "飲む",
@@ -86,12 +173,9 @@ class TestDictionary(unittest.TestCase):
         self.assertEqual(saved_item.meaning, "to drink")
         self.assertEqual(saved_item.status, "new")
 
-    @patch('src.api.get_vocab_item')
-    def test_add_dictionary_item_duplicate(self, mock_get):
-        # Mock get_vocab_item to return existing item
-        existing_item = MagicMock()
-        existing_item.word = "飲む"
-        mock_get.return_value = existing_item
+    @patch('src.api.find_vocab_items')
+    def test_add_dictionary_item_duplicate(self, mock_find):
+        mock_find.return_value = [Vocabulary(word="飲む", kana="のむ", romaji="nomu", meaning="to drink")]
 
         payload = {
             "word": "飲む",
@@ -102,6 +186,98 @@ class TestDictionary(unittest.TestCase):
         response = client.post("/api/dictionary/add", json=payload)
         self.assertEqual(response.status_code, 400)
         self.assertIn("Word already in vocabulary", response.json()["detail"])
+        mock_find.assert_called_once_with("飲む")
+
+        # The same word typed in another width or script
+        mock_find.return_value = [Vocabulary(word="コーヒー", kana="コーヒー", romaji="koohii", meaning="coffee")]
+        payload = {"word": "ｺｰﾋｰ", "kana": "ｺｰﾋｰ", "meanings": ["coffee"]}
+        self.assertEqual(client.post("/api/dictionary/add", json=payload).status_code, 400)
+
+class TestAsyncSearch(unittest.TestCase):
+    def setUp(self):
+        clear_search_cache()
+        stop_dictionary_executor()
+        start_dictionary_executor(workers=1, warm=False)
+        self.release = threading.Event()
+        self.looked_up = []
+        patcher = patch('src.dictionary.get_jam')
+        self.mock_lookup = patcher.start().return_value.lookup
+        self.mock_lookup.side_effect = self._blocking_lookup
+        self.addCleanup(patcher.stop)
+        readings = patch('src.dictionary.readings_for_key', return_value=[])
+        readings.start()
+        self.addCleanup(readings.stop)
+
+    def tearDown(self):
+        self.release.set()
+        # Let lookups still running finish now, not fill the next test's cache
+        executor = src.dictionary._executor
+        stop_dictionary_executor()
+        if executor is not None:
+            executor.shutdown(wait=True)
+        clear_search_cache()
+
+    def _blocking_lookup(self, query, **kwargs):
+        self.looked_up.append(query)
+        self.release.wait(5)
+        entry = MagicMock()
+        entry.kanji_forms = [MagicMock(text=query)]
+        entry.kana_forms = [MagicMock(text=query)]
+        entry.senses = []
+        return MagicMock(entries=[entry])
+
+    async def _until(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        self.fail("timed out")
+
+    def test_identical_queries_coalesce(self):
+        async def run():
+            tasks = [asyncio.ensure_future(search_async(q)) for q in ("のむ", " のむ ", "ｎｏｍｕ")]
+            await self._until(lambda: self.looked_up)
+            self.release.set()
+            return await asyncio.gather(*tasks)
+
+        first, padded, other = asyncio.run(run())
+        self.assertEqual(first, padded)
+        self.assertEqual(first[0]["word"], "のむ")
+        self.assertEqual(other[0]["word"], "nomu")
+        self.assertEqual(self.looked_up.count("のむ"), 1)
+
+        # Cached results are answered without the executor
+        stop_dictionary_executor()
+        with patch('src.dictionary.start_dictionary_executor') as start:
+            self.assertEqual(asyncio.run(search_async("のむ")), first)
+            start.assert_not_called()
+
+    def test_abandoned_search_is_dropped(self):
+        async def run():
+            busy = asyncio.ensure_future(search_async("たべる"))
+            await self._until(lambda: self.looked_up)
+            # Queued behind the busy worker; its only caller goes away
+            abandoned = asyncio.ensure_future(search_async("のむ"))
+            await asyncio.sleep(0.05)
+            abandoned.cancel()
+            await asyncio.sleep(0.05)
+            self.release.set()
+            await busy
+
+        asyncio.run(run())
+        self.assertEqual(self.looked_up, ["たべる"])
+
+    def test_endpoint_returns_early_on_disconnect(self):
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def run():
+            request = Request({"type": "http", "method": "GET", "headers": []}, receive)
+            response = await search_dictionary("のむ", request)
+            self.release.set()
+            return response
+
+        self.assertEqual(asyncio.run(run()).status_code, 499)
 
 if __name__ == '__main__':
     unittest.main()
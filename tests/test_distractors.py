@@ -0,0 +1,130 @@
+import unittest
+import os
+import shutil
+import random
+from src.distractors import DistractorIndex, meaning_tokens
+from src.models import Vocabulary
+
+ROWS = [
+    ("食べる", "to eat", "v1", ["ch3"]),
+    ("飲む", "to drink", "v5", ["ch3"]),
+    ("見る", "to see; to watch", "v1", ["ch3"]),
+    ("時計", "watch; clock", "noun", ["ch4"]),
+    ("猫", "cat", "noun", ["ch9"]),
+    ("ねこ", "cat", "noun", ["ch9"]),
+    ("犬", "dog", "noun", ["ch9"]),
+]
+
+class TestDistractorIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = DistractorIndex()
+        self.index.ensure("token", lambda: ROWS)
+
+    def test_meaning_tokens(self):
+        self.assertEqual(meaning_tokens("to see; to watch (TV)"), ["see", "watch"])
+
+    def test_pick_shares_meaning_token(self):
+        picks = self.index.pick("時計", "watch; clock", "", [], 1, rng=random.Random(0))
+        self.assertEqual(picks, ["見る"])
+
+    def test_pick_same_pos_and_chapter(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            picks = self.index.pick("食べる", "to eat", "v1", ["ch3"], 2, rng=rng)
+            self.assertEqual(sorted(picks), ["見る", "飲む"])
+
+    def test_pick_skips_identical_meaning(self):
+        rng = random.Random(2)
+        for _ in range(20):
+            picks = self.index.pick("猫", "cat", "noun", ["ch9"], 3, rng=rng)
+            self.assertNotIn("ねこ", picks)
+            self.assertNotIn("猫", picks)
+
+    def test_pick_skips_excluded(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            picks = self.index.pick("食べる", "to eat", "v1", ["ch3"], 2, rng=rng, exclude={"飲む"})
+            self.assertEqual(picks, ["見る"])
+
+    def test_update_moves_word(self):
+        self.index.update("犬", "dog", "noun", ["ch3"])
+        picks = self.index.pick("x", "", "", ["ch9"], 3)
+        self.assertNotIn("犬", picks)
+        self.assertIn("犬", self.index.pick("x", "", "", ["ch3"], 4, rng=random.Random(3)))
+
+class TestDistractorDataManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_distractors_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        src.data_manager._VOCAB_CACHE = None
+        src.data_manager._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager
+        src.db.DB_FILE = self.original_db_file
+        src.data_manager._VOCAB_CACHE = None
+        src.data_manager._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_similar_distractors_filled_to_limit(self):
+        from src.data_manager import add_vocab_item, get_similar_distractors
+
+        for word, meaning, pos, tags in ROWS:
+            add_vocab_item(Vocabulary(word=word, kana=word, romaji="", meaning=meaning, pos=pos, tags=tags))
+
+        item = Vocabulary(word="犬", kana="いぬ", romaji="inu", meaning="dog", pos="noun", tags=["ch9"])
+        distractors = get_similar_distractors(item, limit=3)
+        self.assertEqual(len(distractors), 3)
+        self.assertEqual(len({d.word for d in distractors}), 3)
+        self.assertNotIn("犬", [d.word for d in distractors])
+
+    def test_random_top_up_skips_identical_meaning(self):
+        from src.data_manager import add_vocab_item, get_similar_distractors
+
+        # Two-letter glosses have no meaning tokens, so every distractor comes from the random top-up
+        for word, meaning in [("牛", "ox"), ("雄牛", "Ox "), ("上", "up"), ("行", "go"), ("私", "me")]:
+            add_vocab_item(Vocabulary(word=word, kana=word, romaji="", meaning=meaning))
+
+        item = Vocabulary(word="牛", kana="うし", romaji="ushi", meaning="ox")
+        for _ in range(20):
+            self.assertEqual(sorted(d.word for d in get_similar_distractors(item, limit=3)), ["上", "私", "行"])
+        self.assertEqual(len(get_similar_distractors(item, limit=4)), 3)
+
+    def test_session_distractors_drawn_without_replacement(self):
+        from src.data_manager import add_vocab_item, get_quiz_session_items, get_session_distractors
+
+        for i in range(20):
+            add_vocab_item(Vocabulary(word=f"w{i}", kana=f"w{i}", romaji="", meaning=f"meaning {i}", pos="noun",
+                                      status="learning" if i < 3 else "new", due_date="2000-01-01"))
+        add_vocab_item(Vocabulary(word="later", kana="later", romaji="", meaning="later", status="learning",
+                                  due_date="2099-01-01"))
+
+        # Due cards come first, then other learned ones; never new cards
+        items = get_quiz_session_items("2024-01-01", 10)
+        self.assertEqual(sorted(v.word for v in items[:3]), ["w0", "w1", "w2"])
+        self.assertEqual([v.word for v in items[3:]], ["later"])
+
+        distractors = get_session_distractors(items, limit=3)
+        offered = [d.word for v in items for d in distractors[v.word]]
+        self.assertEqual(len(offered), 12)
+        self.assertEqual(len(set(offered)), 12)
+        self.assertFalse(set(offered) & {v.word for v in items})
+
+        # A deck too small to avoid repeats still fills every question
+        distractors = get_session_distractors(items, limit=6)
+        for word, options in distractors.items():
+            self.assertEqual(len(options), 6)
+            self.assertNotIn(word, [d.word for d in options])
+
+if __name__ == '__main__':
+    unittest.main()
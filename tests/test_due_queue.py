@@ -0,0 +1,115 @@
+import unittest
+import os
+import shutil
+import random
+from src.due_queue import DueQueue
+from src.models import Vocabulary
+
+class TestDueQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = DueQueue()
+        rows = [
+            ("a", "2024-01-01"),
+            ("b", "2024-01-05"),
+            ("c", None),
+            ("d", "2024-02-01"),
+        ]
+        self.queue.ensure("token", lambda: rows)
+
+    def test_count(self):
+        self.assertEqual(self.queue.count("2023-12-31"), 1)  # only the undated card
+        self.assertEqual(self.queue.count("2024-01-01"), 2)
+        self.assertEqual(self.queue.count("2024-01-31"), 3)
+        self.assertEqual(self.queue.count("2099-01-01"), 4)
+
+    def test_sample_only_due(self):
+        rng = random.Random(0)
+        seen = {self.queue.sample("2024-01-05", rng) for _ in range(200)}
+        self.assertEqual(seen, {"a", "b", "c"})
+
+    def test_sample_empty(self):
+        queue = DueQueue()
+        queue.ensure("token", lambda: [])
+        self.assertIsNone(queue.sample("2024-01-01"))
+
+    def test_sample_many_distinct_and_due(self):
+        words = self.queue.sample_many("2024-01-05", 10, random.Random(0))
+        self.assertEqual(sorted(words), ["a", "b", "c"])
+        self.assertEqual(len(self.queue.sample_many("2099-01-01", 2, random.Random(0))), 2)
+        self.assertEqual(self.queue.sample_many("2099-01-01", 0), [])
+
+    def test_update_moves_card(self):
+        self.queue.update("a", "learning", "2024-03-01")
+        self.assertEqual(self.queue.count("2024-01-05"), 2)
+        self.assertEqual(len(self.queue), 4)
+
+    def test_update_new_status_removes_card(self):
+        self.queue.update("b", "new", "2024-01-05")
+        self.assertEqual(self.queue.count("2099-01-01"), 3)
+
+    def test_update_inserts_card(self):
+        self.queue.update("e", "learning", "2024-01-02")
+        self.assertEqual(self.queue.count("2024-01-02"), 3)
+
+    def test_ensure_rebuilds_on_new_token(self):
+        self.queue.ensure("other", lambda: [("z", "2024-01-01")])
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.sample("2024-01-01"), "z")
+
+class TestDueQueueDataManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_due_queue_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        src.data_manager._sync_indexes()
+        src.data_manager._VOCAB_CACHE = None
+        src.data_manager._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager
+        src.db.DB_FILE = self.original_db_file
+        src.data_manager._VOCAB_CACHE = None
+        src.data_manager._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_queue_tracks_updates(self):
+        from src.data_manager import add_vocab_item, update_vocab_item, get_due_vocab_count, get_random_due_vocab_item
+
+        item = Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat", status="new")
+        add_vocab_item(item)
+        self.assertEqual(get_due_vocab_count("2024-01-01"), 0)
+        self.assertIsNone(get_random_due_vocab_item("2024-01-01"))
+
+        item.status = "learning"
+        item.due_date = "2024-01-01"
+        update_vocab_item(item)
+        self.assertEqual(get_due_vocab_count("2024-01-01"), 1)
+        self.assertEqual(get_random_due_vocab_item("2024-01-01").word, "猫")
+
+        item.due_date = "2024-01-10"
+        update_vocab_item(item)
+        self.assertEqual(get_due_vocab_count("2024-01-01"), 0)
+
+    def test_queue_matches_sql(self):
+        from src.data_manager import save_vocab, get_due_vocab_count, get_due_vocab_items
+
+        save_vocab([
+            Vocabulary(word=f"w{i}", kana="k", romaji="r", meaning="m",
+                       status=["new", "learning", "mastered"][i % 3],
+                       due_date=None if i % 7 == 0 else f"2024-01-{i % 28 + 1:02d}")
+            for i in range(100)
+        ])
+        for day in ["2023-12-31", "2024-01-10", "2024-01-28"]:
+            self.assertEqual(get_due_vocab_count(day), len(get_due_vocab_items(day)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import time
+from datetime import date
+from unittest.mock import patch
+import numpy as np
+from src.fsrs_batch import BatchScheduler
+from src.forecast import simulate_workload
+from src.models import Vocabulary
+
+class TestSimulateWorkload(unittest.TestCase):
+    def setUp(self):
+        self.batch = BatchScheduler()
+
+    def test_counts_due_cards(self):
+        stability = np.full(3, 1e6)
+        due_days = np.array([-5, 0, 3])   # overdue cards are due today
+        counts = simulate_workload(stability, np.full(3, 5.0), due_days, due_days - 1, 10, self.batch,
+                                   runs=4, rng=np.random.default_rng(0))
+        self.assertEqual(counts[0], 2)
+        self.assertEqual(counts[3], 1)
+        self.assertEqual(counts.sum(), 3)   # near-certain recall and long intervals: nobody comes back
+
+    def test_short_intervals_repeat(self):
+        counts = simulate_workload(np.array([0.5]), np.array([5.0]), np.array([0]), np.array([-1.0]), 30,
+                                   self.batch, runs=8, rng=np.random.default_rng(0))
+        self.assertEqual(counts[0], 1)
+        self.assertGreater(counts[1:].sum(), 1)
+
+    def test_large_deck_is_fast(self):
+        rng = np.random.default_rng(1)
+        n = 50000
+        stability = rng.uniform(0.5, 200, n)
+        due_days = rng.integers(-10, 60, n)
+        start = time.perf_counter()
+        counts = simulate_workload(stability, rng.uniform(1, 10, n), due_days,
+                                   due_days - self.batch.next_interval(stability), 365, self.batch,
+                                   rng=np.random.default_rng(0))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertGreater(counts.sum(), n)
+
+class TestGetForecast(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_forecast_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        src.db.DB_FILE = self.original_db_file
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_forecast_cached_until_deck_changes(self):
+        import src.forecast as forecast
+        from src.data_manager import add_vocab_item
+
+        today = date(2024, 6, 1)
+        add_vocab_item(Vocabulary(word="a", kana="a", romaji="a", meaning="a", status="learning",
+                                  due_date="2024-06-02", fsrs_stability=5000.0, fsrs_difficulty=5.0,
+                                  fsrs_last_review="2024-05-01T00:00:00+00:00"))
+        add_vocab_item(Vocabulary(word="new", kana="n", romaji="n", meaning="n"))
+
+        with patch.object(forecast, 'get_forecast_columns', wraps=forecast.get_forecast_columns) as columns:
+            first = forecast.get_forecast(7, today=today)
+            self.assertEqual([d["date"] for d in first][:2], ["2024-06-01", "2024-06-02"])
+            self.assertEqual([d["reviews"] for d in first], [0, 1, 0, 0, 0, 0, 0])
+
+            self.assertIs(forecast.get_forecast(7, today=today), first)
+            self.assertEqual(columns.call_count, 1)
+
+            add_vocab_item(Vocabulary(word="b", kana="b", romaji="b", meaning="b", status="learning",
+                                      due_date="2024-06-01"))
+            second = forecast.get_forecast(7, today=today)
+            self.assertEqual(columns.call_count, 2)
+            self.assertEqual(second[0]["reviews"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
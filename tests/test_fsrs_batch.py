@@ -0,0 +1,119 @@
+import unittest
+import os
+import shutil
+import random
+import datetime
+import numpy as np
+from fsrs import Scheduler, Card, Rating, State
+from src.fsrs_batch import BatchScheduler, parse_timestamps, format_dates
+from src.models import Vocabulary
+
+NOW = datetime.datetime(2024, 6, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+def _random_cards(n, seed=7):
+    rng = random.Random(seed)
+    cards = []
+    for _ in range(n):
+        elapsed = datetime.timedelta(days=rng.randint(0, 90), hours=rng.randint(0, 23))
+        cards.append((rng.uniform(0.1, 200.0), rng.uniform(1.0, 10.0), NOW - elapsed, rng.randint(1, 4)))
+    return cards
+
+class TestBatchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(enable_fuzzing=False)
+        self.batch = BatchScheduler(self.scheduler)
+        self.cards = _random_cards(500)
+        self.stability = np.array([c[0] for c in self.cards])
+        self.difficulty = np.array([c[1] for c in self.cards])
+        self.last_review = parse_timestamps([c[2].isoformat() for c in self.cards])
+        self.ratings = np.array([c[3] for c in self.cards])
+        self.elapsed = self.batch.elapsed_days(self.last_review, NOW.timestamp())
+
+    def _card(self, stability, difficulty, last_review):
+        return Card(state=State.Review, step=None, stability=stability, difficulty=difficulty,
+                    due=NOW, last_review=last_review)
+
+    def test_retrievability_matches_scheduler(self):
+        expected = [self.scheduler.get_card_retrievability(self._card(s, d, lr), NOW) for s, d, lr, _ in self.cards]
+        np.testing.assert_allclose(self.batch.retrievability(self.stability, self.elapsed), expected, rtol=1e-12)
+
+    def test_retrievability_of_unreviewed_cards_is_zero(self):
+        r = self.batch.retrievability(np.array([0.0, 5.0]), self.batch.elapsed_days(parse_timestamps([None, None]), 0))
+        self.assertEqual(r.tolist(), [0.0, 0.0])
+
+    def test_review_matches_review_card(self):
+        stability, difficulty, interval = self.batch.review(self.stability, self.difficulty, self.elapsed, self.ratings)
+        for i, (s, d, lr, rating) in enumerate(self.cards):
+            card, _ = self.scheduler.review_card(self._card(s, d, lr), Rating(rating), review_datetime=NOW)
+            self.assertAlmostEqual(stability[i], card.stability, places=9)
+            self.assertAlmostEqual(difficulty[i], card.difficulty, places=9)
+            self.assertEqual(interval[i], (card.due - NOW).days)
+
+    def test_next_interval_matches_scheduler(self):
+        expected = [self.scheduler._next_interval(stability=s) for s in self.stability]
+        self.assertEqual(self.batch.next_interval(self.stability).tolist(), expected)
+
+    def test_fuzz_stays_in_scheduler_range(self):
+        fuzzed = self.batch._fuzz(np.full(2000, 50), np.random.default_rng(1))
+        # Scheduler.review_card fuzzes a 50 day interval to 46..55
+        self.assertGreaterEqual(fuzzed.min(), 46)
+        self.assertLessEqual(fuzzed.max(), 55)
+        self.assertGreater(len(set(fuzzed.tolist())), 1)
+        self.assertEqual(self.batch._fuzz(np.array([1, 2]), np.random.default_rng(1)).tolist(), [1, 2])
+
+    def test_parse_and_format(self):
+        stamps = parse_timestamps(["2024-01-01T00:00:00+00:00", "2024-01-01T09:00:00+09:00",
+                                   "2024-01-01T00:00:00", None])
+        self.assertEqual(stamps[:3].tolist(), [1704067200.0] * 3)
+        self.assertTrue(np.isnan(stamps[3]))
+        self.assertEqual(format_dates(stamps[:1] + 86400 * 3).tolist(), ["2024-01-04"])
+
+class TestRescheduleDeck(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_fsrs_batch_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        src.db.DB_FILE = self.original_db_file
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_reschedule_deck(self):
+        import src.data_manager as dm
+        from src.srs_engine import reschedule_deck, scheduler
+
+        reviewed = (NOW - datetime.timedelta(days=10)).isoformat()
+        dm.add_vocab_item(Vocabulary(word="long", kana="k", romaji="r", meaning="m", status="learning",
+                                     fsrs_stability=30.0, fsrs_difficulty=5.0, fsrs_last_review=reviewed,
+                                     due_date="2099-01-01", interval=99))
+        dm.add_vocab_item(Vocabulary(word="short", kana="k", romaji="r", meaning="m", status="learning",
+                                     fsrs_stability=2.0, fsrs_difficulty=5.0, fsrs_last_review=reviewed,
+                                     due_date="2099-01-01", interval=99))
+        dm.add_vocab_item(Vocabulary(word="fresh", kana="k", romaji="r", meaning="m"))
+
+        self.assertEqual(reschedule_deck(now=NOW, fuzz=False), 2)
+
+        long_item, short_item = dm.get_vocab_item("long"), dm.get_vocab_item("short")
+        self.assertEqual(long_item.interval, scheduler._next_interval(stability=30.0))
+        self.assertEqual(long_item.due_date, "2024-06-21")
+        self.assertEqual(short_item.due_date, "2024-05-24")
+        self.assertLess(short_item.fsrs_retrievability, long_item.fsrs_retrievability)
+        self.assertIsNone(dm.get_vocab_item("fresh").due_date)
+        self.assertEqual(dm.get_due_vocab_count("2024-06-01"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import os
+import shutil
+import random
+import numpy as np
+from unittest.mock import patch
+from fsrs.scheduler import DEFAULT_PARAMETERS
+from src.fsrs_batch import BatchScheduler
+from src.fsrs_optimizer import iter_histories, iter_batches, batch_loss, fit_parameters
+from src.models import Vocabulary
+
+def _simulate(parameters, n_cards, seed=3):
+    """review_log rows for cards whose recall follows the given FSRS weights."""
+    rng = random.Random(seed)
+    model = BatchScheduler.from_parameters(np.asarray(parameters))
+    rows = []
+    for c in range(n_cards):
+        word = f"w{c:05d}"
+        first = rng.choice([1, 3, 3, 4])
+        rows.append((word, first, 0.0, 0))
+        s = model.initial_stability(np.array([first]))
+        d = model.initial_difficulty(np.array([first]))
+        for _ in range(rng.randint(2, 10)):
+            days = np.array([float(rng.randint(1, 30))])
+            r = model.retrievability(s, days)
+            rating = np.array([3 if rng.random() < r[0] else 1])
+            rows.append((word, int(rating[0]), float(days[0]), 2))
+            s, d = model._next_stability(d, s, r, rating), model._next_difficulty(d, rating)
+    return rows
+
+class TestOptimizer(unittest.TestCase):
+    def test_histories_group_rows_by_card(self):
+        rows = [
+            ("a", 3, 0.0, 0), ("a", 1, 2.7, 2), ("a", 3, 0.2, 3),
+            ("b", 3, 4.0, 2), ("b", 3, 9.0, 2),   # first review predates the log
+            ("c", 4, 0.0, 0),                     # nothing to predict yet
+            ("d", 1, 0.0, 0), ("d", 3, 1.0, 1),
+        ]
+        self.assertEqual(list(iter_histories(iter(rows))),
+                         [([3, 1, 3], [0.0, 2.0, 0.0]), ([1, 3], [0.0, 1.0])])
+
+        ratings, elapsed, mask = next(iter_batches(iter(rows)))
+        self.assertEqual(ratings.shape, (2, 3))
+        self.assertEqual(mask.tolist(), [[True, True, True], [True, True, False]])
+
+    def test_loss_vectorized_over_parameter_sets(self):
+        batch = next(iter_batches(iter(_simulate(DEFAULT_PARAMETERS, 50))))
+        other = np.array(DEFAULT_PARAMETERS) * 1.1
+        both, count = batch_loss(np.array([DEFAULT_PARAMETERS, other]), batch)
+        self.assertGreater(count, 0)
+        self.assertAlmostEqual(both[0], batch_loss(np.array([DEFAULT_PARAMETERS]), batch)[0][0])
+        self.assertAlmostEqual(both[1], batch_loss(other[None, :], batch)[0][0])
+
+    def test_fit_improves_on_defaults(self):
+        true = np.array(DEFAULT_PARAMETERS)
+        true[0:4] *= 3
+        true[8] *= 0.6
+        rows = _simulate(true, 600)
+
+        params, before, after = fit_parameters(lambda: iter(rows), epochs=3, batch_cards=128)
+        self.assertEqual(len(params), len(DEFAULT_PARAMETERS))
+        self.assertLess(after, before)
+
+class TestReviewLog(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_fsrs_optimizer_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        dm.flush_review_log()
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        from src.srs_engine import configure_scheduler
+        dm.flush_review_log()
+        configure_scheduler()
+        src.db.DB_FILE = self.original_db_file
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _log_rows(self):
+        from src.db import get_db
+        with get_db() as conn:
+            return conn.execute("SELECT word, rating, state FROM review_log ORDER BY id").fetchall()
+
+    def test_reviews_are_logged_in_batches(self):
+        import src.data_manager as dm
+        from src.srs_engine import update_card_fsrs
+
+        item = Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat")
+        with patch.object(dm, 'REVIEW_LOG_BATCH', 3):
+            update_card_fsrs(item, 4)
+            update_card_fsrs(item, 0)
+            self.assertEqual(self._log_rows(), [])
+            update_card_fsrs(item, 5)
+
+        rows = [tuple(r) for r in self._log_rows()]
+        self.assertEqual([r[1] for r in rows], [3, 1, 4])
+        self.assertEqual(rows[0][2], 0)      # first review of the card
+        self.assertNotEqual(rows[1][2], 0)
+
+    def test_log_streams_in_chunks(self):
+        import src.data_manager as dm
+        for i in range(7):
+            dm.record_review("b" if i % 2 else "a", 3, "2024-01-01T00:00:00+00:00", float(i), 0 if i < 2 else 2)
+        rows = list(dm.iter_review_log(chunk_size=2))
+        self.assertEqual([r['word'] for r in rows], ["a"] * 4 + ["b"] * 3)
+        self.assertEqual(dm.get_review_count(min_elapsed_days=1), 6)
+
+    def test_buffered_reviews_stay_with_their_database(self):
+        import sqlite3
+        import src.db
+        import src.data_manager as dm
+
+        first = src.db.DB_FILE
+        dm.record_review("a", 3, "2024-01-01T00:00:00+00:00", 0.0, 0)
+        src.db.DB_FILE = os.path.join(self.test_dir, 'other.db')
+        src.db.init_db()
+        dm.record_review("b", 3, "2024-01-01T00:00:00+00:00", 0.0, 0)
+        self.assertEqual([r[0] for r in self._log_rows()], [])
+        dm.flush_review_log()
+
+        self.assertEqual([r[0] for r in self._log_rows()], ["b"])
+        conn = sqlite3.connect(first)
+        try:
+            self.assertEqual(conn.execute("SELECT word FROM review_log").fetchall(), [("a",)])
+        finally:
+            conn.close()
+
+        # Reviews of a database that has since been deleted are dropped
+        dm.record_review("c", 3, "2024-01-01T00:00:00+00:00", 0.0, 0)
+        src.db.DB_FILE = first
+        src.db.init_db()
+        os.remove(os.path.join(self.test_dir, 'other.db'))
+        dm.flush_review_log()
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, 'other.db')))
+
+    def test_optimizer_saves_and_loads_parameters(self):
+        import src.data_manager as dm
+        import src.srs_engine as srs
+        import src.fsrs_optimizer as opt
+
+        self.assertIsNone(opt.run_optimizer(reschedule=False))  # empty log
+
+        for row in _simulate(DEFAULT_PARAMETERS, 150):
+            dm.record_review(row[0], row[1], "2024-01-01T00:00:00+00:00", row[2], row[3])
+        with patch.object(opt, 'MIN_REVIEWS', 100):
+            params = opt.run_optimizer(epochs=1, reschedule=False)
+
+        self.assertEqual(dm.load_fsrs_parameters(), params)
+        self.assertEqual(list(srs.scheduler.parameters), params)
+
+        # A fresh process picks them up the first time it schedules a card
+        srs.configure_scheduler()
+        srs._parameters_loaded = False
+        self.assertEqual(list(srs.get_scheduler().parameters), params)
+        self.assertEqual(list(srs.scheduler.parameters), params)
+
+if __name__ == '__main__':
+    unittest.main()
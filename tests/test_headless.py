@@ -0,0 +1,101 @@
+import unittest
+import io
+import json
+import os
+import shutil
+from unittest.mock import patch
+from src.models import Vocabulary
+from src.headless import HeadlessDaemon, run_daemon
+
+class TestHeadlessDaemon(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_headless_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        dm._sync_indexes()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+
+        dm.add_vocab_item(Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat", status="learning",
+                                     due_date="2000-01-01"))
+        dm.add_vocab_item(Vocabulary(word="犬", kana="いぬ", romaji="inu", meaning="dog", tags=["core", "ch1"]))
+
+        # Vocabulary questions only
+        patcher = patch('src.headless.random.random', return_value=1.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        dm.flush_review_log()
+        src.db.DB_FILE = self.original_db_file
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run(self, *requests):
+        lines = [r if isinstance(r, str) else json.dumps(r) for r in requests]
+        stdout = io.StringIO()
+        run_daemon(io.StringIO("\n".join(lines) + "\n"), stdout)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_pipelined_session(self):
+        quiz, answer, wrong, study = self._run(
+            {"request_id": 1, "op": "quiz"},
+            {"request_id": 2, "op": "answer", "question_id": "vocab:猫", "answer": " Cat "},
+            {"request_id": "w", "op": "answer", "question_id": "vocab:猫", "answer": "dog"},
+            {"request_id": 3, "op": "study"},
+        )
+        self.assertEqual((quiz["request_id"], quiz["type"], quiz["id"]), (1, "vocab", "vocab:猫"))
+        self.assertIn("猫", quiz["question"])
+
+        self.assertEqual(answer["request_id"], 2)
+        self.assertTrue(answer["correct"])
+        self.assertEqual(answer["xp_gained"], 10)
+        self.assertEqual(wrong["request_id"], "w")
+        self.assertFalse(wrong["correct"])
+        self.assertEqual(wrong["correct_answer"], "cat")
+        self.assertEqual(wrong["new_xp"], answer["new_xp"])
+
+        self.assertEqual((study["request_id"], study["word"]), (3, "犬"))
+        from src.data_manager import get_vocab_item
+        self.assertNotEqual(get_vocab_item("犬").status, "new")
+
+    def test_bad_requests_do_not_end_the_session(self):
+        responses = self._run("not json", "", {"request_id": 1, "op": "dance"},
+                              {"request_id": 2, "op": "answer", "question_id": "vocab:鳥", "answer": "bird"},
+                              {"request_id": 3, "op": "answer", "question_id": "x"},
+                              {"request_id": 4, "op": "quiz"})
+        self.assertEqual(len(responses), 5)
+        self.assertEqual(responses[0], {"request_id": None, "error": "Invalid JSON input"})
+        self.assertEqual([r["request_id"] for r in responses[1:]], [1, 2, 3, 4])
+        self.assertIn("error", responses[1])
+        self.assertEqual(responses[2]["error"], "Unknown question")
+        self.assertEqual(responses[3]["error"], "Invalid question ID format")
+        self.assertEqual(responses[4]["type"], "vocab")
+
+    def test_sentence_questions_answered_later(self):
+        daemon = HeadlessDaemon()
+        with patch('src.headless.random.random', return_value=0.0):
+            question = daemon.handle({"op": "quiz"})
+        self.assertEqual(question["type"], "sentence")
+
+        with patch('src.headless.check_sentence_answer', return_value=True):
+            result = daemon.handle({"op": "answer", "question_id": question["id"], "answer": "..."})
+        self.assertTrue(result["correct"])
+        self.assertEqual(result["xp_gained"], 20)
+        # Each sentence question is answered once
+        self.assertEqual(daemon.handle({"op": "answer", "question_id": question["id"]}),
+                         {"error": "Unknown question"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import shutil
+from src.lookup_cache import LookupCache, normalize_query
+
+class TestLookupCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_lookup_cache_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.path = os.path.join(self.test_dir, 'lookup_cache.db')
+        self.calls = []
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _loader(self, query):
+        self.calls.append(query)
+        return [{"word": query}]
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  ｔａｂｅｒｕ "), "taberu")
+        self.assertEqual(normalize_query("ﾀﾍﾞﾙ"), "タベル")
+        self.assertEqual(normalize_query("to  eat"), "to eat")
+
+    def test_lru_is_bounded(self):
+        cache = LookupCache(maxsize=2)
+        cache.get("a", self._loader)
+        cache.get("b", self._loader)
+        cache.get("a", self._loader)      # a is now the most recent
+        cache.get("c", self._loader)      # evicts b
+        cache.get("a", self._loader)
+        cache.get("b", self._loader)
+        self.assertEqual(self.calls, ["a", "b", "c", "b"])
+        self.assertEqual(cache.stats(), {"hits": 2, "disk_hits": 0, "misses": 4, "size": 2})
+
+    def test_persists_across_instances(self):
+        cache = LookupCache()
+        cache.open(self.path, "jmdict-1")
+        self.assertEqual(cache.warm(["猫", "犬", "猫"], self._loader), 2)
+        cache.close()
+
+        reopened = LookupCache()
+        reopened.open(self.path, "jmdict-1", preload=1)
+        self.assertEqual(len(reopened), 1)                          # most recent only
+        self.assertEqual(reopened.get("犬", self._loader), [{"word": "犬"}])
+        self.assertEqual(reopened.get("猫", self._loader), [{"word": "猫"}])
+        self.assertEqual(reopened.stats()["hits"], 1)
+        self.assertEqual(reopened.stats()["disk_hits"], 1)
+        self.assertEqual(self.calls, ["猫", "犬"])
+        reopened.close()
+
+        # A different dictionary build starts from empty
+        rebuilt = LookupCache()
+        rebuilt.open(self.path, "jmdict-2")
+        rebuilt.get("猫", self._loader)
+        self.assertEqual(self.calls, ["猫", "犬", "猫"])
+        rebuilt.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from dataclasses import asdict, fields
-from src.models import UserProfile, UserSettings
+from src.models import UserProfile, UserSettings, Vocabulary
 
 class TestModels(unittest.TestCase):
     def test_default_initialization(self):
@@ -62,5 +62,13 @@ class TestModels(unittest.TestCase):
         # But we can check it's not present if we were inspecting __dict__, but UserSettings is a dataclass.
         self.assertFalse(hasattr(p.settings, "non_existent_key"))
 
+    def test_vocabulary_is_slotted(self):
+        """Cached cards carry no per-instance __dict__ but keep the dataclass API."""
+        v = Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat", tags=["core"])
+        self.assertFalse(hasattr(v, "__dict__"))
+        self.assertEqual(asdict(v)["tags"], ["core"])
+        with self.assertRaises(AttributeError):
+            v.not_a_field = 1
+
 if __name__ == '__main__':
     unittest.main()
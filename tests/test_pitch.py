@@ -1,8 +1,13 @@
 import unittest
+import csv
+import os
 from unittest.mock import patch, MagicMock
-from src.pitch import get_pitch_pattern, get_moras
+import src.pitch
+from src.pitch import get_pitch_pattern, get_pitch_patterns, get_moras, clear_pitch_cache
 
 class TestPitchPattern(unittest.TestCase):
+    def setUp(self):
+        clear_pitch_cache()
     def test_get_moras(self):
         """Test mora tokenization."""
         # Simple
@@ -106,5 +111,52 @@ class TestPitchPattern(unittest.TestCase):
         # Heiban: L H H.
         self.assertEqual(get_pitch_pattern("Test", "てすと"), "LHH")
 
+    def test_patterns_are_memoized(self):
+        self.assertEqual(get_pitch_pattern("猫", "ねこ"), "HL")
+        with patch('src.pitch.get_tagger') as mock_get_tagger:
+            self.assertEqual(get_pitch_pattern("猫", "ねこ"), "HL")
+            mock_get_tagger.assert_not_called()
+
+    def test_fallback_is_not_memoized(self):
+        with patch('src.pitch.get_tagger', return_value=None):
+            self.assertEqual(get_pitch_pattern("猫", "ねこ"), "LH")
+        self.assertEqual(get_pitch_pattern("猫", "ねこ"), "HL")
+
+class TestPitchPatternBatch(unittest.TestCase):
+    PAIRS = [("猫", "ねこ"), ("犬", "いぬ"), ("食べる", "たべる"), ("東京", "とうきょう"),
+             ("今日", "きょう"), ("今日", "こんにち"), ("猫", "ねこ"), ("", "")]
+
+    def setUp(self):
+        clear_pitch_cache()
+
+    def test_matches_single_word_analysis(self):
+        batch = get_pitch_patterns(self.PAIRS)
+        clear_pitch_cache()
+        self.assertEqual(batch, [get_pitch_pattern(w, r) for w, r in self.PAIRS])
+
+    def test_matches_single_word_analysis_on_genki(self):
+        # Parsing words together changed the accent of some Genki words
+        path = os.path.join(os.path.dirname(__file__), '..', 'data', 'genki_master.csv')
+        with open(path, encoding='utf-8') as f:
+            pairs = [(row[1].strip() or row[0].strip(), row[0].strip()) for row in csv.reader(f) if len(row) > 1]
+        batch = get_pitch_patterns(pairs)
+        clear_pitch_cache()
+        self.assertEqual(batch, [get_pitch_pattern(w, r) for w, r in pairs])
+
+    def test_each_word_parsed_once(self):
+        get_pitch_pattern("猫", "ねこ")
+        tagger = src.pitch.get_tagger()
+        with patch('src.pitch.get_tagger', return_value=MagicMock(wraps=tagger)) as mock_get_tagger:
+            patterns = get_pitch_patterns(self.PAIRS)
+            parsed = [c.args[0] for c in mock_get_tagger.return_value.parseToNode.call_args_list]
+        self.assertEqual(sorted(parsed), sorted(["犬", "食べる", "東京", "今日"]))
+        self.assertEqual(patterns[0], "HL")
+
+    def test_process_pool(self):
+        with patch.object(src.pitch, 'PROCESS_POOL_THRESHOLD', 2), patch.object(src.pitch, 'PROCESS_CHUNK_SIZE', 2):
+            pooled = get_pitch_patterns(self.PAIRS, processes=2)
+        clear_pitch_cache()
+        self.assertEqual(pooled, get_pitch_patterns(self.PAIRS))
+
 if __name__ == '__main__':
     unittest.main()
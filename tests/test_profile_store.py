@@ -0,0 +1,106 @@
+import unittest
+import os
+import json
+import shutil
+from dataclasses import asdict
+from src.models import UserProfile, UserSettings
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_profile_store_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        self.original = (src.db.DB_FILE, dm.USER_FILE)
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        dm.USER_FILE = os.path.join(self.test_dir, 'user.json')
+        src.db.init_db()
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        src.db.DB_FILE, dm.USER_FILE = self.original
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _fresh_load(self):
+        # Drop the in-memory copy so the next load reads the tables
+        import src.data_manager as dm
+        dm._PROFILE_STORE.invalidate()
+        return dm.load_user_profile()
+
+    def test_default_profile(self):
+        from src.data_manager import load_user_profile
+        profile = load_user_profile()
+        self.assertEqual(profile, UserProfile())
+
+    def test_round_trip(self):
+        from src.data_manager import save_user_profile
+        profile = UserProfile(xp=40, level=3, streak=2, gems=12, selected_track="Business",
+                              inventory=["theme_edo"], completed_lessons=["g1", "g2"],
+                              settings=UserSettings(theme="edo", show_romaji=False))
+        save_user_profile(profile)
+        self.assertEqual(self._fresh_load(), profile)
+
+    def test_loaded_profile_is_a_copy(self):
+        from src.data_manager import load_user_profile
+        profile = load_user_profile()
+        profile.gems = 999
+        profile.inventory.append("freeze")
+        self.assertEqual(load_user_profile().gems, 0)
+        self.assertEqual(load_user_profile().inventory, [])
+
+    def test_only_changed_columns_written(self):
+        from src.db import get_db
+        from src.data_manager import load_user_profile, save_user_profile
+
+        save_user_profile(UserProfile(xp=10))
+        statements = []
+        with get_db() as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            profile = load_user_profile()
+            profile.gems += 1
+            profile.inventory.append("theme_edo")
+            save_user_profile(profile)
+        finally:
+            with get_db() as conn:
+                conn.set_trace_callback(None)
+
+        writes = [s for s in statements if s.startswith(("UPDATE", "INSERT", "DELETE"))]
+        self.assertEqual(len(writes), 2)
+        self.assertIn("SET gems = 1", writes[0])
+        self.assertIn("user_inventory", writes[1])
+        self.assertEqual(self._fresh_load().inventory, ["theme_edo"])
+
+    def test_list_rewrite_on_removal(self):
+        from src.data_manager import load_user_profile, save_user_profile
+        save_user_profile(UserProfile(inventory=["a", "b", "c"]))
+        profile = load_user_profile()
+        profile.inventory.remove("b")
+        save_user_profile(profile)
+        self.assertEqual(self._fresh_load().inventory, ["a", "c"])
+
+    def test_json_import(self):
+        import src.data_manager as dm
+        data = asdict(UserProfile(xp=55, gems=4, unlocked_units=["u1", "u2"]))
+        with open(dm.USER_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        dm._import_user_json()
+        profile = self._fresh_load()
+        self.assertEqual(profile.xp, 55)
+        self.assertEqual(profile.unlocked_units, ["u1", "u2"])
+
+        # Runs once: later edits to the JSON file are ignored
+        data["xp"] = 1
+        with open(dm.USER_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        dm._import_user_json()
+        self.assertEqual(self._fresh_load().xp, 55)
+
+if __name__ == '__main__':
+    unittest.main()
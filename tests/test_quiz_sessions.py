@@ -0,0 +1,52 @@
+import unittest
+from src.quiz_sessions import QuizSessionStore, SessionNotFound
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestQuizSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = QuizSessionStore(ttl=100, max_sessions=2, clock=self.clock)
+
+    def test_each_question_answered_once(self):
+        token = self.store.create(["vocab:猫", "vocab:犬"])
+        self.assertTrue(self.store.consume(token, "vocab:猫"))
+        self.assertFalse(self.store.consume(token, "vocab:猫"))
+        self.assertFalse(self.store.consume(token, "vocab:鳥"))
+        self.assertTrue(self.store.consume(token, "vocab:犬"))
+
+    def test_consume_all_is_all_or_nothing(self):
+        token = self.store.create(["vocab:猫", "vocab:犬", "vocab:鳥"])
+        self.assertFalse(self.store.consume_all(token, ["vocab:猫", "vocab:魚"]))
+        self.assertFalse(self.store.consume_all(token, ["vocab:猫", "vocab:猫"]))
+        self.assertTrue(self.store.consume_all(token, ["vocab:猫", "vocab:犬"]))
+        self.assertFalse(self.store.consume(token, "vocab:犬"))
+        self.assertTrue(self.store.consume(token, "vocab:鳥"))
+
+    def test_unknown_token(self):
+        with self.assertRaises(SessionNotFound):
+            self.store.consume("bogus", "vocab:猫")
+
+    def test_sessions_expire(self):
+        token = self.store.create(["vocab:猫"])
+        self.clock.now = 99
+        fresh = self.store.create(["vocab:犬"])
+        self.clock.now = 100
+        with self.assertRaises(SessionNotFound):
+            self.store.consume(token, "vocab:猫")
+        self.assertTrue(self.store.consume(fresh, "vocab:犬"))
+
+    def test_oldest_dropped_beyond_capacity(self):
+        tokens = [self.store.create([f"vocab:{i}"]) for i in range(3)]
+        self.assertEqual(len(self.store), 2)
+        with self.assertRaises(SessionNotFound):
+            self.store.consume(tokens[0], "vocab:0")
+        self.assertTrue(self.store.consume(tokens[2], "vocab:2"))
+
+if __name__ == '__main__':
+    unittest.main()
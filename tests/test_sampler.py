@@ -0,0 +1,91 @@
+import unittest
+import os
+import shutil
+import random
+from src.sampler import VocabSampler
+from src.models import Vocabulary
+
+class TestVocabSampler(unittest.TestCase):
+    def setUp(self):
+        self.sampler = VocabSampler()
+        rows = [(f"n{i}", "new") for i in range(50)] + [(f"l{i}", "learning") for i in range(5)]
+        self.sampler.ensure("token", lambda: rows)
+
+    def test_sample_distinct(self):
+        words = self.sampler.sample(10, rng=random.Random(1))
+        self.assertEqual(len(words), 10)
+        self.assertEqual(len(set(words)), 10)
+
+    def test_sample_exclusions(self):
+        exclude = {f"n{i}" for i in range(50)}
+        words = self.sampler.sample(5, exclude=exclude)
+        self.assertEqual(sorted(words), [f"l{i}" for i in range(5)])
+
+    def test_sample_status_filter(self):
+        rng = random.Random(2)
+        for _ in range(20):
+            words = self.sampler.sample(3, statuses=["learning"], rng=rng)
+            self.assertEqual(len(words), 3)
+            self.assertTrue(all(w.startswith("l") for w in words))
+
+    def test_sample_more_than_available(self):
+        words = self.sampler.sample(10, statuses=["learning"])
+        self.assertEqual(len(words), 5)
+        self.assertEqual(self.sampler.sample(1, statuses=["mastered"]), [])
+
+    def test_update_moves_between_statuses(self):
+        self.sampler.update("n0", "learning")
+        self.sampler.discard("l0")
+        words = self.sampler.sample(10, statuses=["learning"])
+        self.assertEqual(len(words), 5)
+        self.assertIn("n0", words)
+        self.assertNotIn("l0", words)
+        self.assertEqual(len(self.sampler), 54)
+
+    def test_sample_roughly_uniform(self):
+        rng = random.Random(3)
+        counts = {}
+        for _ in range(5500):
+            word = self.sampler.sample(1, rng=rng)[0]
+            counts[word] = counts.get(word, 0) + 1
+        self.assertEqual(len(counts), 55)
+        self.assertGreater(min(counts.values()), 50)
+
+class TestSamplerDataManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_sampler_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        src.data_manager._VOCAB_CACHE = None
+        src.data_manager._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager
+        src.db.DB_FILE = self.original_db_file
+        src.data_manager._VOCAB_CACHE = None
+        src.data_manager._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_distractors_and_learned_item(self):
+        from src.data_manager import save_vocab, add_vocab_item, get_random_distractors, get_random_learned_vocab_item
+
+        save_vocab([Vocabulary(word=f"w{i}", kana="k", romaji="r", meaning=f"m{i}") for i in range(4)])
+        self.assertIsNone(get_random_learned_vocab_item())
+
+        distractors = get_random_distractors("w0", limit=3)
+        self.assertEqual(sorted(d.word for d in distractors), ["w1", "w2", "w3"])
+
+        add_vocab_item(Vocabulary(word="w2", kana="k", romaji="r", meaning="m2", status="learning"))
+        self.assertEqual(get_random_learned_vocab_item().word, "w2")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from src.search_keys import search_key, romaji_to_kana, katakana_to_hiragana
+
+class TestSearchKeys(unittest.TestCase):
+    def test_scripts_share_a_key(self):
+        for text in ["taberu", "Taberu", "たべる", "タベル", "ﾀﾍﾞﾙ", "ＴＡＢＥＲＵ"]:
+            self.assertEqual(search_key(text), "たべる", text)
+        for text in ["koohii", "kōhī", "ko-hi-", "コーヒー", "ｺｰﾋｰ", "こーひー"]:
+            self.assertEqual(search_key(text), "こうひい", text)
+        self.assertEqual(search_key("Tōkyō"), search_key("とうきょう"))
+        self.assertEqual(search_key("jūsu"), search_key("ジュース"))
+
+    def test_romaji(self):
+        self.assertEqual(romaji_to_kana("kitte"), "きって")
+        self.assertEqual(romaji_to_kana("matcha"), "まっちゃ")
+        self.assertEqual(romaji_to_kana("shimbun"), "しんぶん")
+        self.assertEqual(romaji_to_kana("shinbun"), "しんぶん")
+        self.assertEqual(romaji_to_kana("konnichiha"), "こんにちは")
+        self.assertEqual(romaji_to_kana("kon'ya"), "こんや")
+        self.assertEqual(romaji_to_kana("konya"), "こにゃ")
+        self.assertEqual(romaji_to_kana("hon"), "ほん")
+        self.assertEqual(romaji_to_kana("jisho"), "じしょ")
+        self.assertIsNone(romaji_to_kana("ticket"))
+
+    def test_other_text_kept(self):
+        self.assertEqual(katakana_to_hiragana("ヴァイオリン"), "ゔぁいおりん")
+        # Kanji stay, romaji next to them converts, English that is not romaji stays
+        self.assertEqual(search_key("食べru"), "食べる")
+        self.assertEqual(search_key("  Ticket   office "), "ticket office")
+        self.assertEqual(search_key("x-ray"), "x-ray")
+        self.assertEqual(search_key("学校"), "学校")
+
+if __name__ == '__main__':
+    unittest.main()
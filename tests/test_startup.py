@@ -0,0 +1,59 @@
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# Cold start of the headless path (learn.py plus src.headless and everything it
+# pulls in). About 0.1 s on a laptop after lazy imports, down from about 0.45 s.
+COLD_START_BUDGET_US = 300_000
+
+# Loaded on first use only; none of them may be imported just to start up
+LAZY_MODULES = ('numpy', 'jamdict', 'MeCab', 'fsrs', 'rich', 'uvicorn', 'fastapi', 'asyncio')
+
+def _import_times(statement: str, db_file: str):
+    """(module, cumulative microseconds, depth) for every import, via python -X importtime."""
+    env = dict(os.environ, JAPANESE_APP_DB=db_file)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(cumulative), len(name) - len(name.lstrip())))
+    return rows
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        # Importing migrates the database; do that to a copy, not the real one
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_startup_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.db_file = os.path.join(self.test_dir, 'vocab.db')
+        source = os.path.join(REPO_ROOT, 'data', 'vocab.db')
+        if os.path.exists(source):
+            shutil.copyfile(source, self.db_file)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_headless_cold_start(self):
+        statement = "import learn, src.headless"
+        # The first run may still have to create or migrate the database
+        _import_times(statement, self.db_file)
+        rows = _import_times(statement, self.db_file)
+
+        imported = {name.split('.')[0] for name, _, _ in rows}
+        self.assertFalse(imported & set(LAZY_MODULES), "imported eagerly")
+
+        top_level = {name: cumulative for name, cumulative, depth in rows if depth == 1}
+        total = top_level['learn'] + top_level['src.headless']
+        self.assertLess(total, COLD_START_BUDGET_US, f"cold start took {total / 1000:.0f} ms")
+
+if __name__ == '__main__':
+    unittest.main()
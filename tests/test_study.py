@@ -1,33 +1,52 @@
 import unittest
+import os
+import shutil
 from unittest.mock import patch
 from src.study import get_new_items, mark_as_learning
 from src.models import Vocabulary
 
 class TestStudy(unittest.TestCase):
-    @patch('src.study.get_recommendations')
-    def test_get_new_items_general(self, mock_get_recs):
-        mock_get_recs.return_value = []
-        # Mock load_vocab
-        with patch('src.study.load_vocab') as mock_load:
-            v1 = Vocabulary(word="A", kana="a", romaji="a", meaning="a", status="new", tags=["core"])
-            v2 = Vocabulary(word="B", kana="b", romaji="b", meaning="b", status="new", tags=["rpg"])
-            mock_load.return_value = [v1, v2]
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_study_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        self.original_db_file = src.db.DB_FILE
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        src.db.init_db()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
 
-            items = get_new_items(limit=5, track="General")
-            self.assertEqual(len(items), 1)
-            self.assertEqual(items[0].word, "A")
+        dm.add_vocab_item(Vocabulary(word="A", kana="a", romaji="a", meaning="a", status="new", tags=["core"]))
+        dm.add_vocab_item(Vocabulary(word="B", kana="b", romaji="b", meaning="b", status="new", tags=["rpg"]))
 
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        src.db.DB_FILE = self.original_db_file
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    @patch('src.study.save_vocab')
     @patch('src.study.get_recommendations')
-    def test_get_new_items_pop_culture(self, mock_get_recs):
+    def test_get_new_items_general(self, mock_get_recs, mock_save):
         mock_get_recs.return_value = []
-        with patch('src.study.load_vocab') as mock_load:
-            v1 = Vocabulary(word="A", kana="a", romaji="a", meaning="a", status="new", tags=["core"])
-            v2 = Vocabulary(word="B", kana="b", romaji="b", meaning="b", status="new", tags=["rpg"])
-            mock_load.return_value = [v1, v2]
+        items = get_new_items(limit=5, track="General")
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].word, "A")
 
-            items = get_new_items(limit=5, track="Pop Culture")
-            self.assertEqual(len(items), 1)
-            self.assertEqual(items[0].word, "B")
+    @patch('src.study.save_vocab')
+    @patch('src.study.get_recommendations')
+    def test_get_new_items_pop_culture(self, mock_get_recs, mock_save):
+        mock_get_recs.return_value = []
+        items = get_new_items(limit=5, track="Pop Culture")
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].word, "B")
 
     def test_mark_as_learning(self):
         v = Vocabulary(word="a", kana="a", romaji="a", meaning="a", status="new")
@@ -35,5 +54,22 @@ class TestStudy(unittest.TestCase):
         self.assertEqual(v.status, 'learning')
         self.assertIsNotNone(v.due_date)
 
+    @patch('src.main.input', create=True)
+    @patch('src.main.rprint')
+    @patch('src.main.display_study_session')
+    @patch('src.study.get_recommendations', return_value=[])
+    def test_cli_study_mode_saves_items_as_learning(self, mock_get_recs, mock_display, mock_print, mock_input):
+        import src.data_manager as dm
+        from src.main import run_study_mode
+
+        vocab = dm.load_vocab()
+        run_study_mode(vocab, dm.load_user_profile())
+
+        self.assertEqual([v.word for v in mock_display.call_args[0][0]], ["A"])
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        self.assertEqual(dm.get_vocab_item("A").status, 'learning')
+        self.assertEqual(dm.get_vocab_item("B").status, 'new')
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,11 @@ from src.pitch import get_pitch_pattern
 import datetime
 
 class TestV10(unittest.TestCase):
+    def setUp(self):
+        # Reviews of these throwaway cards don't belong in the shared review log
+        patcher = patch('src.srs_engine.record_review')
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_fsrs_scheduling(self):
         v = Vocabulary(word="Test", kana="test", romaji="test", meaning="test", status="new")
@@ -28,6 +33,15 @@ class TestV10(unittest.TestCase):
 
         self.assertGreater(v.fsrs_stability, initial_stability)
 
+    def test_fsrs_scheduling_at_review_time(self):
+        v = Vocabulary(word="Test", kana="test", romaji="test", meaning="test", status="new")
+        answered = datetime.datetime(2024, 3, 1, 9, 30, tzinfo=datetime.timezone.utc)
+        update_card_fsrs(v, 3, answered)
+
+        self.assertEqual(v.fsrs_last_review, answered.isoformat())
+        self.assertGreaterEqual(v.due_date, "2024-03-01")
+        self.assertLess(v.due_date, "2024-04-01")
+
     def test_pitch_pattern(self):
         # Updated expectations based on current implementation (length matches moras)
         # 食べる (taberu) -> Nakadaka (2) -> L H L
@@ -37,11 +51,11 @@ class TestV10(unittest.TestCase):
         # Unknown (abc) -> Heiban (0) -> L H H
         self.assertEqual(get_pitch_pattern("Unknown", "abc"), "LHH")
 
-    @patch('src.api.get_due_vocab')
+    @patch('src.api.get_random_due_vocab_item')
     @patch('src.api.load_vocab')
     def test_api_includes_pitch(self, mock_load, mock_due):
         v = Vocabulary(word="食べる", kana="たべる", romaji="taberu", meaning="eat", status="learning")
-        mock_due.return_value = [v]
+        mock_due.return_value = v
 
         from fastapi.testclient import TestClient
         from src.api import app
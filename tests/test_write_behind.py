@@ -0,0 +1,135 @@
+import unittest
+import os
+import json
+import shutil
+from dataclasses import asdict
+from src.models import Vocabulary, UserProfile
+from src.write_behind import WriteBehindJournal
+
+class TestWriteBehindJournal(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_write_behind_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.log_file = os.path.join(self.test_dir, 'pending.jsonl')
+        self.flushes = []
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _flush(self, items, profile):
+        self.flushes.append(([v.word for v in items], profile))
+
+    def test_flush_groups_latest_state(self):
+        journal = WriteBehindJournal(self.log_file, self._flush, max_pending=10)
+        item = Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat")
+        journal.record_vocab(item)
+        journal.record_vocab(item)
+        journal.record_vocab(Vocabulary(word="犬", kana="いぬ", romaji="inu", meaning="dog"))
+        journal.record_profile(UserProfile(xp=5))
+        journal.record_profile(UserProfile(xp=15))
+
+        self.assertEqual(self.flushes, [])
+        self.assertEqual(journal.pending_count(), 3)
+        self.assertEqual(journal.get_profile().xp, 15)
+
+        journal.flush()
+        self.assertEqual(len(self.flushes), 1)
+        words, profile = self.flushes[0]
+        self.assertEqual(sorted(words), ["犬", "猫"])
+        self.assertEqual(profile.xp, 15)
+        self.assertEqual(journal.pending_count(), 0)
+        self.assertFalse(os.path.exists(self.log_file))
+
+    def test_size_threshold_flushes(self):
+        journal = WriteBehindJournal(self.log_file, self._flush, max_pending=2)
+        journal.record_vocab(Vocabulary(word="a", kana="a", romaji="a", meaning="a"))
+        self.assertEqual(self.flushes, [])
+        journal.record_vocab(Vocabulary(word="b", kana="b", romaji="b", meaning="b"))
+        self.assertEqual(len(self.flushes), 1)
+
+    def test_replay_after_crash(self):
+        with open(self.log_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"type": "vocab", "data": asdict(Vocabulary(word="a", kana="a", romaji="a", meaning="old"))}) + "\n")
+            f.write(json.dumps({"type": "vocab", "data": asdict(Vocabulary(word="a", kana="a", romaji="a", meaning="new"))}) + "\n")
+            f.write(json.dumps({"type": "profile", "data": asdict(UserProfile(gems=3))}) + "\n")
+            f.write('{"type": "vocab", "da')  # torn last record
+
+        replayed = []
+        journal = WriteBehindJournal(self.log_file, lambda items, profile: replayed.append((items, profile)))
+        self.assertEqual(journal.replay(), 3)
+        items, profile = replayed[0]
+        self.assertEqual([(v.word, v.meaning) for v in items], [("a", "new")])
+        self.assertEqual(profile.gems, 3)
+        self.assertFalse(os.path.exists(self.log_file))
+
+class TestWriteBehindDataManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_write_behind_dm_dir')
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+        import src.db
+        import src.data_manager as dm
+        self.original = (src.db.DB_FILE, dm.USER_FILE, dm.WRITE_BEHIND_LOG)
+        src.db.DB_FILE = os.path.join(self.test_dir, 'vocab.db')
+        dm.USER_FILE = os.path.join(self.test_dir, 'user.json')
+        dm.WRITE_BEHIND_LOG = os.path.join(self.test_dir, 'pending.jsonl')
+        src.db.init_db()
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+
+    def tearDown(self):
+        import src.db
+        import src.data_manager as dm
+        dm.disable_write_behind()
+        src.db.DB_FILE, dm.USER_FILE, dm.WRITE_BEHIND_LOG = self.original
+        dm._VOCAB_CACHE = None
+        dm._VOCAB_MAP = None
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _db_gems(self):
+        from src.db import get_db
+        with get_db() as conn:
+            row = conn.execute("SELECT gems FROM user_profile WHERE id = 1").fetchone()
+        return row['gems'] if row else None
+
+    def _db_meaning(self, word):
+        from src.db import get_db
+        with get_db() as conn:
+            row = conn.execute("SELECT meaning FROM vocabulary WHERE word = ?", (word,)).fetchone()
+        return row['meaning'] if row else None
+
+    def test_writes_acknowledged_then_flushed(self):
+        import src.data_manager as dm
+
+        dm.enable_write_behind(interval=3600)
+        dm.add_vocab_item(Vocabulary(word="猫", kana="ねこ", romaji="neko", meaning="cat"))
+        profile = dm.load_user_profile()
+        profile.gems = 7
+        dm.save_user_profile(profile)
+
+        # Readable immediately, but not yet on disk
+        self.assertEqual(dm.get_vocab_item("猫").meaning, "cat")
+        self.assertEqual(dm.load_user_profile().gems, 7)
+        self.assertIsNone(self._db_meaning("猫"))
+        self.assertIsNone(self._db_gems())
+
+        dm.flush_pending_writes()
+        self.assertEqual(self._db_meaning("猫"), "cat")
+        self.assertEqual(self._db_gems(), 7)
+
+    def test_disable_flushes(self):
+        import src.data_manager as dm
+
+        dm.enable_write_behind(interval=3600)
+        dm.add_vocab_item(Vocabulary(word="犬", kana="いぬ", romaji="inu", meaning="dog"))
+        dm.disable_write_behind()
+        self.assertEqual(self._db_meaning("犬"), "dog")
+
+if __name__ == '__main__':
+    unittest.main()